@@ -3,8 +3,14 @@ ASGI config for Backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Sous ASGI, les endpoints de lecture et de suivi (notifications, détail de
+commande, files par rôle, statut) sont servis par des vues async natives
+(ASYNC_API, voir app.core.async_api). Lancement :
+
+    uvicorn Backend.asgi:application --host 0.0.0.0 --port $PORT --workers 4
+
 For more information on this file, see
-https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
 
 import os
@@ -12,5 +18,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Backend.settings')
+os.environ.setdefault('ASYNC_API', 'True')
 
 application = get_asgi_application()
@@ -0,0 +1,63 @@
+"""
+Configuration gunicorn du mode préchargé (copy-on-write) :
+
+    gunicorn -c python:Backend.gunicorn_conf Backend.wsgi:application
+
+Le maître charge et prépare l'application une seule fois (voir
+app.core.prefork), gèle ses objets avec gc.freeze() puis forke les
+workers : Django, DRF, SimpleJWT et les apps sont partagés entre workers
+au lieu d'être chargés par chacun. Mesure : manage.py bench_prefork.
+
+Variables d'environnement : PORT, WEB_CONCURRENCY (workers),
+GUNICORN_THREADS, GUNICORN_MAX_REQUESTS, GUNICORN_PRELOAD_MODULES,
+GUNICORN_WARM_SCHEMA.
+"""
+import gc
+
+# « config » est un réglage gunicorn : ne pas exposer decouple.config sous ce nom
+from decouple import Csv, config as env
+
+bind = f"0.0.0.0:{env('PORT', default='8000')}"
+workers = env('WEB_CONCURRENCY', default=2, cast=int)
+threads = env('GUNICORN_THREADS', default=1, cast=int)
+worker_class = 'gthread' if threads > 1 else 'sync'
+preload_app = True
+
+# Recyclage des workers : le remplaçant est forké du maître, donc partage aussi sa mémoire
+max_requests = env('GUNICORN_MAX_REQUESTS', default=0, cast=int)
+max_requests_jitter = max_requests // 10
+
+# Modules chargés à la demande dans les workers (import Excel, analytique) : partagés s'ils sont importés ici
+PRELOAD_MODULES = env('GUNICORN_PRELOAD_MODULES', default='pandas,openpyxl', cast=Csv())
+WARM_SCHEMA = env('GUNICORN_WARM_SCHEMA', default=True, cast=bool)
+
+# Pas de ramassage pendant le chargement dans le maître : chaque collecte
+# réécrit les en-têtes GC des objets et salirait des pages à partager
+gc.disable()
+
+
+def when_ready(server):
+    from django.conf import settings
+
+    from app.core import logfiles, metrics, prefork
+
+    # Instantanés de métriques et journaux des workers d'un démarrage précédent (pid réutilisables)
+    metrics.clear_spool()
+    logfiles.remove_dead(settings.SLOW_QUERY_LOG_FILE)
+    logfiles.remove_dead(settings.TRAFFIC_CAPTURE_FILE)
+    timings = prefork.warm_up(PRELOAD_MODULES, schema=WARM_SCHEMA)
+    prefork.before_fork()
+    # Les objets du maître ne seront plus jamais parcourus par le GC des workers
+    gc.freeze()
+    gc.enable()
+    server.log.info(
+        'Application préchargée (%s), %d objets gelés',
+        ', '.join(f'{name} {seconds * 1000:.0f} ms' for name, seconds in timings.items()),
+        gc.get_freeze_count(),
+    )
+
+
+def post_fork(server, worker):
+    from app.core import prefork
+
+    prefork.after_fork()
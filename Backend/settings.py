@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 import os
+import tempfile
 from datetime import timedelta
 from pathlib import Path
 import dj_database_url
@@ -46,6 +47,7 @@ INSTALLED_APPS = [
     'rest_framework_simplejwt.token_blacklist',
 
     # Local apps
+    'app.core',
     'app.authentication',
     'app.users',
     'app.products',
@@ -60,8 +62,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app.core.middleware.MetricsMiddleware',  # Métriques par route (/api/metrics/)
+    'app.core.middleware.SlowQueryMiddleware',  # Journal des requêtes SQL lentes / N+1
+    'app.core.middleware.ProfilingMiddleware',  # Profil à la demande (admin, en-tête X-Profile: 1)
+    'app.core.middleware.TrafficCaptureMiddleware',  # Capture de trafic pour rejeu (désactivée par défaut)
+    'app.core.middleware.ReplicaRoutingMiddleware',  # Lectures GET sur les réplicas (si DATABASE_REPLICA_URLS)
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Pour servir les fichiers statiques
+    'app.core.middleware.StaticFilesMiddleware',  # WhiteNoise (fichiers statiques), compatible ASGI
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -93,6 +100,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'Backend.wsgi.application'
 
+# Vues async natives pour les endpoints de lecture (app.core.async_api).
+# Activé par Backend/asgi.py (uvicorn) ; sous WSGI les vues DRF synchrones sont servies
+ASYNC_API = config('ASYNC_API', default=False, cast=bool)
+
 
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
@@ -109,16 +120,85 @@ DATABASES = {
     }
 }
 
+# Durée de vie des connexions persistantes quand le pool est désactivé (secondes).
+# Sous ASGI chaque requête a son propre contexte : les connexions persistantes
+# ne seraient jamais réutilisées et resteraient ouvertes
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=0 if ASYNC_API else 600, cast=int)
+
 # Si DATABASE_URL est définie (production/Render), l'utiliser
 DATABASE_URL = config('DATABASE_URL', default=None)
 if DATABASE_URL:
     DATABASES['default'] = dj_database_url.config(
         default=DATABASE_URL,
-        conn_max_age=600,
+        conn_max_age=DB_CONN_MAX_AGE,
         conn_health_checks=True,
         ssl_require=True
     )
 
+# Cache Django partagé entre workers (Redis, ex : redis://host:6379/0). Obligatoire
+# avec des réplicas : l'épinglage lecture-de-ses-écritures doit être vu par tous les workers
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+
+# Réplicas en lecture (app.core.db_router) : URLs séparées par des virgules.
+# Les GET hors transaction y lisent ; un utilisateur qui vient d'écrire lit sur la
+# base principale pendant REPLICA_PIN_SECONDS
+DATABASE_REPLICA_URLS = config('DATABASE_REPLICA_URLS', default='', cast=Csv())
+REPLICA_DATABASES = []
+for _index, _url in enumerate(DATABASE_REPLICA_URLS, start=1):
+    _replica = dj_database_url.parse(
+        _url,
+        conn_max_age=DATABASES['default'].get('CONN_MAX_AGE', 0),
+        conn_health_checks=True,
+        ssl_require=_url.startswith('postgres'),
+    )
+    # Tests : le réplica est la base de test principale
+    _replica['TEST'] = {'MIRROR': 'default'}
+    DATABASES[f'replica_{_index}'] = _replica
+    REPLICA_DATABASES.append(f'replica_{_index}')
+if REPLICA_DATABASES:
+    DATABASE_ROUTERS = ['app.core.db_router.ReplicaRouter']
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=10, cast=float)
+REPLICA_HEALTH_INTERVAL = config('REPLICA_HEALTH_INTERVAL', default=15, cast=float)
+# Délai de connexion et de requête de la vérification d'un réplica (secondes)
+REPLICA_CHECK_TIMEOUT = config('REPLICA_CHECK_TIMEOUT', default=3, cast=float)
+# PostgreSQL : réplica écarté au-delà de ce retard de réplication
+REPLICA_MAX_LAG_SECONDS = config('REPLICA_MAX_LAG_SECONDS', default=30, cast=float)
+
+# Pool de connexions PostgreSQL (psycopg 3, statistiques dans /api/metrics/) :
+# un pool par base et par worker, partagé par ses threads ou par les requêtes async.
+# Connexions ouvertes au plus : workers × DB_POOL_MAX_SIZE, par base
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+DB_POOL_MIN_SIZE = config('DB_POOL_MIN_SIZE', default=2, cast=int)
+DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=10, cast=int)
+# Attente maximale d'une connexion libre avant erreur (secondes)
+DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=10, cast=float)
+# Connexion inutilisée fermée au-delà de DB_POOL_MIN_SIZE après DB_POOL_MAX_IDLE secondes
+DB_POOL_MAX_IDLE = config('DB_POOL_MAX_IDLE', default=300, cast=float)
+DB_POOL_MAX_LIFETIME = config('DB_POOL_MAX_LIFETIME', default=1800, cast=float)
+for _database in DATABASES.values():
+    if _database['ENGINE'] != 'django.db.backends.postgresql':
+        continue
+    if DB_POOL:
+        # Le pool remplace les connexions persistantes ; chaque emprunt est vérifié
+        _database['CONN_MAX_AGE'] = 0
+        _database['CONN_HEALTH_CHECKS'] = True
+        _database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': DB_POOL_MIN_SIZE,
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': DB_POOL_TIMEOUT,
+            'max_idle': DB_POOL_MAX_IDLE,
+            'max_lifetime': DB_POOL_MAX_LIFETIME,
+        }
+    else:
+        _database['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+
 # add AUTH_USER_MODEL (avant INSTALLED_APPS)
 AUTH_USER_MODEL = 'users.User'
 
@@ -179,11 +259,21 @@ CORS_ALLOWED_ORIGINS = [
 # REST_FRAMEWORK configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'app.authentication.backends.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # JSON via orjson (repli automatique sur json de la bibliothèque standard)
+    'DEFAULT_RENDERER_CLASSES': (
+        'app.core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'app.core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 50,
@@ -218,14 +308,24 @@ SIMPLE_JWT = {
 
     "JTI_CLAIM": "jti",
 
-    "TOKEN_OBTAIN_SERIALIZER": "rest_framework_simplejwt.serializers.TokenObtainPairSerializer",
-    "TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSerializer",
+    "TOKEN_OBTAIN_SERIALIZER": "app.authentication.serializers.RoleTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "app.authentication.serializers.RoleTokenRefreshSerializer",
     "TOKEN_VERIFY_SERIALIZER": "rest_framework_simplejwt.serializers.TokenVerifySerializer",
     "TOKEN_BLACKLIST_SERIALIZER": "rest_framework_simplejwt.serializers.TokenBlacklistSerializer",
     "SLIDING_TOKEN_OBTAIN_SERIALIZER": "rest_framework_simplejwt.serializers.TokenObtainSlidingSerializer",
     "SLIDING_TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSlidingSerializer",
 }
 
+# Cache des utilisateurs authentifiés par JWT (par processus)
+# Une désactivation de compte prend effet au plus tard après JWT_USER_CACHE_TTL secondes (0 = pas de cache)
+JWT_USER_CACHE_TTL = config('JWT_USER_CACHE_TTL', default=30, cast=int)
+JWT_USER_CACHE_SIZE = config('JWT_USER_CACHE_SIZE', default=1024, cast=int)
+
+# Mode sans état : rôle et statut lus dans l'access token, sans requête sur users.
+# Un changement de rôle ou une désactivation n'est alors visible qu'au prochain
+# rafraîchissement du token (au plus ACCESS_TOKEN_LIFETIME)
+JWT_STATELESS_ROLES = config('JWT_STATELESS_ROLES', default=False, cast=bool)
+
 # API Documentation
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Order Management API',
@@ -234,6 +334,80 @@ SPECTACULAR_SETTINGS = {
     'SERVE_INCLUDE_SCHEMA': False,
 }
 
+# Analytique commandes : durée de cache des percentiles par fenêtre de temps (secondes)
+ORDER_ANALYTICS_CACHE_SECONDS = config('ORDER_ANALYTICS_CACHE_SECONDS', default=300, cast=int)
+
+# Confirmations automatiques écrites en bloc (app.orders.confirmation) : commandes par lot
+ORDER_CONFIRM_BATCH = config('ORDER_CONFIRM_BATCH', default=500, cast=int)
+# Nombre maximal de commandes par appel de /api/orders/status/
+ORDER_STATUS_MAX_IDS = config('ORDER_STATUS_MAX_IDS', default=200, cast=int)
+
+# Tournées des livreurs (app.orders.routing) : ordre des arrêts mis en cache tant que les commandes ne changent pas
+ROUTE_CACHE_SECONDS = config('ROUTE_CACHE_SECONDS', default=3600, cast=int)
+# Nombre maximal de passes d'amélioration 2-opt
+ROUTE_MAX_PASSES = config('ROUTE_MAX_PASSES', default=50, cast=int)
+
+# Préparation par vague (app.orders.waves) : nombre maximal de commandes par vague
+WAVE_MAX_ORDERS = config('WAVE_MAX_ORDERS', default=200, cast=int)
+
+# Lots d'opérations (POST /api/batch/, app.core.batch) : nombre maximal d'opérations par lot
+BATCH_MAX_OPERATIONS = config('BATCH_MAX_OPERATIONS', default=100, cast=int)
+
+# Métriques par route (app.core.middleware.MetricsMiddleware)
+# Chaque worker publie ses compteurs dans METRICS_SPOOL_DIR toutes les METRICS_FLUSH_INTERVAL secondes
+METRICS_SPOOL_DIR = config('METRICS_SPOOL_DIR', default=os.path.join(tempfile.gettempdir(), 'pda-metrics'))
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=5, cast=float)
+# Si défini, /api/metrics/ exige "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Journal des requêtes SQL lentes (app.core.querylog) ; seuil 0 = désactivé
+SLOW_QUERY_THRESHOLD_MS = config('SLOW_QUERY_THRESHOLD_MS', default=200, cast=float)
+# Nombre d'exécutions d'un même SQL dans une requête HTTP à partir duquel on soupçonne un N+1
+SLOW_QUERY_N_PLUS_ONE = config('SLOW_QUERY_N_PLUS_ONE', default=5, cast=int)
+# Nom de base : chaque worker écrit dans <nom>.<pid>.jsonl (app.core.logfiles)
+SLOW_QUERY_LOG_FILE = config('SLOW_QUERY_LOG_FILE', default=os.path.join(tempfile.gettempdir(), 'pda-slow-queries.jsonl'))
+SLOW_QUERY_LOG_MAX_BYTES = config('SLOW_QUERY_LOG_MAX_BYTES', default=10 * 1024 * 1024, cast=int)
+SLOW_QUERY_LOG_BACKUPS = config('SLOW_QUERY_LOG_BACKUPS', default=5, cast=int)
+# Taille totale des journaux de tous les workers (les plus anciens fichiers sont supprimés au-delà)
+SLOW_QUERY_LOG_TOTAL_BYTES = config('SLOW_QUERY_LOG_TOTAL_BYTES', default=100 * 1024 * 1024, cast=int)
+
+# Profilage à la demande (app.core.profiling) : profils stockés dans PROFILE_DIR/<id>/
+REQUEST_PROFILING = config('REQUEST_PROFILING', default=True, cast=bool)
+PROFILE_DIR = config('PROFILE_DIR', default=os.path.join(tempfile.gettempdir(), 'pda-profiles'))
+PROFILE_SAMPLE_INTERVAL_MS = config('PROFILE_SAMPLE_INTERVAL_MS', default=1, cast=float)
+# Nombre de profils conservés (les plus anciens sont supprimés)
+PROFILE_KEEP = config('PROFILE_KEEP', default=200, cast=int)
+
+# Capture de trafic (app.core.traffic) : fraction des requêtes /api/ enregistrées, 0 = désactivée
+TRAFFIC_CAPTURE_RATE = config('TRAFFIC_CAPTURE_RATE', default=0.0, cast=float)
+# Nom de base, comme SLOW_QUERY_LOG_FILE : un fichier par worker
+TRAFFIC_CAPTURE_FILE = config('TRAFFIC_CAPTURE_FILE', default=os.path.join(tempfile.gettempdir(), 'pda-traffic.jsonl'))
+TRAFFIC_CAPTURE_MAX_BYTES = config('TRAFFIC_CAPTURE_MAX_BYTES', default=50 * 1024 * 1024, cast=int)
+TRAFFIC_CAPTURE_BACKUPS = config('TRAFFIC_CAPTURE_BACKUPS', default=5, cast=int)
+# Taille totale des captures de tous les workers (les plus anciens fichiers sont supprimés au-delà)
+TRAFFIC_CAPTURE_TOTAL_BYTES = config('TRAFFIC_CAPTURE_TOTAL_BYTES', default=500 * 1024 * 1024, cast=int)
+
+# Positions des livreurs (app.users.locations) : dernière position en mémoire,
+# écrite par lots dans users toutes les LOCATION_FLUSH_INTERVAL secondes
+LOCATION_FLUSH_INTERVAL = config('LOCATION_FLUSH_INTERVAL', default=5, cast=float)
+LOCATION_FLUSH_BATCH = config('LOCATION_FLUSH_BATCH', default=500, cast=int)
+# Historique (user_locations) : une position par livreur toutes les N secondes, ou dès N mètres parcourus
+LOCATION_HISTORY_INTERVAL = config('LOCATION_HISTORY_INTERVAL', default=30, cast=float)
+LOCATION_HISTORY_DISTANCE = config('LOCATION_HISTORY_DISTANCE', default=100, cast=float)
+# Jours d'historique conservés par manage.py prune_locations
+LOCATION_HISTORY_DAYS = config('LOCATION_HISTORY_DAYS', default=30, cast=int)
+# Positions par requête, et positions d'historique en attente d'écriture par worker
+LOCATION_MAX_BATCH = config('LOCATION_MAX_BATCH', default=500, cast=int)
+LOCATION_MAX_PENDING = config('LOCATION_MAX_PENDING', default=100000, cast=int)
+
+# Index spatial des livreurs (app.users.spatial) : taille des cellules de la grille (0,01° ≈ 1,1 km)
+SPATIAL_GRID_CELL_DEGREES = config('SPATIAL_GRID_CELL_DEGREES', default=0.01, cast=float)
+# Synchronisation avec la base (positions écrites par les autres workers), incrémentale puis complète
+SPATIAL_INDEX_REFRESH = config('SPATIAL_INDEX_REFRESH', default=10, cast=float)
+SPATIAL_INDEX_FULL_REFRESH = config('SPATIAL_INDEX_FULL_REFRESH', default=300, cast=float)
+# Nombre maximal de livreurs renvoyés par /api/orders/deliverers/nearest/
+SPATIAL_MAX_NEAREST = config('SPATIAL_MAX_NEAREST', default=50, cast=int)
+
 # Celery configuration
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
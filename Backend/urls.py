@@ -16,7 +16,6 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
@@ -24,6 +23,8 @@ from rest_framework_simplejwt.views import (
     TokenVerifyView,
 )
 
+from app.core.views import lazy_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
 
@@ -38,7 +39,8 @@ urlpatterns = [
     path('api/products/', include('app.products.urls')),
     path('api/orders/', include('app.orders.urls')),
     path('api/notifications/', include('app.notifications.urls')),
-# Documentation
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
-    path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='docs'),
+    path('api/', include('app.core.urls')),
+# Documentation (génération du schéma chargée à la première visite)
+    path('api/schema/', lazy_view('drf_spectacular.views.SpectacularAPIView'), name='schema'),
+    path('api/docs/', lazy_view('drf_spectacular.views.SpectacularSwaggerView', url_name='schema'), name='docs'),
 ]
@@ -0,0 +1,198 @@
+"""
+Authentification JWT avec cache des utilisateurs.
+
+JWTAuthentication exécute un SELECT sur users à chaque requête pour
+charger request.user. Ici l'utilisateur est conservé dans un cache LRU
+propre au processus, avec une durée de vie courte (JWT_USER_CACHE_TTL) :
+une désactivation faite depuis un autre worker prend effet au plus tard
+après ce délai, et immédiatement dans le processus qui l'a faite grâce à
+invalidate_user().
+
+Mode JWT_STATELESS_ROLES : si l'access token porte les claims role et
+is_active_account, request.user est un TokenRoleUser servi sans aucune
+requête ; la ligne complète n'est chargée que si la vue en a besoin.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class UserCache:
+    """Cache LRU avec expiration, partagé par les threads d'un processus"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+user_cache = UserCache(settings.JWT_USER_CACHE_SIZE, settings.JWT_USER_CACHE_TTL)
+
+
+def invalidate_user(user_id):
+    """À appeler après toute modification du compte (statut, rôle, mot de passe)"""
+    user_cache.invalidate(str(user_id))
+
+
+class TokenRoleUser(SimpleLazyObject):
+    """
+    Utilisateur léger construit depuis le token : id, rôle et statut sont lus
+    dans les claims ; tout autre attribut (ou l'affectation à une ForeignKey)
+    charge l'utilisateur complet une seule fois.
+    """
+
+    def __init__(self, validated_token, loader):
+        super().__init__(loader)
+        self.__dict__['_claims'] = {
+            'id': validated_token[api_settings.USER_ID_CLAIM],
+            'role': validated_token['role'],
+            'is_active_account': validated_token.get('is_active_account', True),
+        }
+
+    @property
+    def id(self):
+        return self.__dict__['_claims']['id']
+
+    pk = id
+
+    @property
+    def role(self):
+        return self.__dict__['_claims']['role']
+
+    @property
+    def is_active_account(self):
+        return self.__dict__['_claims']['is_active_account']
+
+    @property
+    def is_authenticated(self):
+        return True
+
+    @property
+    def is_anonymous(self):
+        return False
+
+    def __bool__(self):
+        # IsAuthenticated teste bool(request.user) : ne pas charger la ligne pour ça
+        return True
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+
+    def get_user(self, validated_token):
+        if self.is_stateless(validated_token):
+            self.check_account(validated_token.get('is_active_account', True))
+            return TokenRoleUser(validated_token, lambda: self.get_cached_user(validated_token))
+        return self.get_cached_user(validated_token)
+
+    @staticmethod
+    def is_stateless(validated_token):
+        return settings.JWT_STATELESS_ROLES and 'role' in validated_token \
+            and api_settings.USER_ID_CLAIM in validated_token
+
+    @staticmethod
+    def check_account(is_active_account):
+        if not is_active_account:
+            raise AuthenticationFailed(
+                'Compte désactivé. Contactez l\'administrateur.', code='user_inactive'
+            )
+
+    def get_cached_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        key = str(user_id)
+        user = user_cache.get(key)
+        if user is None:
+            # Requête, contrôle is_active et révocation faits par simplejwt
+            user = super().get_user(validated_token)
+            user_cache.set(key, user)
+
+        self.check_account(user.is_active_account)
+
+        # Copie : les vues peuvent modifier request.user sans toucher à l'entrée du cache
+        return copy.copy(user)
+
+    # ----- Vues asynchrones (app.core.async_api) -----
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        if self.is_stateless(validated_token):
+            self.check_account(validated_token.get('is_active_account', True))
+            # Le chargement paresseux est synchrone : les vues async n'utilisent que id et role
+            return TokenRoleUser(validated_token, lambda: self.get_cached_user(validated_token))
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        key = str(user_id)
+        user = user_cache.get(key)
+        if user is None:
+            try:
+                user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            # Mêmes contrôles que JWTAuthentication.get_user
+            if not user.is_active:
+                raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+            if getattr(api_settings, 'CHECK_REVOKE_TOKEN', False) and validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+            user_cache.set(key, user)
+
+        self.check_account(user.is_active_account)
+        return copy.copy(user)
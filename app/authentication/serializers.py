@@ -1,5 +1,13 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from .tokens import RoleRefreshToken
 
 class LoginRequestSerializer(serializers.Serializer):
     username = serializers.CharField()
-    password = serializers.CharField()
\ No newline at end of file
+    password = serializers.CharField()
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RoleRefreshToken
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RoleRefreshToken
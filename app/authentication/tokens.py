@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+ROLE_CLAIMS = ('role', 'is_active_account')
+
+
+class RoleRefreshToken(RefreshToken):
+    """
+    Refresh token portant les claims role et is_active_account, recopiés
+    dans les access tokens (utilisés par le mode JWT_STATELESS_ROLES).
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in ROLE_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+    @property
+    def access_token(self):
+        # Token reçu du client (rafraîchissement) : relire rôle et statut en base
+        # pour que les nouveaux tokens ne prolongent pas des claims périmés
+        if self.token is not None:
+            claims = get_user_model().objects.filter(
+                **{api_settings.USER_ID_FIELD: self.payload.get(api_settings.USER_ID_CLAIM)}
+            ).values(*ROLE_CLAIMS).first()
+            if claims is None:
+                raise AuthenticationFailed('Utilisateur introuvable', code='user_not_found')
+            if not claims['is_active_account']:
+                raise AuthenticationFailed(
+                    'Compte désactivé. Contactez l\'administrateur.', code='user_inactive'
+                )
+            for claim in ROLE_CLAIMS:
+                self[claim] = claims[claim]
+        return super().access_token
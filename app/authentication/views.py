@@ -3,11 +3,11 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from app.users.serializers import UserSerializer
 from drf_spectacular.utils import extend_schema
 from .serializers import LoginRequestSerializer
+from .tokens import RoleRefreshToken
 
 @extend_schema(
     request=LoginRequestSerializer,
@@ -40,7 +40,7 @@ def login(request):
             status=status.HTTP_403_FORBIDDEN
         )
     # Générer tokens JWT
-    refresh = RefreshToken.for_user(user)
+    refresh = RoleRefreshToken.for_user(user)
 
     return Response({
         'message': 'Connexion réussie',
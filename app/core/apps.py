@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    name = 'app.core'
+
+    def ready(self):
+        # Branche install_query_counter avant la première connexion, même si une
+        # requête SQL précède le chargement des middlewares (commandes, tests, preload)
+        from . import middleware  # noqa: F401
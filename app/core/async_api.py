@@ -0,0 +1,102 @@
+"""
+Vues d'API asynchrones (servies par Backend.asgi sous uvicorn).
+
+DRF n'exécute pas de vues async : @api_view les appellerait depuis un
+thread et perdrait tout l'intérêt de l'ORM asynchrone. Les endpoints de
+lecture et d'attente les plus sollicités (notifications, détail de
+commande, files par rôle, statut) ont donc une version Django async
+native, enveloppée par @async_api_view qui reprend ce que fait DRF pour
+eux : méthodes autorisées, authentification JWT (CachedJWTAuthentication),
+contrôle du rôle, rendu JSON (FastJSONRenderer) et format des erreurs
+({"detail": ...}, 401 avec WWW-Authenticate, 403, 404, 405 avec Allow).
+Une exception imprévue est journalisée et rendue en 500 JSON, comme les
+autres erreurs (avec DEBUG, elle remonte jusqu'à la page de Django).
+
+Les vues d'écriture complexes (création, modification, import Excel)
+restent des vues DRF synchrones : Django les exécute dans un thread.
+"""
+import functools
+import logging
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+
+from app.authentication.backends import CachedJWTAuthentication
+from .renderers import FastJSONRenderer
+
+logger = logging.getLogger(__name__)
+
+_renderer = FastJSONRenderer()
+_authentication = CachedJWTAuthentication()
+
+
+class JSONResponse(HttpResponse):
+    def __init__(self, data, status=status.HTTP_200_OK, **kwargs):
+        super().__init__(
+            _renderer.render(data), status=status, content_type=_renderer.media_type, **kwargs
+        )
+
+
+def _error(exc, allowed):
+    """Même corps et mêmes en-têtes que le gestionnaire d'exceptions DRF"""
+    if isinstance(exc, Http404):
+        exc = exceptions.NotFound(*exc.args)
+    elif isinstance(exc, PermissionDenied):
+        exc = exceptions.PermissionDenied(*exc.args)
+    detail = exc.detail if isinstance(exc.detail, (dict, list)) else {'detail': exc.detail}
+    response = JSONResponse(detail, status=exc.status_code)
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        response['WWW-Authenticate'] = _authentication.authenticate_header(None)
+    if isinstance(exc, exceptions.MethodNotAllowed):
+        response['Allow'] = ', '.join(allowed)
+    if getattr(exc, 'wait', None):
+        response['Retry-After'] = str(int(exc.wait))
+    return response
+
+
+def async_api_view(methods, roles=None):
+    """
+    @async_api_view(['GET'], roles=('magasinier',))
+    async def ma_vue(request, pk): ...  # renvoie (données) ou (données, statut)
+
+    roles=None : tout utilisateur authentifié.
+    """
+    allowed = [method.upper() for method in methods]
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def view(request, *args, **kwargs):
+            try:
+                if request.method not in allowed:
+                    raise exceptions.MethodNotAllowed(request.method)
+                if getattr(request, '_force_auth_user', None) is not None:
+                    # Opération d'un lot (app.core.batch) : déjà authentifiée
+                    result = (request._force_auth_user, request._force_auth_token)
+                else:
+                    result = await _authentication.aauthenticate(request)
+                if result is None:
+                    raise exceptions.NotAuthenticated()
+                request.user, request.auth = result
+                if roles is not None and request.user.role not in roles:
+                    raise exceptions.PermissionDenied()
+                data = await func(request, *args, **kwargs)
+            except (exceptions.APIException, Http404, PermissionDenied) as exc:
+                return _error(exc, allowed)
+            except Exception:
+                if settings.DEBUG:
+                    raise
+                logger.exception('Erreur interne : %s %s', request.method, request.path)
+                return JSONResponse({'detail': 'Erreur interne du serveur.'},
+                                    status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+            if isinstance(data, HttpResponse):
+                return data
+            if isinstance(data, tuple):
+                return JSONResponse(data[0], status=data[1])
+            return JSONResponse(data)
+
+        return csrf_exempt(view)
+    return decorator
@@ -0,0 +1,153 @@
+"""
+Exécution d'un lot d'opérations en une requête HTTP (POST /api/batch/).
+
+Les terminaux mettent leurs actions en file hors ligne puis les rejouent
+à la reconnexion. Chaque opération du lot est passée, dans l'ordre, à la
+vue existante de app.orders, app.products ou app.notifications, avec
+l'utilisateur déjà authentifié par la requête du lot (pas de nouvelle
+vérification du JWT ni de passage par les middlewares). Les réponses des
+vues DRF sont reprises telles quelles (response.data), sans rendu JSON
+intermédiaire.
+
+En mode atomique, tout le lot s'exécute dans une transaction : la
+première opération en erreur (statut >= 400) l'annule entièrement et les
+suivantes ne sont pas exécutées.
+"""
+import io
+import json
+import logging
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.urls import Resolver404, resolve
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Modules dont les vues peuvent être appelées dans un lot
+BATCH_MODULES = ('app.orders.', 'app.products.', 'app.notifications.')
+
+METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+
+class BatchError(ValueError):
+    """Lot ou opération mal formé (message affichable)"""
+
+
+class _Abort(Exception):
+    """Annule la transaction d'un lot atomique"""
+
+
+def _dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data).encode()
+
+
+def parse_operation(index, operation):
+    """dict JSON -> (méthode, chemin, query string, corps) ; BatchError si invalide"""
+    if not isinstance(operation, dict):
+        raise BatchError(f'Opération {index} : objet attendu')
+    method = str(operation.get('method', 'GET')).upper()
+    if method not in METHODS:
+        raise BatchError(f'Opération {index} : méthode {method} non supportée')
+    url = operation.get('path')
+    if not isinstance(url, str) or not url.startswith('/'):
+        raise BatchError(f'Opération {index} : path requis (ex : /api/orders/create/)')
+    parts = urlsplit(url)
+    return method, parts.path, parts.query, operation.get('body')
+
+
+def resolve_view(index, path):
+    try:
+        match = resolve(path)
+    except Resolver404:
+        raise BatchError(f'Opération {index} : {path} introuvable')
+    if not match.func.__module__.startswith(BATCH_MODULES):
+        raise BatchError(f'Opération {index} : {path} ne peut pas être appelé dans un lot')
+    return match
+
+
+def _subrequest(request, method, path, query, body):
+    """Requête Django pour une opération, avec les en-têtes de la requête du lot"""
+    payload = _dumps(body) if body is not None else b''
+    environ = {key: value for key, value in request.META.items() if isinstance(value, str)}
+    environ.pop('HTTP_CONTENT_LENGTH', None)
+    environ.update({
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'SCRIPT_NAME': '',
+        'QUERY_STRING': query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(payload)),
+        'wsgi.input': io.BytesIO(payload),
+        'wsgi.url_scheme': request.scheme,
+    })
+    subrequest = WSGIRequest(environ)
+    # Authentification déjà faite pour le lot (utilisé par rest_framework.request.Request)
+    subrequest._force_auth_user = request.user
+    subrequest._force_auth_token = request.auth
+    return subrequest
+
+
+def _call(request, operation):
+    method, path, query, body, match = operation
+    view = match.func
+    if iscoroutinefunction(view):
+        # Vues async de lecture (ASYNC_API) : exécutées dans la boucle, l'ORM revient sur ce thread
+        view = async_to_sync(view)
+    response = view(_subrequest(request, method, path, query, body), *match.args, **match.kwargs)
+    if hasattr(response, 'data'):
+        return response.status_code, response.data
+    content = response.content.decode(response.charset or 'utf-8') if response.content else None
+    if content and response.get('Content-Type', '').startswith('application/json'):
+        content = json.loads(content)
+    return response.status_code, content
+
+
+def run(request, operations, atomic=False):
+    """
+    Exécute les opérations dans l'ordre
+    Retourne (résultats [{id, status, body}], lot validé ?)
+    Les opérations sont toutes vérifiées (forme, route autorisée) avant la première exécution
+    """
+    if not isinstance(operations, list) or not operations:
+        raise BatchError('operations requis (liste d\'opérations)')
+    if len(operations) > settings.BATCH_MAX_OPERATIONS:
+        raise BatchError(f'Au plus {settings.BATCH_MAX_OPERATIONS} opérations par lot')
+    parsed = []
+    for index, operation in enumerate(operations):
+        method, path, query, body = parse_operation(index, operation)
+        parsed.append((method, path, query, body, resolve_view(index, path)))
+
+    results = []
+
+    def execute():
+        for operation, prepared in zip(operations, parsed):
+            try:
+                code, data = _call(request, prepared)
+            except Exception:
+                if atomic:
+                    raise
+                logger.exception('Opération de lot %s %s', prepared[0], prepared[1])
+                code, data = 500, {'error': 'Erreur interne'}
+            results.append({'id': operation.get('id'), 'status': code, 'body': data})
+            if atomic and code >= 400:
+                raise _Abort
+
+    if not atomic:
+        execute()
+        return results, True
+    try:
+        with transaction.atomic():
+            execute()
+    except _Abort:
+        return results, False
+    return results, True
@@ -0,0 +1,399 @@
+"""
+Microbenchmarks des chemins critiques (modèles, sérialiseurs, vues).
+
+Chaque benchmark est une fonction décorée par @benchmark qui reçoit les
+fixtures et renvoie la fonction à chronométrer ; la préparation faite
+avant le return n'est pas mesurée. Chaque round s'exécute dans un
+savepoint annulé ensuite : tous les rounds partent du même état.
+
+Les fixtures ont une taille fixe et sont générées avec une graine
+(--seed) pour que deux exécutions soient comparables. Voir la commande
+manage.py bench pour l'enregistrement et la comparaison à une baseline.
+"""
+import heapq
+import io
+import json
+import math
+import platform
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import django
+import pandas as pd
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from app.orders.models import CONFIRMATION_DELAY, Order, OrderHistory, OrderItem
+from app.orders.routing import plan_route
+from app.orders.serializers import OrderDetailFastSerializer, OrderDetailSerializer
+from app.products.models import Product
+from app.products.serializers import ProductFastSerializer, ProductSerializer
+from app.users.models import User
+from app.users.spatial import EARTH_RADIUS_M, GridIndex
+
+PRODUCTS = 1000
+ORDERS = 1000
+MAGASINIERS = 50
+LIVREURS = 10
+
+BENCHMARKS = {}
+
+
+class Benchmark:
+    def __init__(self, name, func, rounds):
+        self.name = name
+        self.func = func
+        self.rounds = rounds
+
+
+def benchmark(name, rounds=10):
+    def decorator(func):
+        BENCHMARKS[name] = Benchmark(name, func, rounds)
+        return func
+    return decorator
+
+
+class _Rollback(Exception):
+    pass
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Fixtures:
+    """Jeu de données de taille fixe, déterministe pour une graine donnée"""
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.factory = APIRequestFactory()
+
+        self.admin = User.objects.create(username='bench_admin', role='admin')
+        self.vendeur = User.objects.create(username='bench_vendeur', role='vendeur', first_name='Bench')
+        User.objects.bulk_create([
+            User(username=f'bench_magasinier_{i}', role='magasinier') for i in range(MAGASINIERS)
+        ])
+        User.objects.bulk_create([
+            User(username=f'bench_livreur_{i}', role='livreur') for i in range(LIVREURS)
+        ])
+
+        Product.objects.bulk_create([
+            Product(
+                name=f'bench_product_{i:05d}', unit=self.rng.choice(['kg', 'pièce', 'carton']),
+                price=Decimal(self.rng.randint(100, 50_000)) / 100, stock=10 ** 6,
+                is_validated=True, validated_at=timezone.now(), created_by=self.admin,
+            )
+            for i in range(PRODUCTS)
+        ])
+        self.products = list(
+            Product.objects.filter(name__startswith='bench_product_').order_by('pk').values_list('pk', 'price', 'name')
+        )
+
+        statuses = [choice for choice, _ in Order.STATUS_CHOICES]
+        orders = Order.objects.bulk_create([
+            Order(
+                order_number=f'BENCH-{i:06d}', seller=self.vendeur, seller_name='Bench',
+                customer_name=f'Client {i}', status=self.rng.choice(statuses), total_amount=0,
+            )
+            for i in range(ORDERS)
+        ])
+        if orders[0].pk is None:
+            orders = list(Order.objects.filter(order_number__startswith='BENCH-').order_by('pk'))
+        self.order_ids = [order.pk for order in orders]
+
+        items, history = [], []
+        for order in orders:
+            for pk, price, name in self.rng.sample(self.products, self.rng.randint(1, 5)):
+                quantity = self.rng.randint(1, 20)
+                items.append(OrderItem(
+                    order=order, product_id=pk, product_name=name, quantity=quantity,
+                    unit='pièce', unit_price=price, total_price=price * quantity,
+                ))
+            history.append(OrderHistory(
+                order=order, action='created', user=self.vendeur, user_role='vendeur', description='bench',
+            ))
+        OrderItem.objects.bulk_create(items)
+        OrderHistory.objects.bulk_create(history)
+
+    def call(self, method, path, user, data=None, format='json'):
+        request = getattr(self.factory, method)(path, data, format=format)
+        force_authenticate(request, user=user)
+        match = resolve(path)
+        return match.func(request, *match.args, **match.kwargs)
+
+
+def run(names, seed, rounds=None, stdout=None):
+    """Exécute les benchmarks demandés ; renvoie le rapport (dict sérialisable en JSON)"""
+    results = {}
+    try:
+        with transaction.atomic():
+            fixtures = Fixtures(seed)
+            for name in names:
+                bench = BENCHMARKS[name]
+                timings, counter = [], _QueryCounter()
+                for _ in range(rounds or bench.rounds):
+                    try:
+                        with transaction.atomic():
+                            func = bench.func(fixtures)
+                            counter.count = 0
+                            with connection.execute_wrapper(counter):
+                                start = time.perf_counter()
+                                func()
+                                timings.append(time.perf_counter() - start)
+                            raise _Rollback
+                    except _Rollback:
+                        pass
+                results[name] = summarize(timings, counter.count)
+                if stdout:
+                    stdout(name, results[name])
+            raise _Rollback
+    except _Rollback:
+        pass
+
+    return {
+        'created_at': timezone.now().isoformat(),
+        'seed': seed,
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'machine': platform.machine(),
+            'processor': platform.processor() or platform.machine(),
+        },
+        'benchmarks': results,
+    }
+
+
+def summarize(timings, queries):
+    median = statistics.median(timings)
+    return {
+        'rounds': len(timings),
+        'min': min(timings),
+        'max': max(timings),
+        'mean': statistics.fmean(timings),
+        'median': median,
+        'stddev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        'ops': 1 / median if median else None,
+        'queries': queries,
+    }
+
+
+def compare(baseline, current, threshold):
+    """(nom, médiane baseline, médiane actuelle, variation %, régression ?) pour chaque benchmark commun"""
+    rows = []
+    for name, stats in current['benchmarks'].items():
+        old = baseline['benchmarks'].get(name)
+        if old is None:
+            continue
+        change = (stats['median'] - old['median']) / old['median'] * 100
+        rows.append((name, old['median'], stats['median'], change, change > threshold))
+    return rows
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+# ----- Modèles -----
+
+@benchmark('order.save.number[100]', rounds=5)
+def order_save_number(fx):
+    """Order.save() : génération de order_number (une requête de recherche par commande)"""
+    def run():
+        for i in range(100):
+            Order(seller=fx.vendeur, customer_name=f'Client {i}', total_amount=0).save()
+    return run
+
+
+# ----- Sérialiseurs -----
+
+def _order_detail(serializer_class, size):
+    def factory(fx):
+        ids = fx.order_ids[:size]
+
+        def run():
+            queryset = Order.objects.filter(pk__in=ids).prefetch_related('items')
+            serializer_class(queryset, many=True).data
+        return run
+    return factory
+
+
+def _product_list(serializer_class, size):
+    def factory(fx):
+        ids = [pk for pk, _, _ in fx.products[:size]]
+
+        def run():
+            queryset = Product.objects.filter(pk__in=ids).select_related('created_by')
+            serializer_class(queryset, many=True).data
+        return run
+    return factory
+
+
+for _size, _rounds in ((1, 50), (100, 10), (1000, 3)):
+    benchmark(f'serializer.order_detail[{_size}]', rounds=_rounds)(_order_detail(OrderDetailSerializer, _size))
+    benchmark(f'serializer.order_detail_fast[{_size}]', rounds=_rounds)(_order_detail(OrderDetailFastSerializer, _size))
+
+for _size, _rounds in ((100, 10), (1000, 5)):
+    benchmark(f'serializer.product_list[{_size}]', rounds=_rounds)(_product_list(ProductSerializer, _size))
+    benchmark(f'serializer.product_list_fast[{_size}]', rounds=_rounds)(_product_list(ProductFastSerializer, _size))
+
+
+# ----- Vues -----
+
+def _create_order(lines):
+    def factory(fx):
+        data = {
+            'customer_name': 'Client bench',
+            'items': [{'product_id': pk, 'quantity': 2} for pk, _, _ in fx.products[:lines]],
+        }
+
+        def run():
+            response = fx.call('post', '/api/orders/create/', fx.vendeur, data)
+            assert response.status_code == 201, response.data
+        return run
+    return factory
+
+
+for _lines, _rounds in ((1, 20), (10, 10), (50, 5)):
+    benchmark(f'view.create_order[{_lines}]', rounds=_rounds)(_create_order(_lines))
+
+
+_excel_cache = {}
+
+
+def _excel(rows):
+    """Classeur de `rows` produits (généré une fois, hors mesure)"""
+    if rows not in _excel_cache:
+        rng = random.Random(rows)
+        buffer = io.BytesIO()
+        pd.DataFrame({
+            'name': [f'bench_import_{i:06d}' for i in range(rows)],
+            'description': ['Produit importé'] * rows,
+            'unit': [rng.choice(['kg', 'pièce', 'carton']) for _ in range(rows)],
+            'price': [rng.randint(100, 50_000) / 100 for _ in range(rows)],
+            'stock': [rng.randint(0, 1000) for _ in range(rows)],
+        }).to_excel(buffer, index=False)
+        _excel_cache[rows] = buffer.getvalue()
+    return _excel_cache[rows]
+
+
+def _import_products(rows):
+    def factory(fx):
+        content = _excel(rows)
+
+        def run():
+            upload = SimpleUploadedFile(
+                'products.xlsx', content,
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
+            response = fx.call('post', '/api/products/import/', fx.admin, {'file': upload}, format='multipart')
+            assert response.status_code == 200 and response.data['created'] == rows, response.data
+        return run
+    return factory
+
+
+for _rows, _rounds in ((1000, 3), (10000, 1)):
+    benchmark(f'view.import_products_excel[{_rows // 1000}k]', rounds=_rounds)(_import_products(_rows))
+
+
+@benchmark(f'notifications.fanout[{MAGASINIERS}]', rounds=10)
+def notification_fanout(fx):
+    """Confirmation automatique d'une commande : une notification par magasinier actif"""
+    order = Order(seller=fx.vendeur, customer_name='Client fan-out', total_amount=0)
+    order.save()
+    Order.objects.filter(pk=order.pk).update(
+        created_at=timezone.now() - timedelta(seconds=CONFIRMATION_DELAY + 1)
+    )
+    path = f'/api/orders/{order.pk}/status/'
+
+    def run():
+        response = fx.call('get', path, fx.vendeur)
+        assert response.data['confirmed'], response.data
+    return run
+
+
+# ----- Index spatial -----
+
+def _deliverer_points(rng, size):
+    """Positions autour de Casablanca (± 0,3°)"""
+    return [
+        (33.5 + rng.uniform(-0.3, 0.3), -7.6 + rng.uniform(-0.3, 0.3))
+        for _ in range(size)
+    ]
+
+
+def _knn_grid(size, queries=100, k=5):
+    def factory(fx):
+        # Mêmes positions que knn_brute, quels que soient les benchmarks lancés avant
+        rng = random.Random(size)
+        grid = GridIndex(settings.SPATIAL_GRID_CELL_DEGREES)
+        for user_id, (latitude, longitude) in enumerate(_deliverer_points(rng, size)):
+            grid.update(user_id, latitude, longitude)
+        points = _deliverer_points(rng, queries)
+
+        def run():
+            for latitude, longitude in points:
+                assert len(grid.nearest(latitude, longitude, k)) == k
+        return run
+    return factory
+
+
+def _knn_brute(size, queries=100, k=5):
+    """Parcours complet en Python : l'approche sans index"""
+    def factory(fx):
+        rng = random.Random(size)
+        positions = list(enumerate(_deliverer_points(rng, size)))
+        points = _deliverer_points(rng, queries)
+
+        def haversine(lat1, lon1, lat2, lon2):
+            dlat = math.radians(lat2 - lat1)
+            dlon = math.radians(lon2 - lon1)
+            a = (math.sin(dlat / 2) ** 2
+                 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2)
+            return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+        def run():
+            for latitude, longitude in points:
+                ranked = heapq.nsmallest(
+                    k, ((haversine(latitude, longitude, lat, lon), user_id) for user_id, (lat, lon) in positions)
+                )
+                assert len(ranked) == k
+        return run
+    return factory
+
+
+for _size in (1000, 10000):
+    benchmark(f'spatial.knn_grid[{_size // 1000}k]', rounds=5)(_knn_grid(_size))
+    benchmark(f'spatial.knn_brute[{_size // 1000}k]', rounds=3)(_knn_brute(_size))
+
+
+# ----- Tournées -----
+
+def _plan_route(stops):
+    def factory(fx):
+        rng = random.Random(stops)
+        origin = _deliverer_points(rng, 1)[0]
+        points = [(pk, latitude, longitude) for pk, (latitude, longitude) in enumerate(_deliverer_points(rng, stops))]
+
+        def run():
+            legs, _ = plan_route(points, origin)
+            assert len(legs) == stops
+        return run
+    return factory
+
+
+for _stops in (10, 50, 200):
+    benchmark(f'routing.plan[{_stops}]', rounds=10)(_plan_route(_stops))
@@ -0,0 +1,250 @@
+"""
+Routage des lectures vers les réplicas (DATABASE_REPLICA_URLS).
+
+Seules les requêtes HTTP GET/HEAD/OPTIONS lisent sur un réplica
+(ReplicaRoutingMiddleware) ; tout le reste — écritures, requêtes dans un
+transaction.atomic(), commandes de gestion, tâches — reste sur la base
+principale. Lecture de ses propres écritures :
+  - dans une requête, dès la première écriture, les lectures suivantes
+    repassent sur la base principale ;
+  - après une requête qui a écrit, l'utilisateur (identifié par son JWT)
+    lit sur la base principale pendant REPLICA_PIN_SECONDS. L'épinglage
+    est gardé dans le cache Django, qui doit être partagé entre workers
+    (CACHE_URL) : ReplicaRoutingMiddleware refuse de démarrer avec un
+    cache propre au processus (check_pin_cache).
+
+Chaque réplica est vérifié au plus toutes les REPLICA_HEALTH_INTERVAL
+secondes (connexion, et retard de réplication sur PostgreSQL au-delà de
+REPLICA_MAX_LAG_SECONDS) ; une erreur de connexion le retire aussitôt.
+La vérification tourne dans un thread de fond, sur une connexion dédiée
+limitée à REPLICA_CHECK_TIMEOUT secondes : un réplica qui ne répond plus
+ne bloque aucune requête.
+Sans réplica sain, les lectures retombent sur la base principale.
+
+Les vues GET qui écrivent après avoir lu (check_order_status) se
+décorent de @use_primary pour ne pas décider sur une lecture en retard.
+"""
+import functools
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.db.utils import InterfaceError, OperationalError
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Retard de réplication (secondes) ; 0 si le réplica a rejoué tout ce qu'il a reçu
+POSTGRES_LAG_SQL = (
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+)
+
+
+class RoutingState:
+    """Routage de la requête HTTP en cours"""
+
+    __slots__ = ('replica', 'wrote')
+
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+_state = ContextVar('db_routing', default=None)
+
+
+def begin(replica):
+    state = RoutingState(replica)
+    return state, _state.set(state)
+
+
+def end(token):
+    _state.reset(token)
+
+
+@contextmanager
+def primary():
+    """Bloc dont toutes les lectures vont à la base principale"""
+    state = _state.get()
+    if state is None:
+        yield
+        return
+    replica, state.replica = state.replica, False
+    try:
+        yield
+    finally:
+        state.replica = replica
+
+
+def use_primary(func):
+    """Décorateur de vue (sync ou async) : lectures sur la base principale"""
+    if iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with primary():
+                return await func(*args, **kwargs)
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with primary():
+                return func(*args, **kwargs)
+    return wrapper
+
+
+# ----- Épinglage par utilisateur -----
+
+def check_pin_cache():
+    """ImproperlyConfigured si l'épinglage ne serait pas vu par les autres workers"""
+    backend = caches[DEFAULT_CACHE_ALIAS]
+    if isinstance(backend, (LocMemCache, DummyCache)):
+        raise ImproperlyConfigured(
+            'DATABASE_REPLICA_URLS nécessite un cache partagé entre workers (CACHE_URL) : '
+            f'avec {type(backend).__name__}, un utilisateur qui vient d\'écrire lirait '
+            'sur un réplica en retard depuis les autres workers'
+        )
+
+
+def _pin_key(user_id):
+    return f'db-router:pin:{user_id}'
+
+
+def pin(user_id):
+    cache.set(_pin_key(user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+async def apin(user_id):
+    await cache.aset(_pin_key(user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return cache.get(_pin_key(user_id), False)
+
+
+async def ais_pinned(user_id):
+    return await cache.aget(_pin_key(user_id), False)
+
+
+# ----- Santé des réplicas -----
+
+class ReplicaHealth:
+    """État des réplicas dans le processus ; vérification paresseuse, un thread à la fois"""
+
+    def __init__(self, aliases):
+        self.aliases = list(aliases)
+        self.healthy = dict.fromkeys(self.aliases, True)
+        self.checked_at = dict.fromkeys(self.aliases, 0.0)
+        self.lock = threading.Lock()
+        self.rotation = itertools.count()
+
+    def pick(self):
+        """Prochain réplica sain (tourniquet), ou None"""
+        self.refresh()
+        healthy = [alias for alias in self.aliases if self.healthy[alias]]
+        if not healthy:
+            return None
+        return healthy[next(self.rotation) % len(healthy)]
+
+    def refresh(self):
+        """Lance la vérification des réplicas dus, hors de la requête ; pick() garde le dernier état connu"""
+        now = time.monotonic()
+        due = [alias for alias in self.aliases if now - self.checked_at[alias] >= settings.REPLICA_HEALTH_INTERVAL]
+        if not due or not self.lock.acquire(blocking=False):
+            return
+        try:
+            threading.Thread(target=self._check_due, args=(due,), name='replica-health', daemon=True).start()
+        except BaseException:
+            self.lock.release()
+            raise
+
+    def _check_due(self, due):
+        try:
+            for alias in due:
+                self.healthy[alias] = self.check(alias)
+                self.checked_at[alias] = time.monotonic()
+        finally:
+            self.lock.release()
+
+    @staticmethod
+    def check(alias):
+        # Connexion dédiée : ne pas toucher à celle du thread courant
+        conn = connections.create_connection(alias)
+        if conn.vendor == 'postgresql':
+            # Hors du pool, avec délais bornés : un réplica figé ne retient pas le thread
+            timeout = settings.REPLICA_CHECK_TIMEOUT
+            options = {key: value for key, value in conn.settings_dict.get('OPTIONS', {}).items() if key != 'pool'}
+            options['connect_timeout'] = max(1, round(timeout))
+            options['options'] = f"{options.get('options', '')} -c statement_timeout={int(timeout * 1000)}".strip()
+            conn.settings_dict = {**conn.settings_dict, 'OPTIONS': options}
+        try:
+            with conn.cursor() as cursor:
+                if conn.vendor != 'postgresql':
+                    cursor.execute('SELECT 1')
+                    return True
+                cursor.execute(POSTGRES_LAG_SQL)
+                lag = cursor.fetchone()[0]
+                return lag is None or float(lag) <= settings.REPLICA_MAX_LAG_SECONDS
+        except (OperationalError, InterfaceError):
+            return False
+        finally:
+            conn.close()
+
+    def mark_down(self, alias):
+        self.healthy[alias] = False
+        self.checked_at[alias] = time.monotonic()
+
+    def status(self):
+        return {alias: self.healthy[alias] for alias in self.aliases}
+
+
+health = ReplicaHealth(settings.REPLICA_DATABASES)
+
+
+def _watch_errors(execute, sql, params, many, context):
+    try:
+        return execute(sql, params, many, context)
+    except (OperationalError, InterfaceError):
+        health.mark_down(context['connection'].alias)
+        raise
+
+
+def install_error_watch(sender, connection, **kwargs):
+    if connection.alias in health.healthy and _watch_errors not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_watch_errors)
+
+
+connection_created.connect(install_error_watch, dispatch_uid='replica_error_watch')
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.replica or state.wrote:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return health.pick() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Mêmes données partout : un objet lu sur un réplica peut référencer un objet de la base principale
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Les réplicas reçoivent le schéma par la réplication
+        return db == DEFAULT_DB_ALIAS
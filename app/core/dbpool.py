@@ -0,0 +1,42 @@
+"""
+Statistiques des pools de connexions PostgreSQL (DB_POOL).
+
+Le pool est celui de Django (psycopg 3 + psycopg_pool, OPTIONS["pool"]) :
+un pool par base et par processus, partagé par les threads du worker ;
+chaque requête HTTP emprunte une connexion à la première requête SQL et
+la rend en fin de requête. Ce module lit les compteurs des pools déjà
+ouverts dans le processus, sans en créer ; /api/metrics/ les agrège sur
+tous les workers (voir app.core.metrics).
+"""
+from django.db import connections
+
+# Compteurs cumulés de psycopg_pool (remis à zéro seulement au redémarrage)
+COUNTERS = (
+    'requests_num', 'requests_queued', 'requests_wait_ms', 'requests_errors',
+    'returns_bad', 'connections_num', 'connections_ms', 'connections_errors',
+    'connections_lost', 'usage_ms',
+)
+# Mesures instantanées
+GAUGES = ('pool_min', 'pool_max', 'pool_size', 'pool_available', 'requests_waiting')
+
+
+def open_pools():
+    """{alias: pool} des pools ouverts dans ce processus"""
+    pools = {}
+    for alias in connections:
+        existing = getattr(connections[alias], '_connection_pools', None)
+        # Un pool créé mais pas encore ouvert n'a aucune connexion réelle
+        if existing and alias in existing and not existing[alias].closed:
+            pools[alias] = existing[alias]
+    return pools
+
+
+def stats():
+    """{alias: {compteur: valeur}} ; in_use = connexions empruntées en ce moment"""
+    result = {}
+    for alias, pool in open_pools().items():
+        values = pool.get_stats()
+        entry = {key: values.get(key, 0) for key in COUNTERS + GAUGES}
+        entry['in_use'] = entry['pool_size'] - entry['pool_available']
+        result[alias] = entry
+    return result
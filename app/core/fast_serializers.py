@@ -0,0 +1,278 @@
+"""
+Sérialiseurs compilés pour les endpoints de lecture les plus sollicités.
+
+Un FastSerializer s'appuie sur un ModelSerializer DRF existant : la liste
+des champs, leur ordre et leur format de sortie sont dérivés de ses
+déclarations, puis figés une fois pour toutes en une liste de
+convertisseurs appliqués directement à des lignes .values() (ou à des
+dicts équivalents). La sortie est identique à celle du sérialiseur DRF.
+
+Usage (même forme que DRF) :
+    OrderDetailFastSerializer(Order.objects.filter(...), many=True).data
+    await OrderDetailFastSerializer(Order.objects.filter(...), many=True).adata()
+"""
+import decimal
+import threading
+from collections import OrderedDict
+
+from django.db.models import QuerySet
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.settings import api_settings
+
+from .fieldsets import requested_fields
+
+# Plans compilés gardés par classe : fields vient de ?fields= / ?exclude=, les
+# combinaisons possibles sont trop nombreuses pour les garder toutes
+COMPILED_CACHE_SIZE = 64
+
+
+def _identity(value):
+    return value
+
+
+def _datetime_converter(tz):
+    def convert(value):
+        value = value.astimezone(tz).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+def _decimal_converter(field):
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return f'{value.quantize(exponent, rounding=rounding, context=context):f}'
+    return convert
+
+
+def _choices_converter(choices):
+    def convert(value):
+        return str(choices.get(value, value))
+    return convert
+
+
+class _Compiled:
+    """Plan figé d'un FastSerializer pour un fuseau horaire donné"""
+
+    def __init__(self, plan, nested, value_fields):
+        # plan : liste de (nom, clé, garde, convertisseur) ; si row[garde] est None,
+        # le champ est omis (équivalent du SkipField DRF sur une relation nulle)
+        self.plan = plan
+        # nested : liste de (nom, classe FastSerializer enfant)
+        self.nested = nested
+        # value_fields : colonnes à demander à .values()
+        self.value_fields = value_fields
+
+
+class FastSerializer:
+    """
+    Classe de base : définir serializer_class et, si besoin,
+    nested = {'champ': (FastSerializerEnfant, 'fk_vers_le_parent')},
+    requires (colonnes supplémentaires lues par compute) et compute(row, now).
+
+    fields=(...) ou ?fields= / ?exclude= / ?compact=1 (requête dans le contexte)
+    limitent à la fois la sortie et les colonnes lues par .values().
+    """
+    serializer_class = None
+    nested = {}
+    requires = ()
+    _compile_lock = threading.Lock()
+
+    def __init__(self, instance, many=False, context=None, fields=None):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+        if fields is None:
+            fields = requested_fields(self.context.get('request'), self.serializer_class)
+        self.fields = tuple(fields) if fields is not None else None
+
+    # ----- Compilation -----
+
+    @staticmethod
+    def _converter(field, tz):
+        if isinstance(field, serializers.DateTimeField):
+            output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+            if output_format is None:
+                return _identity
+            if output_format.lower() != ISO_8601:
+                return field.to_representation
+            return _datetime_converter(tz)
+        if isinstance(field, serializers.DecimalField):
+            coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+            if (field.decimal_places is None or field.normalize_output
+                    or field.localize or not coerce_to_string):
+                return field.to_representation
+            return _decimal_converter(field)
+        if isinstance(field, serializers.BooleanField):
+            return bool
+        if isinstance(field, serializers.IntegerField):
+            return int
+        if isinstance(field, serializers.CharField):
+            return str
+        if isinstance(field, PrimaryKeyRelatedField):
+            return _identity
+        return field.to_representation
+
+    @classmethod
+    def compile(cls, tz=None, fields=None):
+        tz = tz or timezone.get_current_timezone()
+        # L'ordre de sortie est celui du sérialiseur DRF : l'ordre de fields ne compte pas
+        cache_key = (tz, frozenset(fields) if fields is not None else None)
+        with cls._compile_lock:
+            if '_compiled' not in cls.__dict__:
+                cls._compiled = OrderedDict()
+            compiled = cls._compiled.get(cache_key)
+            if compiled is not None:
+                cls._compiled.move_to_end(cache_key)
+                return compiled
+
+        model = cls.serializer_class.Meta.model
+        plan, nested, value_fields = [], [], ['id']
+
+        for name, field in cls.serializer_class().fields.items():
+            if field.write_only or (fields is not None and name not in fields):
+                continue
+            if name in cls.nested:
+                nested.append((name, cls.nested[name][0]))
+                plan.append((name, name, None, _identity))
+                continue
+            if isinstance(field, serializers.SerializerMethodField):
+                plan.append((name, name, None, _identity))
+                continue
+
+            source = field.source
+            guard = None
+            convert = cls._converter(field, tz)
+            if source.startswith('get_') and source.endswith('_display'):
+                model_field = model._meta.get_field(source[4:-8])
+                key = model_field.name
+                convert = _choices_converter(dict(model_field.flatchoices))
+            elif '.' in source:
+                parts = source.split('.')
+                key = '__'.join(parts)
+                guard = '__'.join(parts[:-1])
+            else:
+                key = source
+            plan.append((name, key, guard, convert))
+            for k in (guard, key):
+                if k and k not in value_fields:
+                    value_fields.append(k)
+
+        for k in cls.requires:
+            if k not in value_fields:
+                value_fields.append(k)
+
+        compiled = _Compiled(plan, nested, value_fields)
+        with cls._compile_lock:
+            cls._compiled[cache_key] = compiled
+            while len(cls._compiled) > COMPILED_CACHE_SIZE:
+                cls._compiled.popitem(last=False)
+        return compiled
+
+    # ----- Chargement -----
+
+    @classmethod
+    def rows(cls, queryset, fields=None):
+        """Lignes .values() du queryset ; chaque relation imbriquée coûte une seule requête"""
+        compiled = cls.compile(fields=fields)
+        rows = list(queryset.values(*compiled.value_fields))
+        for name, child in compiled.nested:
+            children = cls._children_queryset(name, child, rows)
+            cls._attach(name, rows, children if children is not None else ())
+        return rows
+
+    @classmethod
+    async def arows(cls, queryset, fields=None):
+        """Version asynchrone de rows() (ORM async, vues de app.core.async_api)"""
+        compiled = cls.compile(fields=fields)
+        rows = [row async for row in queryset.values(*compiled.value_fields)]
+        for name, child in compiled.nested:
+            children = cls._children_queryset(name, child, rows)
+            cls._attach(name, rows, [row async for row in children] if children is not None else ())
+        return rows
+
+    @classmethod
+    def _children_queryset(cls, name, child, rows):
+        if not rows:
+            return None
+        fk = cls.nested[name][1]
+        child_model = child.serializer_class.Meta.model
+        return child_model.objects.filter(
+            **{f'{fk}__in': [row['id'] for row in rows]}
+        ).order_by('pk').values(f'{fk}_id', *child.compile().value_fields)
+
+    @classmethod
+    def _attach(cls, name, rows, children):
+        fk = cls.nested[name][1]
+        grouped = {row['id']: [] for row in rows}
+        for child_row in children:
+            grouped[child_row[f'{fk}_id']].append(child_row)
+        for row in rows:
+            row[name] = grouped[row['id']]
+
+    # ----- Sérialisation -----
+
+    def compute(self, row, now):
+        """Valeurs des SerializerMethodField (à surcharger)"""
+        return None
+
+    def _serialize(self, row, compiled, children, now):
+        computed = self.compute(row, now)
+        if children:
+            computed = computed or {}
+            for name, child, child_compiled in children:
+                computed[name] = [
+                    child._serialize(child_row, child_compiled, (), now)
+                    for child_row in row[name]
+                ]
+        if computed:
+            row = {**row, **computed}
+        data = {}
+        for name, key, guard, convert in compiled.plan:
+            if guard is not None and row.get(guard) is None:
+                continue
+            value = row[key]
+            data[name] = None if value is None else convert(value)
+        return data
+
+    @property
+    def data(self):
+        instance = self.instance
+        if isinstance(instance, QuerySet):
+            instance = self.rows(instance, self.fields)
+        return self._render(instance)
+
+    async def adata(self):
+        """Équivalent asynchrone de .data : await serializer.adata()"""
+        instance = self.instance
+        if isinstance(instance, QuerySet):
+            instance = await self.arows(instance, self.fields)
+        return self._render(instance)
+
+    def _render(self, instance):
+        # Un seul horodatage pour toute la réponse
+        now = self.context.get('now') or timezone.now()
+        tz = timezone.get_current_timezone()
+        compiled = self.compile(tz, self.fields)
+        children = [
+            (name, child(None), child.compile(tz))
+            for name, child in compiled.nested
+        ]
+
+        if isinstance(self.instance, QuerySet) and not self.many:
+            instance = instance[0] if instance else None
+        if self.many:
+            return [self._serialize(row, compiled, children, now) for row in instance]
+        if instance is None:
+            return None
+        return self._serialize(instance, compiled, children, now)
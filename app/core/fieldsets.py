@@ -0,0 +1,103 @@
+"""
+Sélection de champs commune à tous les sérialiseurs de lecture.
+
+    ?fields=id,order_number,status   ne renvoyer que ces champs
+    ?exclude=items,status_display    retirer ces champs
+    ?compact=1                       retirer les champs listés dans Meta.compact_exclude
+                                     (libellés d'affichage, relations imbriquées)
+
+La sélection est aussi répercutée sur l'ORM (only() / values()) : les
+colonnes qui ne servent à aucun champ demandé ne sont pas lues.
+"""
+from django.db.models import QuerySet
+from rest_framework import serializers
+
+TRUE_VALUES = ('1', 'true', 'yes', 'oui')
+
+
+def _split(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def requested_fields(request, serializer_class):
+    """Champs à sérialiser (dans l'ordre de Meta.fields), ou None pour tous"""
+    if request is None:
+        return None
+    params = getattr(request, 'query_params', request.GET)
+    fields = params.get('fields')
+    exclude = params.get('exclude')
+    compact = params.get('compact', '').lower() in TRUE_VALUES
+    if not (fields or exclude or compact):
+        return None
+
+    meta = serializer_class.Meta
+    selected = list(meta.fields)
+    if fields:
+        wanted = set(_split(fields))
+        selected = [name for name in selected if name in wanted]
+    removed = set(_split(exclude)) if exclude else set()
+    if compact:
+        removed.update(getattr(meta, 'compact_exclude', ()))
+    return tuple(name for name in selected if name not in removed)
+
+
+def restrict_queryset(queryset, serializer, fields):
+    """only()/select_related()/prefetch_related() correspondant aux champs gardés"""
+    columns, related, prefetch = [], [], []
+    for name in fields:
+        field = serializer.fields.get(name)
+        if field is None or field.write_only:
+            continue
+        if isinstance(field, serializers.SerializerMethodField):
+            # Dépendances inconnues : ne rien différer plutôt que provoquer des requêtes N+1
+            return queryset
+        if isinstance(field, serializers.ListSerializer):
+            prefetch.append(field.source)
+            continue
+        source = field.source
+        if source.startswith('get_') and source.endswith('_display'):
+            columns.append(source[4:-8])
+        elif '.' in source:
+            parts = source.split('.')
+            related.append('__'.join(parts[:-1]))
+            columns.append('__'.join(parts))
+        else:
+            columns.append(source)
+
+    # Querysets de related manager (order.history.all()) : la FK vers le parent
+    # est relue sur chaque ligne, elle ne doit pas être différée
+    columns.extend(field.name for field in getattr(queryset, '_known_related_objects', {}))
+
+    queryset = queryset.only(*columns) if columns else queryset.only('pk')
+    if related:
+        queryset = queryset.select_related(*related)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+class SparseFieldsMixin:
+    """
+    Pour les ModelSerializer : accepte fields=(...) ou lit la requête dans
+    le contexte ; en mode many=True, restreint aussi le queryset.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is None:
+            fields = requested_fields(self.context.get('request'), type(self))
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        fields = kwargs.get('fields')
+        if fields is None:
+            fields = requested_fields(kwargs.get('context', {}).get('request'), cls)
+        if fields is not None:
+            kwargs['fields'] = fields
+            if args and isinstance(args[0], QuerySet):
+                args = (restrict_queryset(args[0], cls(), fields),) + args[1:]
+        return super().many_init(*args, **kwargs)
@@ -0,0 +1,126 @@
+"""
+Journaux JSONL écrits par plusieurs workers (app.core.querylog, app.core.traffic).
+
+Un RotatingFileHandler sur un fichier partagé entre processus casse à la
+rotation : chaque worker renomme le fichier de son côté et continue
+d'écrire dans l'ancien, des lignes se perdent ou se mélangent. Chaque
+worker écrit donc dans son propre fichier <nom>.<pid><extension>
+(pda-traffic.jsonl -> pda-traffic.4242.jsonl), avec sa propre rotation ;
+les lecteurs parcourent les fichiers de tous les workers (worker_files).
+
+Place disque bornée :
+  - le maître gunicorn supprime au démarrage les fichiers des workers qui
+    ne tournent plus (remove_dead) ;
+  - à chaque démarrage de worker et à chaque rotation, les fichiers les
+    plus anciens sont supprimés au-delà d'une taille totale (enforce_cap),
+    sans jamais toucher au fichier courant d'un worker vivant.
+"""
+import glob
+import logging
+import os
+import re
+from logging.handlers import RotatingFileHandler
+
+from . import processes
+
+
+def worker_path(path, pid=None):
+    root, extension = os.path.splitext(path)
+    return f'{root}.{pid or os.getpid()}{extension}'
+
+
+class WorkerFileHandler(RotatingFileHandler):
+    """Fichier du processus courant ; applique la taille totale après chaque rotation"""
+
+    def __init__(self, path, max_bytes, backups, total_bytes=None):
+        self.pid = os.getpid()
+        self.base_path = path
+        self.total_bytes = total_bytes
+        super().__init__(worker_path(path, self.pid), maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+
+    def doRollover(self):
+        super().doRollover()
+        enforce_cap(self.base_path, self.total_bytes)
+
+
+def attach_handler(logger, path, max_bytes, backups, total_bytes=None):
+    """Handler du fichier de ce processus ; celui hérité du maître gunicorn est remplacé après le fork"""
+    pid = os.getpid()
+    if any(getattr(handler, 'pid', None) == pid for handler in logger.handlers):
+        return
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    enforce_cap(path, total_bytes)
+    handler = WorkerFileHandler(path, max_bytes, backups, total_bytes)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+def _all_files(path):
+    """[(fichier, pid ou None, fichier courant ?)] : fichiers de tous les workers et sauvegardes"""
+    root, extension = os.path.splitext(path)
+    pattern = re.compile(
+        re.escape(os.path.basename(root)) + r'(?:\.(\d+))?' + re.escape(extension) + r'(\.\d+)?$'
+    )
+    files = []
+    for candidate in glob.glob(f'{glob.escape(root)}*'):
+        match = pattern.match(os.path.basename(candidate))
+        if match:
+            pid = int(match.group(1)) if match.group(1) else None
+            files.append((candidate, pid, match.group(2) is None))
+    return files
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def remove_dead(path):
+    """Supprime les fichiers des workers qui ne tournent plus (maître gunicorn, avant les workers)"""
+    for candidate, pid, _ in _all_files(path):
+        # pid None : fichier unique d'avant le découpage par worker
+        if pid is None or not processes.is_alive(pid):
+            _remove(candidate)
+
+
+def enforce_cap(path, total_bytes):
+    """Supprime les fichiers les plus anciens tant que l'ensemble dépasse total_bytes"""
+    if not total_bytes:
+        return
+    files = []
+    for candidate, pid, current in _all_files(path):
+        try:
+            stat = os.stat(candidate)
+        except OSError:
+            continue
+        protected = current and pid is not None and processes.is_alive(pid)
+        files.append((stat.st_mtime, candidate, stat.st_size, protected))
+    total = sum(size for _, _, size, _ in files)
+    for _, candidate, size, protected in sorted(files):
+        if total <= total_bytes:
+            break
+        if not protected:
+            _remove(candidate)
+            total -= size
+
+
+def worker_files(path, backups):
+    """Fichiers existants de tous les workers : pour chacun le courant puis les sauvegardes (.1, .2, ...)"""
+    root, extension = os.path.splitext(path)
+    # path lui-même : fichier unique d'avant le découpage par worker, ou fichier d'un worker donné
+    currents = [path]
+    for candidate in sorted(glob.glob(f'{glob.escape(root)}.*{glob.escape(extension)}')):
+        if candidate[len(root) + 1:len(candidate) - len(extension)].isdigit():
+            currents.append(candidate)
+    files = []
+    for current in currents:
+        for candidate in [current] + [f'{current}.{i}' for i in range(1, backups + 1)]:
+            if os.path.exists(candidate):
+                files.append(candidate)
+    return files
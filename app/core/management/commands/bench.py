@@ -0,0 +1,90 @@
+"""
+Microbenchmarks des chemins critiques, comparés à une baseline.
+
+    python manage.py bench --list
+    python manage.py bench --save-baseline benchmarks/baseline.json
+    python manage.py bench --compare benchmarks/baseline.json --threshold 15
+    python manage.py bench -k serializer --output results.json
+
+Les benchmarks sont définis dans app/core/benchmarks.py. Avec --compare,
+la commande échoue (code de sortie 1) si la médiane d'un benchmark
+dépasse celle de la baseline de plus de --threshold %.
+La base est celle des settings ; tout est annulé à la fin.
+"""
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.core import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Microbenchmarks (modèles, sérialiseurs, vues) avec comparaison à une baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-k', '--filter', action='append', default=[],
+                            help='Ne lancer que les benchmarks dont le nom contient cette chaîne')
+        parser.add_argument('--list', action='store_true', help='Lister les benchmarks')
+        parser.add_argument('--rounds', type=int, default=None, help='Forcer le nombre de rounds')
+        parser.add_argument('--seed', type=int, default=1234)
+        parser.add_argument('--output', default=None, help='Écrire les résultats dans ce fichier JSON')
+        parser.add_argument('--save-baseline', default=None, help='Enregistrer les résultats comme baseline')
+        parser.add_argument('--compare', default=None, help='Baseline à comparer')
+        parser.add_argument('--threshold', type=float, default=10.0,
+                            help='Régression tolérée sur la médiane, en %% (défaut: 10)')
+
+    def handle(self, *args, **options):
+        names = [
+            name for name in benchmarks.BENCHMARKS
+            if not options['filter'] or any(f in name for f in options['filter'])
+        ]
+        if options['list']:
+            for name in names:
+                self.stdout.write(f'{name}  (rounds: {benchmarks.BENCHMARKS[name].rounds})')
+            return
+        if not names:
+            raise CommandError('Aucun benchmark ne correspond au filtre')
+        baseline = benchmarks.load(options['compare']) if options['compare'] else None
+
+        self.stdout.write(f"{'benchmark':<42}{'rounds':>7}{'median':>12}{'min':>12}{'stddev':>12}{'SQL':>6}")
+        report = benchmarks.run(names, options['seed'], options['rounds'], stdout=self.print_row)
+
+        for path in (options['output'], options['save_baseline']):
+            if path:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                with open(path, 'w') as f:
+                    json.dump(report, f, indent=2)
+                self.stdout.write(f'Résultats écrits dans {path}')
+
+        if baseline is not None:
+            self.print_comparison(baseline, report, options['threshold'])
+
+    def print_row(self, name, stats):
+        self.stdout.write(
+            f"{name:<42}{stats['rounds']:>7}{self.ms(stats['median']):>12}"
+            f"{self.ms(stats['min']):>12}{self.ms(stats['stddev']):>12}{stats['queries']:>6}"
+        )
+
+    @staticmethod
+    def ms(seconds):
+        return f'{seconds * 1000:.3f} ms'
+
+    def print_comparison(self, baseline, report, threshold):
+        rows = benchmarks.compare(baseline, report, threshold)
+        self.stdout.write(f"\nComparaison avec la baseline du {baseline['created_at']} (seuil {threshold:g} %)")
+        if baseline.get('environment') != report['environment']:
+            self.stdout.write(self.style.WARNING(
+                f"Environnement différent : {baseline.get('environment')} → {report['environment']}"
+            ))
+        regressions = []
+        for name, old, new, change, regressed in rows:
+            line = f'{name:<42}{self.ms(old):>12} → {self.ms(new):>12}  {change:+7.1f} %'
+            if regressed:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(line + '  RÉGRESSION'))
+            else:
+                self.stdout.write(line)
+        if regressions:
+            raise CommandError(f'{len(regressions)} régression(s) au-delà de {threshold:g} % : {", ".join(regressions)}')
+        self.stdout.write(self.style.SUCCESS('Aucune régression'))
@@ -0,0 +1,329 @@
+"""
+Comparaison WSGI (gunicorn, workers à threads) / ASGI (uvicorn, vues async)
+sur les endpoints de lecture à forte concurrence.
+
+    python manage.py bench_asgi --concurrency 10,50,100,200 --duration 15 --workers 2
+
+Pour chaque serveur et chaque niveau de concurrence, un serveur neuf est
+lancé sur un port libre avec les réglages courants (même base), puis
+N clients en boucle fermée enchaînent les requêtes pendant --duration :
+  - débit, p50/p95/p99 et erreurs (réseau, 5xx) ;
+  - RSS de l'arbre de processus du serveur (maître + workers), au repos
+    après échauffement puis en pointe sous charge ; la mémoire par requête
+    en cours est (pointe - repos) / N.
+La concurrence soutenue est le plus haut niveau dont le p95 reste sous
+--p95-budget avec moins de 1 % d'erreurs.
+
+Les clients sont des threads d'un seul processus : au-delà de quelques
+centaines, le générateur de charge devient lui-même la limite. Les écarts
+n'apparaissent que si les requêtes attendent réellement la base (PostgreSQL
+distante) : sur SQLite locale, les deux serveurs sont limités par le CPU.
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app.core.management.commands.loadtest import Client, Command as LoadTest, Recorder, summarize
+from app.orders.models import Order
+
+ERROR_BUDGET = 0.01
+
+
+def _server_command(kind, port, options):
+    if kind == 'wsgi':
+        return [
+            sys.executable, '-m', 'gunicorn', 'Backend.wsgi:application',
+            '--bind', f'127.0.0.1:{port}', '--workers', str(options['workers']),
+            '--threads', str(options['threads']), '--log-level', 'warning',
+        ]
+    return [
+        sys.executable, '-m', 'uvicorn', 'Backend.asgi:application',
+        '--host', '127.0.0.1', '--port', str(port), '--workers', str(options['workers']),
+        '--log-level', 'warning', '--no-access-log',
+    ]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _rss_kb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def tree_pids(root):
+    """Un processus et tous ses descendants (Linux, /proc)"""
+    parents = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # Le nom du programme (2e champ) peut contenir des espaces : couper après « ) »
+                parents[int(entry)] = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    pids, stack = [], [root]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(child for child, parent in parents.items() if parent == pid)
+    return pids
+
+
+def tree_rss(root):
+    """RSS (Ko) d'un processus et de tous ses descendants"""
+    return sum(_rss_kb(pid) for pid in tree_pids(root))
+
+
+class PeakSampler(threading.Thread):
+    def __init__(self, pid, interval=0.2):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.peak = max(self.peak, tree_rss(self.pid))
+            self.stop_event.wait(self.interval)
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+        self.peak = max(self.peak, tree_rss(self.pid))
+
+
+class Command(BaseCommand):
+    help = 'Compare WSGI (gunicorn) et ASGI (uvicorn) : concurrence soutenue et mémoire par requête en cours'
+    # En-tête de la première colonne du tableau (bench_pool : variante)
+    variant_label = 'serveur'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', default='wsgi,asgi')
+        self.add_load_arguments(parser)
+
+    @staticmethod
+    def add_load_arguments(parser):
+        parser.add_argument('--concurrency', default='10,50,100,200', help='Niveaux de concurrence, séparés par des virgules')
+        parser.add_argument('--duration', type=float, default=15, help='Durée de chaque palier (secondes)')
+        parser.add_argument('--warmup', type=float, default=2)
+        parser.add_argument('--workers', type=int, default=2, help='Processus par serveur')
+        parser.add_argument('--threads', type=int, default=4, help='Threads par worker gunicorn')
+        parser.add_argument('--path', action='append', default=[],
+                            help='Endpoint GET à interroger (répétable ; défaut : notifications, file magasinier, détail)')
+        parser.add_argument('--p95-budget', type=float, default=1000, help='p95 maximal (ms) pour un palier soutenu')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--report', default=None, help='Écrire le rapport JSON dans ce fichier')
+
+    def variants(self, options):
+        """{libellé: (serveur, variables d'environnement)}"""
+        servers = [kind.strip() for kind in options['servers'].split(',') if kind.strip()]
+        for kind in servers:
+            if kind not in ('wsgi', 'asgi'):
+                raise CommandError(f'Serveur inconnu : {kind} (wsgi, asgi)')
+        return {kind: (kind, {}) for kind in servers}
+
+    def handle(self, *args, **options):
+        if not os.path.isdir('/proc'):
+            raise CommandError('Mesure mémoire via /proc : Linux uniquement')
+        variants = self.variants(options)
+        levels = sorted({int(level) for level in options['concurrency'].split(',') if level.strip()})
+
+        user = LoadTest().setup_fixtures({'magasinier': 1})['magasinier'][0]
+        paths = options['path'] or self.default_paths()
+
+        results = {}
+        for label, (kind, env) in variants.items():
+            levels_stats = {}
+            for level in levels:
+                self.stdout.write(f'{label} : {level} clients...')
+                levels_stats[level] = self.run_level(kind, level, user.username, paths, options, env)
+            results[label] = {
+                'server': kind,
+                'env': env,
+                'levels': levels_stats,
+                'sustained_concurrency': max(
+                    (level for level, stats in levels_stats.items()
+                     if stats['error_rate'] < ERROR_BUDGET and stats['p95_ms'] <= options['p95_budget']),
+                    default=0,
+                ),
+            }
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'settings': settings.SETTINGS_MODULE,
+            'database': settings.DATABASES['default']['ENGINE'],
+            'paths': paths,
+            'workers': options['workers'],
+            'threads': options['threads'],
+            'duration_s': options['duration'],
+            'p95_budget_ms': options['p95_budget'],
+            'variants': results,
+        }
+        self.print_report(report)
+        if options['report']:
+            with open(options['report'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Rapport écrit dans {options['report']}"))
+
+    @staticmethod
+    def default_paths():
+        paths = ['/api/notifications/', '/api/orders/magasinier/list/?compact=1']
+        order_id = Order.objects.order_by('-pk').values_list('pk', flat=True).first()
+        if order_id is not None:
+            paths.append(f'/api/orders/{order_id}/')
+        return paths
+
+    def run_level(self, kind, level, username, paths, options, extra_env):
+        port = _free_port()
+        url = f'http://127.0.0.1:{port}'
+        # Spool de métriques propre à ce serveur : pas de mélange avec les workers d'un autre palier
+        spool = tempfile.TemporaryDirectory()
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE,
+            'ASYNC_API': 'True' if kind == 'asgi' else 'False',
+            'METRICS_SPOOL_DIR': spool.name,
+            'METRICS_TOKEN': '',
+            **extra_env,
+        }
+        # Journal dans un fichier : un tube plein bloquerait le serveur
+        log = tempfile.TemporaryFile()
+        server = subprocess.Popen(
+            _server_command(kind, port, options), env=env, stdout=subprocess.DEVNULL, stderr=log,
+        )
+        try:
+            self.wait_ready(server, url, log)
+            recorder = Recorder()
+            client = Client(url, recorder, options['timeout'])
+            client.login(username)
+
+            # Échauffement : imports paresseux, connexions, caches de chaque worker
+            self.drive(client, paths, max(options['workers'] * 2, 4), options['warmup'], Recorder())
+            idle = tree_rss(server.pid)
+
+            sampler = PeakSampler(server.pid)
+            sampler.start()
+            elapsed = self.drive(client, paths, level, options['duration'], recorder)
+            sampler.stop()
+            server_metrics = self.server_metrics(url, options)
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
+            log.close()
+            spool.cleanup()
+
+        samples = [sample for endpoint_samples in recorder.samples.values() for sample in endpoint_samples]
+        if not samples:
+            raise CommandError(f'{kind} : aucune réponse reçue')
+        stats = summarize(samples, elapsed, False)
+        del stats['conflicts'], stats['conflict_rate']
+        stats.update({
+            'idle_rss_mb': round(idle / 1024, 1),
+            'peak_rss_mb': round(sampler.peak / 1024, 1),
+            'kb_per_inflight': round(max(0, sampler.peak - idle) / level, 1),
+        })
+        stats.update(server_metrics)
+        return stats
+
+    def server_metrics(self, url, options):
+        """Mesures côté serveur ajoutées au palier (voir bench_pool)"""
+        return {}
+
+    @staticmethod
+    def prometheus(url, timeout=10):
+        """{(nom, étiquettes): valeur} lus sur /api/metrics/ du serveur testé"""
+        with urllib.request.urlopen(url + '/api/metrics/', timeout=timeout) as response:
+            text = response.read().decode()
+        values = {}
+        for line in text.splitlines():
+            if not line or line.startswith('#'):
+                continue
+            name_labels, value = line.rsplit(' ', 1)
+            name, _, labels = name_labels.partition('{')
+            values[(name, labels.rstrip('}'))] = float(value)
+        return values
+
+    @staticmethod
+    def wait_ready(server, url, log, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                log.seek(0)
+                raise CommandError(f'Le serveur s\'est arrêté au démarrage :\n{log.read().decode()[-2000:]}')
+            try:
+                urllib.request.urlopen(url + '/api/notifications/', timeout=1)
+                return
+            except urllib.error.HTTPError:
+                # 401 : le serveur répond
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f'Le serveur ne répond pas sur {url}')
+
+    @staticmethod
+    def drive(template, paths, clients, duration, recorder):
+        """clients threads en boucle fermée pendant duration secondes ; renvoie la durée réelle"""
+        deadline = time.monotonic() + duration
+
+        def loop(offset):
+            client = Client(template.base_url, recorder, template.timeout)
+            client.token = template.token
+            i = offset
+            while time.monotonic() < deadline:
+                path = paths[i % len(paths)]
+                client.call('GET', path, path.split('?')[0])
+                i += 1
+
+        start = time.monotonic()
+        threads = [threading.Thread(target=loop, args=(i,), daemon=True) for i in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.monotonic() - start
+
+    def print_report(self, report):
+        width = max([len(self.variant_label)] + [len(label) for label in report['variants']]) + 2
+        self.stdout.write(
+            f"\n{self.variant_label:<{width}}{'clients':>8}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}"
+            f"{'err%':>7}{'RSS repos':>11}{'RSS pointe':>12}{'Ko/requête':>12}"
+        )
+        for label, result in report['variants'].items():
+            for level, stats in result['levels'].items():
+                self.stdout.write(
+                    f"{label:<{width}}{level:>8}{stats['throughput_rps']:>9.1f}{stats['p50_ms']:>9.1f}"
+                    f"{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}{stats['error_rate'] * 100:>7.1f}"
+                    f"{stats['idle_rss_mb']:>10.1f}M{stats['peak_rss_mb']:>11.1f}M{stats['kb_per_inflight']:>12.1f}"
+                )
+        for label, result in report['variants'].items():
+            self.stdout.write(
+                f"{label} : concurrence soutenue {result['sustained_concurrency']} "
+                f"(p95 ≤ {report['p95_budget_ms']:g} ms, erreurs < {ERROR_BUDGET:.0%})"
+            )
@@ -0,0 +1,70 @@
+"""
+Benchmark : requêtes SQL et latence par requête authentifiée,
+JWTAuthentication (simplejwt) vs CachedJWTAuthentication.
+
+    python manage.py bench_auth --requests 200
+
+Un utilisateur de test est créé dans une transaction annulée à la fin.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from app.authentication.backends import CachedJWTAuthentication, user_cache
+from app.users.models import User
+
+ENDPOINTS = ['/api/auth/me/', '/api/notifications/', '/api/products/?compact=1']
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare les requêtes SQL par requête HTTP avec et sans cache d'utilisateurs JWT"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options['requests'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, count):
+        user = User.objects.create(username='bench-auth', role='vendeur')
+        token = str(RefreshToken.for_user(user).access_token)
+        factory = APIRequestFactory()
+
+        self.stdout.write(f"{'endpoint':<30}{'auth':<24}{'SQL/req':>9}{'µs/req':>10}")
+        for path in ENDPOINTS:
+            view = resolve(path.split('?')[0]).func
+            original = view.cls.authentication_classes
+            try:
+                for auth_class in (JWTAuthentication, CachedJWTAuthentication):
+                    view.cls.authentication_classes = [auth_class]
+                    user_cache.clear()
+                    queries, elapsed = 0, 0.0
+                    for _ in range(count):
+                        request = factory.get(path, HTTP_AUTHORIZATION=f'Bearer {token}')
+                        with CaptureQueriesContext(connection) as captured:
+                            start = time.perf_counter()
+                            response = view(request)
+                            response.render()
+                            elapsed += time.perf_counter() - start
+                        queries += len(captured)
+                    self.stdout.write(
+                        f'{path:<30}{auth_class.__name__:<24}'
+                        f'{queries / count:>9.2f}{elapsed / count * 1e6:>10.0f}'
+                    )
+            finally:
+                view.cls.authentication_classes = original
@@ -0,0 +1,119 @@
+"""
+Benchmark : JSONRenderer/JSONParser DRF (json standard) vs FastJSONRenderer/FastJSONParser.
+
+    python manage.py bench_json --orders 1000 --products 2000
+
+Les payloads sont construits en mémoire (aucun accès base) : commandes
+et produits tels que renvoyés par les endpoints de liste, et une variante
+« brute » contenant des Decimal et des datetimes aware Africa/Casablanca.
+"""
+import io
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from app.core.parsers import FastJSONParser
+from app.core.renderers import FastJSONRenderer
+from app.orders.serializers import OrderDetailFastSerializer
+from app.products.serializers import ProductFastSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare le rendu et le parsing JSON standard vs orjson'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=1000)
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        now = timezone.localtime()
+
+        products = [self._product_row(i, rng, now) for i in range(options['products'])]
+        orders = [self._order_row(i, rng, now, products) for i in range(options['orders'])]
+
+        payloads = [
+            ('list_products', ProductFastSerializer(products, many=True).data),
+            ('vendeur_history', OrderDetailFastSerializer(orders, many=True, context={'now': now}).data),
+            ('brut (Decimal/datetime)', [
+                {'id': row['id'], 'total_amount': row['total_amount'], 'created_at': row['created_at'],
+                 'confirmed_at': row['confirmed_at'], 'status': row['status']}
+                for row in orders
+            ]),
+        ]
+
+        slow_renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+        slow_parser, fast_parser = JSONParser(), FastJSONParser()
+        repeat = options['repeat']
+
+        self.stdout.write(
+            f"{'payload':<26}{'Ko':>8}{'rendu std':>12}{'rendu orjson':>14}{'gain':>7}"
+            f"{'parse std':>12}{'parse orjson':>14}{'gain':>7}  identique"
+        )
+        for name, data in payloads:
+            slow_out = slow_renderer.render(data)
+            fast_out = fast_renderer.render(data)
+            render_slow = self._time(lambda: slow_renderer.render(data), repeat)
+            render_fast = self._time(lambda: fast_renderer.render(data), repeat)
+            parse_slow = self._time(lambda: slow_parser.parse(io.BytesIO(slow_out)), repeat)
+            parse_fast = self._time(lambda: fast_parser.parse(io.BytesIO(slow_out)), repeat)
+            self.stdout.write(
+                f'{name:<26}{len(slow_out) / 1024:>8.0f}'
+                f'{render_slow * 1000:>10.2f}ms{render_fast * 1000:>12.2f}ms{render_slow / render_fast:>6.1f}x'
+                f'{parse_slow * 1000:>10.2f}ms{parse_fast * 1000:>12.2f}ms{parse_slow / parse_fast:>6.1f}x'
+                f'  {"oui" if slow_out == fast_out else "NON"}'
+            )
+
+    @staticmethod
+    def _product_row(i, rng, now):
+        created = now - timedelta(days=rng.randint(0, 365), seconds=rng.randint(0, 86400))
+        return {
+            'id': i + 1, 'name': f'Produit {i}', 'description': 'Carton de 12 unités' if i % 3 else None,
+            'unit': rng.choice(['kg', 'unité', 'carton', 'litre']),
+            'price': Decimal(rng.randint(100, 99999)) / 100, 'stock': rng.randint(0, 1000),
+            'is_validated': True, 'is_active': True,
+            'created_by': 1 if i % 4 else None, 'created_by__username': 'admin' if i % 4 else None,
+            'validated_at': created, 'created_at': created, 'updated_at': created + timedelta(hours=1),
+        }
+
+    @staticmethod
+    def _order_row(i, rng, now, products):
+        created = now - timedelta(minutes=rng.randint(0, 60 * 24 * 30))
+        status = rng.choice(['pending', 'confirmed', 'preparing', 'ready', 'in_delivery', 'delivered'])
+        items = []
+        for j, product in enumerate(rng.sample(products, 4)):
+            quantity = rng.randint(1, 20)
+            items.append({
+                'id': i * 10 + j, 'product': product['id'], 'product_name': product['name'],
+                'quantity': quantity, 'unit': product['unit'], 'unit_price': product['price'],
+                'total_price': product['price'] * quantity,
+            })
+        return {
+            'id': i + 1, 'order_number': f'CMD-{created:%Y%m%d%H%M%S%f}-0001',
+            'seller': 2, 'seller_name': 'Vendeur Test', 'customer_name': f'Client {i}',
+            'status': status, 'items': items,
+            'total_amount': sum(item['total_price'] for item in items),
+            'deliverer': 5 if status in ('in_delivery', 'delivered') else None,
+            'deliverer_name': 'Livreur Test' if status in ('in_delivery', 'delivered') else None,
+            'cancellation_reason': None, 'created_at': created,
+            'confirmed_at': created + timedelta(minutes=3) if status != 'pending' else None,
+            'prepared_at': None, 'delivered_at': None, 'cancelled_at': None,
+        }
+
+    @staticmethod
+    def _time(fn, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -0,0 +1,81 @@
+"""
+Latence avec et sans pool de connexions PostgreSQL (DB_POOL).
+
+    python manage.py bench_pool --concurrency 10,50,100 --duration 15 --server wsgi
+
+Même protocole que bench_asgi (serveur neuf par palier, clients en boucle
+fermée), mais le serveur est fixe et c'est la gestion des connexions qui
+varie :
+  - direct     : une connexion ouverte puis fermée à chaque requête HTTP
+                 (CONN_MAX_AGE=0) ;
+  - persistent : une connexion par thread, gardée entre les requêtes
+                 (CONN_MAX_AGE=600) ;
+  - pooled     : pool psycopg partagé par les threads du worker (DB_POOL).
+Pour la variante pooled, l'attente moyenne pour obtenir une connexion du
+pool est lue sur /api/metrics/ (pda_db_pool_checkout_wait_seconds_total).
+
+Sous ASGI (--server asgi), chaque requête async tourne dans son propre
+contexte : sans pool, une connexion est ouverte par requête quel que soit
+CONN_MAX_AGE ; c'est le cas où le pool compte le plus.
+"""
+from django.conf import settings
+from django.core.management.base import CommandError
+
+from app.core.management.commands.bench_asgi import Command as BenchASGI
+
+VARIANTS = {
+    'direct': {'DB_POOL': 'False', 'DB_CONN_MAX_AGE': '0'},
+    'persistent': {'DB_POOL': 'False', 'DB_CONN_MAX_AGE': '600'},
+    'pooled': {'DB_POOL': 'True'},
+}
+
+
+class Command(BenchASGI):
+    help = 'Compare la latence sous concurrence avec et sans pool de connexions PostgreSQL'
+    variant_label = 'variante'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--variants', default=','.join(VARIANTS))
+        parser.add_argument('--server', choices=['wsgi', 'asgi'], default='wsgi')
+        parser.add_argument('--pool-max-size', type=int, default=None,
+                            help='DB_POOL_MAX_SIZE pour la variante pooled (défaut : réglage courant)')
+        self.add_load_arguments(parser)
+
+    def variants(self, options):
+        if settings.DATABASES['default']['ENGINE'] != 'django.db.backends.postgresql':
+            raise CommandError('Le pool de connexions nécessite PostgreSQL (DATABASE_URL)')
+        result = {}
+        for label in (label.strip() for label in options['variants'].split(',')):
+            if not label:
+                continue
+            if label not in VARIANTS:
+                raise CommandError(f"Variante inconnue : {label} ({', '.join(VARIANTS)})")
+            env = dict(VARIANTS[label])
+            if label == 'pooled' and options['pool_max_size']:
+                env['DB_POOL_MAX_SIZE'] = str(options['pool_max_size'])
+            result[label] = (options['server'], env)
+        return result
+
+    def server_metrics(self, url, options):
+        values = self.prometheus(url, options['timeout'])
+        checkouts = values.get(('pda_db_pool_checkouts_total', 'database="default"'))
+        if not checkouts:
+            return {}
+        wait = values.get(('pda_db_pool_checkout_wait_seconds_total', 'database="default"'), 0)
+        queued = values.get(('pda_db_pool_checkouts_queued_total', 'database="default"'), 0)
+        return {
+            'pool_checkouts': int(checkouts),
+            'pool_queued_rate': round(queued / checkouts, 4),
+            'pool_wait_avg_ms': round(wait * 1000 / checkouts, 2),
+        }
+
+    def print_report(self, report):
+        super().print_report(report)
+        for label, result in report['variants'].items():
+            for level, stats in result['levels'].items():
+                if 'pool_checkouts' in stats:
+                    self.stdout.write(
+                        f"{label} {level} clients : {stats['pool_checkouts']} emprunts, "
+                        f"{stats['pool_queued_rate']:.1%} en attente, "
+                        f"attente moyenne {stats['pool_wait_avg_ms']:.2f} ms"
+                    )
@@ -0,0 +1,187 @@
+"""
+Mémoire partagée et privée des workers gunicorn, avec et sans préchargement.
+
+    python manage.py bench_prefork --workers 4 --duration 20
+    python manage.py bench_prefork --pid 12345      # serveur déjà lancé
+
+Deux serveurs sont lancés tour à tour avec les mêmes réglages :
+  - standard : gunicorn Backend.wsgi:application (chaque worker importe tout) ;
+  - preload  : gunicorn -c python:Backend.gunicorn_conf (import et
+               préparation dans le maître, gc.freeze(), fork).
+Après le démarrage puis après --duration secondes de trafic de lecture
+(les pages partagées se « salissent » au fil des requêtes), la commande
+lit /proc/<pid>/smaps_rollup du maître et de chaque worker :
+  - partagé : pages encore communes avec d'autres processus ;
+  - privé   : pages propres au worker (ce que coûte un worker de plus) ;
+  - PSS     : part proportionnelle ; la somme des PSS est l'empreinte
+              réelle du serveur.
+Linux uniquement.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app.core.management.commands.bench_asgi import Command as BenchASGI, _free_port, tree_pids
+from app.core.management.commands.loadtest import Client, Command as LoadTest, Recorder
+
+FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+def smaps(pid):
+    """{champ: Ko} de /proc/<pid>/smaps_rollup"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            name, _, rest = line.partition(':')
+            if name in FIELDS:
+                values[name] = int(rest.split()[0])
+    return {
+        'rss_kb': values.get('Rss', 0),
+        'pss_kb': values.get('Pss', 0),
+        'shared_kb': values.get('Shared_Clean', 0) + values.get('Shared_Dirty', 0),
+        'private_kb': values.get('Private_Clean', 0) + values.get('Private_Dirty', 0),
+    }
+
+
+def measure(master):
+    """Mémoire du maître et de chaque worker, plus les totaux"""
+    workers = tree_pids(master)[1:]
+    result = {
+        'master': smaps(master),
+        'workers': {pid: smaps(pid) for pid in workers},
+    }
+    all_stats = [result['master'], *result['workers'].values()]
+    result['total_pss_kb'] = sum(stats['pss_kb'] for stats in all_stats)
+    if workers:
+        result['avg_worker_private_kb'] = sum(stats['private_kb'] for stats in result['workers'].values()) // len(workers)
+        result['avg_worker_shared_kb'] = sum(stats['shared_kb'] for stats in result['workers'].values()) // len(workers)
+    return result
+
+
+class Command(BaseCommand):
+    help = 'Mémoire partagée / privée par worker gunicorn, avec et sans préchargement (gc.freeze)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', default='standard,preload')
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--duration', type=float, default=15, help='Trafic de lecture avant la seconde mesure (secondes)')
+        parser.add_argument('--clients', type=int, default=8)
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--pid', type=int, default=None, help='Mesurer seulement le serveur gunicorn de ce maître')
+        parser.add_argument('--report', default=None, help='Écrire le rapport JSON dans ce fichier')
+
+    def handle(self, *args, **options):
+        if not os.path.exists('/proc/self/smaps_rollup'):
+            raise CommandError('Mesure via /proc/<pid>/smaps_rollup : Linux 4.14+ uniquement')
+        if options['pid']:
+            self.print_measure(f"pid {options['pid']}", measure(options['pid']))
+            return
+
+        modes = [mode.strip() for mode in options['modes'].split(',') if mode.strip()]
+        for mode in modes:
+            if mode not in ('standard', 'preload'):
+                raise CommandError(f'Mode inconnu : {mode} (standard, preload)')
+        user = LoadTest().setup_fixtures({'magasinier': 1})['magasinier'][0]
+        paths = BenchASGI.default_paths()
+
+        results = {}
+        for mode in modes:
+            self.stdout.write(f'{mode} : {options["workers"]} workers...')
+            results[mode] = self.run_mode(mode, user.username, paths, options)
+            for phase in ('started', 'after_traffic'):
+                self.print_measure(f'{mode} ({phase})', results[mode][phase])
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'settings': settings.SETTINGS_MODULE,
+            'workers': options['workers'],
+            'duration_s': options['duration'],
+            'modes': results,
+        }
+        self.print_summary(report)
+        if options['report']:
+            with open(options['report'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Rapport écrit dans {options['report']}"))
+
+    @staticmethod
+    def server_command(mode, port, workers):
+        command = [sys.executable, '-m', 'gunicorn']
+        if mode == 'preload':
+            command += ['-c', 'python:Backend.gunicorn_conf']
+        return command + [
+            'Backend.wsgi:application', '--bind', f'127.0.0.1:{port}',
+            '--workers', str(workers), '--threads', '1', '--log-level', 'warning',
+        ]
+
+    def run_mode(self, mode, username, paths, options):
+        port = _free_port()
+        url = f'http://127.0.0.1:{port}'
+        spool = tempfile.TemporaryDirectory()
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE,
+            'ASYNC_API': 'False',
+            'METRICS_SPOOL_DIR': spool.name,
+        }
+        log = tempfile.TemporaryFile()
+        server = subprocess.Popen(
+            self.server_command(mode, port, options['workers']), env=env, stdout=subprocess.DEVNULL, stderr=log,
+        )
+        try:
+            BenchASGI.wait_ready(server, url, log)
+            self.wait_workers(server.pid, options['workers'])
+            started = measure(server.pid)
+
+            client = Client(url, Recorder(), options['timeout'])
+            client.login(username)
+            BenchASGI.drive(client, paths, options['clients'], options['duration'], Recorder())
+            after_traffic = measure(server.pid)
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
+            log.close()
+            spool.cleanup()
+        return {'started': started, 'after_traffic': after_traffic}
+
+    @staticmethod
+    def wait_workers(master, count, timeout=30):
+        deadline = time.monotonic() + timeout
+        while len(tree_pids(master)) - 1 < count:
+            if time.monotonic() > deadline:
+                raise CommandError(f'Moins de {count} workers démarrés')
+            time.sleep(0.2)
+        # Laisser les derniers workers finir leur initialisation
+        time.sleep(1)
+
+    def print_measure(self, label, result):
+        self.stdout.write(f"\n{label}")
+        self.stdout.write(f"{'processus':<14}{'RSS':>10}{'PSS':>10}{'partagé':>10}{'privé':>10}  (Mo)")
+        rows = [('maître', result['master'])] + [(f'worker {pid}', stats) for pid, stats in result['workers'].items()]
+        for name, stats in rows:
+            self.stdout.write(
+                f"{name:<14}{stats['rss_kb'] / 1024:>10.1f}{stats['pss_kb'] / 1024:>10.1f}"
+                f"{stats['shared_kb'] / 1024:>10.1f}{stats['private_kb'] / 1024:>10.1f}"
+            )
+        self.stdout.write(f"empreinte totale (somme PSS) : {result['total_pss_kb'] / 1024:.1f} Mo")
+
+    def print_summary(self, report):
+        self.stdout.write(f"\n{'mode':<10}{'phase':<15}{'privé/worker':>14}{'partagé/worker':>16}{'total PSS':>12}  (Mo)")
+        for mode, result in report['modes'].items():
+            for phase in ('started', 'after_traffic'):
+                stats = result[phase]
+                self.stdout.write(
+                    f"{mode:<10}{phase:<15}{stats.get('avg_worker_private_kb', 0) / 1024:>14.1f}"
+                    f"{stats.get('avg_worker_shared_kb', 0) / 1024:>16.1f}{stats['total_pss_kb'] / 1024:>12.1f}"
+                )
@@ -0,0 +1,132 @@
+"""
+Benchmark : sérialiseurs DRF vs sérialiseurs rapides (objets/seconde).
+
+    python manage.py bench_serializers --orders 500 --repeat 5
+
+Les données de test sont créées dans une transaction annulée à la fin.
+"""
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from app.notifications.models import Notification
+from app.notifications.serializers import NotificationSerializer, NotificationFastSerializer
+from app.orders.models import CONFIRMATION_DELAY, Order, OrderItem
+from app.orders.serializers import OrderDetailSerializer, OrderDetailFastSerializer
+from app.products.models import Product
+from app.products.serializers import ProductSerializer, ProductFastSerializer
+from app.users.models import User
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare le débit des sérialiseurs DRF et des sérialiseurs rapides'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=500)
+        parser.add_argument('--items', type=int, default=3, help='Lignes par commande')
+        parser.add_argument('--products', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._seed(options)
+                self._run(options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _seed(self, options):
+        rng = random.Random(options['seed'])
+        seller = User.objects.create(username='bench-vendeur', role='vendeur')
+        admin = User.objects.create(username='bench-admin', role='admin')
+
+        products = Product.objects.bulk_create([
+            Product(
+                name=f'bench-produit-{i}', unit='kg', stock=rng.randint(0, 500),
+                price=Decimal(rng.randint(100, 99999)) / 100,
+                is_validated=True, created_by=admin if i % 2 else None,
+                validated_at=timezone.now(),
+            )
+            for i in range(options['products'])
+        ])
+
+        # "pending" : commandes dont le délai est écoulé (statut effectif « confirmée »,
+        # pas encore écrit) ; une commande encore dans son délai aurait un temps écoulé
+        # qui dépend de l'instant de sérialisation et fausserait la comparaison
+        statuses = ['pending', 'confirmed', 'preparing', 'ready', 'in_delivery', 'delivered', 'cancelled']
+        orders = Order.objects.bulk_create([
+            Order(
+                order_number=f'BENCH-{i:06d}', seller=seller, seller_name='bench',
+                customer_name=f'Client {i}', status=statuses[i % len(statuses)],
+                total_amount=Decimal(rng.randint(100, 99999)) / 100,
+                confirmed_at=None if statuses[i % len(statuses)] == 'pending' else timezone.now(),
+            )
+            for i in range(options['orders'])
+        ])
+        Order.objects.filter(seller=seller, status='pending').update(
+            created_at=timezone.now() - timedelta(seconds=CONFIRMATION_DELAY + 60)
+        )
+
+        items = []
+        for order in orders:
+            for product in rng.sample(products, min(options['items'], len(products))):
+                quantity = rng.randint(1, 20)
+                items.append(OrderItem(
+                    order=order, product=product, product_name=product.name,
+                    quantity=quantity, unit=product.unit, unit_price=product.price,
+                    total_price=product.price * quantity,
+                ))
+        OrderItem.objects.bulk_create(items)
+
+        Notification.objects.bulk_create([
+            Notification(
+                user=seller, notification_type='order_delivered', title='Commande livrée',
+                message=f'Commande {order.order_number} livrée', order=order if i % 3 else None,
+            )
+            for i, order in enumerate(orders)
+        ])
+        self.seller = seller
+
+    def _run(self, repeat):
+        cases = [
+            ('OrderDetail', OrderDetailSerializer, OrderDetailFastSerializer,
+             lambda: Order.objects.filter(seller=self.seller).order_by('-created_at')),
+            ('Product', ProductSerializer, ProductFastSerializer,
+             lambda: Product.objects.filter(is_validated=True, is_active=True)),
+            ('Notification', NotificationSerializer, NotificationFastSerializer,
+             lambda: Notification.objects.filter(user=self.seller)),
+        ]
+        renderer = JSONRenderer()
+
+        self.stdout.write(f"{'sérialiseur':<14}{'objets':>8}{'DRF obj/s':>14}{'rapide obj/s':>15}{'gain':>8}  identique")
+        for name, slow, fast, queryset in cases:
+            count = queryset().count()
+            slow_time, slow_data = self._time(lambda: slow(queryset(), many=True).data, repeat)
+            fast_time, fast_data = self._time(lambda: fast(queryset(), many=True).data, repeat)
+            identical = renderer.render(slow_data) == renderer.render(fast_data)
+            self.stdout.write(
+                f'{name:<14}{count:>8}{count / slow_time:>14,.0f}{count / fast_time:>15,.0f}'
+                f'{slow_time / fast_time:>7.1f}x  {"oui" if identical else "NON"}'
+            )
+
+    @staticmethod
+    def _time(fn, repeat):
+        best, result = None, None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
@@ -0,0 +1,242 @@
+"""
+Temps de démarrage et mémoire d'un worker, module par module.
+
+    python manage.py bench_startup --runs 5
+    python manage.py bench_startup --server asgi --top 10
+    python manage.py bench_startup --save-baseline benchmarks/startup.json
+    python manage.py bench_startup --compare benchmarks/startup.json --threshold 15
+
+Chaque run est un interpréteur neuf qui refait ce que fait un worker au
+démarrage : django.setup(), puis chargement de l'application WSGI (ou
+ASGI) et de ROOT_URLCONF. Un crochet d'import chronomètre chaque module
+du projet (app.*, Backend.*) réellement chargé : durée et RSS gagnée,
+dépendances tierces qu'il importe comprises, modules du projet qu'il
+importe décomptés (médianes sur --runs).
+
+Les dépendances lourdes de --forbid (pandas, NumPy, openpyxl, Pillow) ne
+doivent être chargées qu'à leur première utilisation : la commande échoue
+si l'une d'elles est importée au démarrage, en indiquant le module
+responsable. Avec --compare, elle échoue aussi si le temps ou la RSS
+totale dépasse la baseline de plus de --threshold %.
+
+drf_spectacular.openapi n'est pas dans la liste : DRF instancie
+DEFAULT_SCHEMA_CLASS à la déclaration de chaque @api_view.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+HEAVY_MODULES = ('pandas', 'numpy', 'openpyxl', 'PIL')
+
+# Exécuté dans un interpréteur neuf ; écrit le résultat en JSON sur stdout
+CHILD = r'''
+import importlib.abc, json, os, resource, sys, time
+
+server, heavy = sys.argv[1], [module for module in sys.argv[2].split(',') if module]
+PREFIXES = ('app.', 'Backend.')
+
+def rss_kb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+modules = {}
+loaded_by = {}
+stack = []
+
+
+def first_loads(owner):
+    for module in heavy:
+        if module not in loaded_by and module in sys.modules:
+            loaded_by[module] = owner
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    # Chronomètre l'exécution des modules du projet ; un module imbriqué est décompté de son parent
+    def find_spec(self, name, path, target=None):
+        if not name.startswith(PREFIXES):
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            execute = spec.loader.exec_module
+
+            def exec_module(module):
+                stack.append([0.0, 0])
+                rss, start = rss_kb(), time.perf_counter()
+                try:
+                    execute(module)
+                finally:
+                    ms, kb = (time.perf_counter() - start) * 1000, rss_kb() - rss
+                    nested_ms, nested_kb = stack.pop()
+                    modules[name] = {'ms': ms - nested_ms, 'rss_kb': kb - nested_kb}
+                    if stack:
+                        stack[-1][0] += ms
+                        stack[-1][1] += kb
+                    first_loads(name)
+
+            spec.loader.exec_module = exec_module
+        return spec
+
+
+sys.meta_path.insert(0, ImportTimer())
+start_rss = rss_kb()
+phases = {}
+
+
+def phase(name, func):
+    rss, start = rss_kb(), time.perf_counter()
+    func()
+    phases[name] = {'ms': (time.perf_counter() - start) * 1000, 'rss_kb': rss_kb() - rss}
+    first_loads(name)
+
+
+def load_application():
+    from django.urls import get_resolver
+    if server == 'asgi':
+        from django.core.asgi import get_asgi_application
+        get_asgi_application()
+    else:
+        from django.core.wsgi import get_wsgi_application
+        get_wsgi_application()
+    get_resolver().url_patterns
+
+
+import django
+phase('django.setup', django.setup)
+phase('urlconf', load_application)
+print(json.dumps({
+    'start_rss_kb': start_rss, 'rss_kb': rss_kb(),
+    'phases': phases, 'modules': modules, 'loaded_by': loaded_by,
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = "Temps d'import et mémoire au démarrage d'un worker, par module"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Interpréteurs neufs à lancer')
+        parser.add_argument('--server', choices=['wsgi', 'asgi'], default='wsgi')
+        parser.add_argument('--forbid', default=','.join(HEAVY_MODULES),
+                            help='Modules interdits au démarrage, séparés par des virgules ("" : aucun)')
+        parser.add_argument('--top', type=int, default=20, help='Modules affichés, les plus lents d\'abord (0 : tous)')
+        parser.add_argument('--output', default=None, help='Écrire les résultats dans ce fichier JSON')
+        parser.add_argument('--save-baseline', default=None, help='Enregistrer les résultats comme baseline')
+        parser.add_argument('--compare', default=None, help='Baseline à comparer')
+        parser.add_argument('--threshold', type=float, default=10.0,
+                            help='Régression tolérée sur le temps et la RSS totale, en %% (défaut: 10)')
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1:
+            raise CommandError('--runs doit valoir au moins 1')
+        forbid = [module.strip() for module in options['forbid'].split(',') if module.strip()]
+        runs = [self.run_child(options['server'], forbid) for _ in range(options['runs'])]
+        report = self.summarize(runs, options['server'])
+        self.print_report(report, options['top'])
+
+        for path in (options['output'], options['save_baseline']):
+            if path:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                with open(path, 'w') as f:
+                    json.dump(report, f, indent=2)
+                self.stdout.write(f'Résultats écrits dans {path}')
+
+        if report['loaded_by']:
+            raise CommandError('Dépendances lourdes chargées au démarrage : ' + ', '.join(
+                f'{module} (importé par {owner})' for module, owner in report['loaded_by'].items()
+            ))
+        if options['compare']:
+            with open(options['compare']) as f:
+                self.print_comparison(json.load(f), report, options['threshold'])
+
+    @staticmethod
+    def run_child(server, forbid):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+        if server == 'asgi':
+            env.setdefault('ASYNC_API', 'True')
+        result = subprocess.run(
+            [sys.executable, '-c', CHILD, server, ','.join(forbid)],
+            env=env, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f'Échec du démarrage :\n{result.stderr[-2000:]}')
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    @staticmethod
+    def medians(entries):
+        return {
+            'ms': round(statistics.median(entry['ms'] for entry in entries), 2),
+            'rss_kb': int(statistics.median(entry['rss_kb'] for entry in entries)),
+        }
+
+    def summarize(self, runs, server):
+        modules = {}
+        for run in runs:
+            for name, entry in run['modules'].items():
+                modules.setdefault(name, []).append(entry)
+        return {
+            'created_at': timezone.now().isoformat(),
+            'settings': settings.SETTINGS_MODULE,
+            'server': server,
+            'python': sys.version.split()[0],
+            'runs': len(runs),
+            'phases': {
+                name: self.medians([run['phases'][name] for run in runs]) for name in runs[0]['phases']
+            },
+            'modules': {name: self.medians(entries) for name, entries in modules.items()},
+            'total_ms': round(statistics.median(
+                sum(phase['ms'] for phase in run['phases'].values()) for run in runs
+            ), 2),
+            'interpreter_rss_kb': int(statistics.median(run['start_rss_kb'] for run in runs)),
+            'total_rss_kb': int(statistics.median(run['rss_kb'] for run in runs)),
+            'loaded_by': runs[0]['loaded_by'],
+        }
+
+    def print_report(self, report, top):
+        modules = sorted(report['modules'].items(), key=lambda item: item[1]['ms'], reverse=True)
+        if top:
+            modules = modules[:top]
+        width = max([len(name) for name, _ in modules] + [12]) + 2
+        self.stdout.write(f"{'module':<{width}}{'ms':>10}{'RSS +Mo':>10}")
+        for name, stats in modules:
+            self.stdout.write(f"{name:<{width}}{stats['ms']:>10.1f}{stats['rss_kb'] / 1024:>10.1f}")
+        self.stdout.write('')
+        for name, stats in report['phases'].items():
+            self.stdout.write(f"{name:<{width}}{stats['ms']:>10.1f}{stats['rss_kb'] / 1024:>10.1f}")
+        self.stdout.write(
+            f"\nTotal ({report['server']}) : {report['total_ms']:.1f} ms, RSS {report['total_rss_kb'] / 1024:.1f} Mo "
+            f"(interpréteur seul : {report['interpreter_rss_kb'] / 1024:.1f} Mo), médiane de {report['runs']} run(s)"
+        )
+
+    def print_comparison(self, baseline, report, threshold):
+        self.stdout.write(f"\nComparaison avec la baseline du {baseline['created_at']} (seuil {threshold:g} %)")
+        if baseline.get('server') != report['server']:
+            self.stdout.write(self.style.WARNING(f"Serveur différent : {baseline.get('server')} → {report['server']}"))
+        regressions = []
+        for key, label in (('total_ms', 'temps'), ('total_rss_kb', 'RSS')):
+            old, new = baseline[key], report[key]
+            change = (new - old) / old * 100 if old else 0.0
+            line = f'{label:<8}{old:>12.1f} → {new:>12.1f}  {change:+7.1f} %'
+            if change > threshold:
+                regressions.append(label)
+                self.stdout.write(self.style.ERROR(line + '  RÉGRESSION'))
+            else:
+                self.stdout.write(line)
+        if regressions:
+            raise CommandError(f'Régression au-delà de {threshold:g} % : {", ".join(regressions)}')
+        self.stdout.write(self.style.SUCCESS('Aucune régression'))
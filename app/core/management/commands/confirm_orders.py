@@ -0,0 +1,51 @@
+"""
+Écriture des confirmations automatiques en attente (commandes 'pending'
+de plus de 3 minutes), par lots de ORDER_CONFIRM_BATCH.
+
+    python manage.py confirm_orders              # une passe (tâche planifiée)
+    python manage.py confirm_orders --loop 10    # en continu, toutes les 10 s (worker render.yaml)
+
+Les listes affichent déjà ces commandes comme confirmées
+(Order.objects.with_effective_status) ; cette commande écrit le statut,
+l'historique et les notifications des magasiniers.
+"""
+import logging
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connections
+
+from app.orders.confirmation import confirm_overdue
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Écrit en bloc les confirmations automatiques des commandes de plus de 3 minutes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', type=float, default=0,
+                            help='Recommencer toutes les N secondes (défaut : une seule passe)')
+
+    def handle(self, *args, **options):
+        if options['loop'] < 0:
+            raise CommandError('--loop doit être positif')
+        while True:
+            total = 0
+            try:
+                while True:
+                    confirmed = confirm_overdue()
+                    total += len(confirmed)
+                    if not confirmed:
+                        break
+            except DatabaseError:
+                if not options['loop']:
+                    raise
+                # Base momentanément indisponible : nouvel essai à la passe suivante
+                logger.exception('Confirmation des commandes impossible')
+            if total or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'{total} commande(s) confirmée(s)'))
+            if not options['loop']:
+                return
+            connections.close_all()
+            time.sleep(options['loop'])
@@ -0,0 +1,390 @@
+"""
+Test de charge de bout en bout du circuit vendeur → magasinier → livreur.
+
+    python manage.py runserver --noreload        # (ou gunicorn) dans un autre terminal
+    python manage.py loadtest --url http://127.0.0.1:8000 --duration 60 \\
+        --vendeurs 10 --magasiniers 3 --livreurs 5 --fast-confirm
+
+Chaque acteur est un thread avec son propre token JWT :
+  - vendeur : crée des commandes puis interroge leur statut
+    (check_order_status confirme après CONFIRMATION_DELAY) ;
+  - magasinier : interroge magasinier_orders puis prépare, marque prête
+    ou assigne un livreur ;
+  - livreur : interroge livreur_deliveries puis marque livré.
+Entre deux actions, un temps de réflexion tiré d'une loi exponentielle
+de moyenne --think-time.
+
+Les utilisateurs et produits de test (préfixe lt_) sont créés par l'ORM :
+le serveur doit utiliser la même base (SQLite ou PostgreSQL locale).
+--fast-confirm antidate chaque commande créée de CONFIRMATION_DELAY pour
+ne pas attendre 3 minutes avant qu'elle arrive chez les magasiniers.
+
+Rapport : débit, p50/p95/p99 par endpoint, taux d'erreurs (5xx, réseau)
+et de conflits (4xx sur une transition d'état, typiquement deux
+magasiniers sur la même commande). Écrit en JSON (--report) et
+comparable à un rapport précédent (--compare).
+"""
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from app.orders.models import CONFIRMATION_DELAY, Order
+from app.products.models import Product
+from app.users.models import User
+
+PASSWORD = 'lt-password-1234'
+PERCENTILES = (50, 95, 99)
+PRODUCT_COUNT = 20
+PRODUCT_STOCK = 10 ** 9
+
+# Endpoints dont un 4xx signifie « état déjà changé par un autre acteur »
+TRANSITIONS = {
+    'POST orders/{id}/prepare', 'POST orders/{id}/ready',
+    'POST orders/{id}/assign', 'POST orders/{id}/deliver',
+}
+
+
+class Recorder:
+    """Échantillons (latence, statut) par endpoint, partagés par les threads"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.counters = defaultdict(int)
+
+    def add(self, endpoint, latency, status):
+        with self.lock:
+            self.samples[endpoint].append((latency, status))
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+
+class Client:
+    def __init__(self, base_url, recorder, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self.timeout = timeout
+        self.token = None
+
+    def _send(self, method, path, data):
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps(data).encode() if data is not None else None,
+            method=method,
+            headers={'Content-Type': 'application/json', 'Accept': 'application/json'},
+        )
+        if self.token:
+            request.add_header('Authorization', f'Bearer {self.token}')
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+        except OSError:
+            # Connexion refusée, timeout... : compté comme erreur (statut 0)
+            return 0, b''
+
+    def login(self, username, password=PASSWORD):
+        status, body = self._send('POST', '/api/auth/login/', {'username': username, 'password': password})
+        if status != 200:
+            raise CommandError(f'Connexion impossible pour {username} (HTTP {status})')
+        self.token = json.loads(body)['tokens']['access']
+
+    def call(self, method, path, endpoint, data=None):
+        start = time.perf_counter()
+        status, body = self._send(method, path, data)
+        self.recorder.add(endpoint, time.perf_counter() - start, status)
+        try:
+            return status, json.loads(body) if body else None
+        except ValueError:
+            return status, None
+
+
+class Actor(threading.Thread):
+    role = None
+
+    def __init__(self, user, client, think_time, seed, context):
+        super().__init__(daemon=True)
+        self.user = user
+        self.client = client
+        self.deadline = None
+        self.think_time = think_time
+        self.rng = random.Random(seed)
+        self.context = context
+        self.stop_event = context['stop']
+
+    def think(self):
+        self.stop_event.wait(self.rng.expovariate(1 / self.think_time) if self.think_time > 0 else 0)
+
+    def run(self):
+        try:
+            while time.monotonic() < self.deadline and not self.stop_event.is_set():
+                self.step()
+                self.think()
+        finally:
+            # Connexion ORM ouverte par --fast-confirm dans ce thread
+            connection.close()
+
+    def step(self):
+        raise NotImplementedError
+
+
+class Vendeur(Actor):
+    role = 'vendeur'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pending = []
+
+    def step(self):
+        if self.pending and self.rng.random() < 0.5:
+            order_id = self.rng.choice(self.pending)
+            status, data = self.client.call('GET', f'/api/orders/{order_id}/status/', 'GET orders/{id}/status')
+            if status == 200 and data and data.get('status') != 'pending':
+                self.pending.remove(order_id)
+            return
+
+        products = self.rng.sample(self.context['products'], self.rng.randint(1, 4))
+        status, data = self.client.call('POST', '/api/orders/create/', 'POST orders/create', {
+            'customer_name': f'Client {self.rng.randint(1, 10_000)}',
+            'items': [{'product_id': pk, 'quantity': self.rng.randint(1, 5)} for pk in products],
+        })
+        if status == 201 and data:
+            order_id = data['order']['id']
+            self.client.recorder.count('orders_created')
+            if self.context['fast_confirm']:
+                Order.objects.filter(pk=order_id).update(
+                    created_at=timezone.now() - timedelta(seconds=CONFIRMATION_DELAY)
+                )
+            self.pending.append(order_id)
+
+
+class Magasinier(Actor):
+    role = 'magasinier'
+
+    def step(self):
+        status, orders = self.client.call('GET', '/api/orders/magasinier/list/', 'GET orders/magasinier/list')
+        if status != 200 or not orders:
+            return
+        by_status = defaultdict(list)
+        for order in orders:
+            by_status[order['status']].append(order['id'])
+
+        self.think()
+        # Faire avancer en priorité les commandes les plus avancées
+        if by_status['ready']:
+            order_id = self.rng.choice(by_status['ready'])
+            if self.rng.random() < 0.2:
+                self.client.call('GET', '/api/orders/deliverers/', 'GET orders/deliverers')
+            status, _ = self.client.call(
+                'POST', f'/api/orders/{order_id}/assign/', 'POST orders/{id}/assign',
+                {'deliverer_id': self.rng.choice(self.context['livreurs'])}
+            )
+            if status == 200:
+                self.client.recorder.count('orders_assigned')
+        elif by_status['preparing']:
+            order_id = self.rng.choice(by_status['preparing'])
+            self.client.call('POST', f'/api/orders/{order_id}/ready/', 'POST orders/{id}/ready')
+        elif by_status['confirmed']:
+            order_id = self.rng.choice(by_status['confirmed'])
+            self.client.call('POST', f'/api/orders/{order_id}/prepare/', 'POST orders/{id}/prepare')
+
+
+class Livreur(Actor):
+    role = 'livreur'
+
+    def step(self):
+        status, orders = self.client.call('GET', '/api/orders/livreur/deliveries/', 'GET orders/livreur/deliveries')
+        if status != 200 or not orders:
+            return
+        self.think()
+        order_id = self.rng.choice(orders)['id']
+        status, _ = self.client.call('POST', f'/api/orders/{order_id}/deliver/', 'POST orders/{id}/deliver')
+        if status == 200:
+            self.client.recorder.count('orders_delivered')
+
+
+def summarize(samples, elapsed, transition):
+    latencies = np.array([latency for latency, _ in samples]) * 1000
+    statuses = [status for _, status in samples]
+    errors = sum(1 for s in statuses if s == 0 or s >= 500 or (400 <= s < 500 and not transition))
+    conflicts = sum(1 for s in statuses if transition and 400 <= s < 500)
+    codes = defaultdict(int)
+    for s in statuses:
+        codes[str(s)] += 1
+    result = {
+        'requests': len(samples),
+        'throughput_rps': round(len(samples) / elapsed, 2),
+        'mean_ms': round(float(latencies.mean()), 2),
+        'max_ms': round(float(latencies.max()), 2),
+    }
+    for q, value in zip(PERCENTILES, np.percentile(latencies, PERCENTILES)):
+        result[f'p{q}_ms'] = round(float(value), 2)
+    result.update({
+        'errors': errors,
+        'conflicts': conflicts,
+        'error_rate': round(errors / len(samples), 4),
+        'conflict_rate': round(conflicts / len(samples), 4),
+        'status_codes': dict(codes),
+    })
+    return result
+
+
+class Command(BaseCommand):
+    help = 'Test de charge vendeur → magasinier → livreur contre un serveur local'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--duration', type=float, default=60, help='Durée de la mesure (secondes)')
+        parser.add_argument('--vendeurs', type=int, default=5)
+        parser.add_argument('--magasiniers', type=int, default=2)
+        parser.add_argument('--livreurs', type=int, default=3)
+        parser.add_argument('--think-time', type=float, default=1.0, help='Temps de réflexion moyen (secondes)')
+        parser.add_argument('--fast-confirm', action='store_true',
+                            help='Antidater les commandes créées pour sauter le délai de confirmation')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--report', default=None, help='Fichier JSON du rapport (défaut: loadtest-<date>.json)')
+        parser.add_argument('--compare', default=None, help='Rapport précédent à comparer')
+
+    def handle(self, *args, **options):
+        counts = {'vendeur': options['vendeurs'], 'magasinier': options['magasiniers'], 'livreur': options['livreurs']}
+        users = self.setup_fixtures(counts)
+        products = list(Product.objects.filter(name__startswith='lt_').values_list('id', flat=True))
+
+        recorder = Recorder()
+        context = {
+            'products': products,
+            'livreurs': [user.id for user in users['livreur']],
+            'fast_confirm': options['fast_confirm'],
+            'stop': threading.Event(),
+        }
+
+        # Connexions avant le départ du chronomètre
+        self.stdout.write(f"Connexion de {sum(counts.values())} acteurs sur {options['url']}...")
+        actors = []
+        for actor_class in (Vendeur, Magasinier, Livreur):
+            for user in users[actor_class.role]:
+                client = Client(options['url'], recorder, options['timeout'])
+                client.login(user.username)
+                actors.append(actor_class(
+                    user, client, options['think_time'],
+                    f"{options['seed']}-{user.username}", context
+                ))
+
+        started_at = timezone.now()
+        start = time.monotonic()
+        deadline = start + options['duration']
+        for actor in actors:
+            actor.deadline = deadline
+            actor.start()
+        try:
+            for actor in actors:
+                actor.join()
+        except KeyboardInterrupt:
+            context['stop'].set()
+            for actor in actors:
+                actor.join()
+        elapsed = time.monotonic() - start
+
+        report = self.build_report(recorder, elapsed, started_at, options)
+        path = options['report'] or f"loadtest-{started_at:%Y%m%d-%H%M%S}.json"
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+        self.print_report(report)
+        if options['compare']:
+            with open(options['compare']) as f:
+                self.print_comparison(json.load(f), report)
+        self.stdout.write(self.style.SUCCESS(f'Rapport écrit dans {path}'))
+
+    def setup_fixtures(self, counts):
+        users = {}
+        for role, count in counts.items():
+            users[role] = []
+            for i in range(1, count + 1):
+                user, created = User.objects.get_or_create(
+                    username=f'lt_{role}_{i}',
+                    defaults={'role': role, 'first_name': 'Load', 'last_name': f'{role.title()} {i}'}
+                )
+                if created:
+                    user.set_password(PASSWORD)
+                    user.save()
+                elif not (user.is_active and user.is_active_account and user.role == role):
+                    User.objects.filter(pk=user.pk).update(role=role, is_active=True, is_active_account=True)
+                users[role].append(user)
+
+        for i in range(1, PRODUCT_COUNT + 1):
+            Product.objects.update_or_create(
+                name=f'lt_product_{i:02d}',
+                defaults={
+                    'unit': 'pièce', 'price': Decimal(f'{i * 1.5:.2f}'), 'stock': PRODUCT_STOCK,
+                    'is_validated': True, 'is_active': True,
+                },
+            )
+        return users
+
+    def build_report(self, recorder, elapsed, started_at, options):
+        endpoints = {
+            endpoint: summarize(samples, elapsed, endpoint in TRANSITIONS)
+            for endpoint, samples in sorted(recorder.samples.items())
+        }
+        all_samples = [sample for samples in recorder.samples.values() for sample in samples]
+        totals = summarize(all_samples, elapsed, False) if all_samples else {}
+        if all_samples:
+            totals['errors'] = sum(e['errors'] for e in endpoints.values())
+            totals['conflicts'] = sum(e['conflicts'] for e in endpoints.values())
+            totals['error_rate'] = round(totals['errors'] / len(all_samples), 4)
+            totals['conflict_rate'] = round(totals['conflicts'] / len(all_samples), 4)
+        return {
+            'started_at': started_at.isoformat(),
+            'duration_s': round(elapsed, 2),
+            'config': {
+                key: options[key] for key in (
+                    'url', 'vendeurs', 'magasiniers', 'livreurs', 'think_time', 'fast_confirm', 'seed'
+                )
+            },
+            'workflow': dict(recorder.counters),
+            'totals': totals,
+            'endpoints': endpoints,
+        }
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"\n{'endpoint':<34}{'req':>7}{'req/s':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'err%':>7}{'confl%':>8}"
+        )
+        rows = list(report['endpoints'].items())
+        if report['totals']:
+            rows.append(('TOTAL', report['totals']))
+        for endpoint, stats in rows:
+            self.stdout.write(
+                f"{endpoint:<34}{stats['requests']:>7}{stats['throughput_rps']:>8.1f}"
+                f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}"
+                f"{stats['error_rate'] * 100:>7.1f}{stats['conflict_rate'] * 100:>8.1f}"
+            )
+        self.stdout.write(f"Circuit : {report['workflow']}")
+
+    def print_comparison(self, previous, current):
+        self.stdout.write(f"\nComparaison avec le rapport du {previous['started_at']} (p95 et débit)")
+        for endpoint, stats in current['endpoints'].items():
+            old = previous['endpoints'].get(endpoint)
+            if old is None:
+                continue
+            delta = (stats['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100 if old['p95_ms'] else 0.0
+            self.stdout.write(
+                f"{endpoint:<34}p95 {old['p95_ms']:>8.1f} → {stats['p95_ms']:>8.1f} ms ({delta:+6.1f}%)  "
+                f"débit {old['throughput_rps']:>7.1f} → {stats['throughput_rps']:>7.1f} req/s"
+            )
@@ -0,0 +1,63 @@
+"""
+Suppression de l'historique des positions des livreurs (user_locations).
+
+    python manage.py prune_locations            # garde LOCATION_HISTORY_DAYS jours
+    python manage.py prune_locations --days 7 --dry-run
+
+Sous PostgreSQL, les partitions quotidiennes trop anciennes sont
+supprimées entières (DROP TABLE, instantané) ; ailleurs, les lignes sont
+supprimées par jour.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router
+from django.utils import timezone
+
+from app.users.models import LocationSample
+
+PARTITIONS_SQL = '''
+    SELECT child.relname FROM pg_inherits
+    JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+    WHERE parent.relname = 'user_locations'
+'''
+
+
+class Command(BaseCommand):
+    help = "Supprime l'historique des positions au-delà de --days jours"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Jours conservés (défaut : LOCATION_HISTORY_DAYS)')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.LOCATION_HISTORY_DAYS
+        if days < 1:
+            raise CommandError('--days doit valoir au moins 1')
+        # day est la date UTC de recorded_at (voir app.users.locations.write_history)
+        cutoff = timezone.now().date() - timedelta(days=days)
+        verb = 'à supprimer' if options['dry_run'] else 'supprimée(s)'
+        connection = connections[router.db_for_write(LocationSample)]
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(PARTITIONS_SQL)
+                expired = sorted(
+                    name for (name,) in cursor.fetchall()
+                    if name[-8:].isdigit() and name[-8:] < f'{cutoff:%Y%m%d}'
+                )
+                for name in expired:
+                    self.stdout.write(f'Partition {name}')
+                    if not options['dry_run']:
+                        cursor.execute(f'DROP TABLE {connection.ops.quote_name(name)}')
+            self.stdout.write(self.style.SUCCESS(f'{len(expired)} partition(s) antérieure(s) au {cutoff} {verb}'))
+            return
+
+        expired = LocationSample.objects.filter(day__lt=cutoff)
+        if options['dry_run']:
+            count = expired.count()
+        else:
+            count, _ = expired.delete()
+        self.stdout.write(self.style.SUCCESS(f'{count} position(s) antérieure(s) au {cutoff} {verb}'))
@@ -0,0 +1,189 @@
+"""
+Rejeu d'une capture de trafic (TrafficCaptureMiddleware) contre un serveur local.
+
+    python manage.py replay_traffic /tmp/pda-traffic.jsonl --speed 10 --workers 16
+    python manage.py replay_traffic capture.jsonl --speed 0 --report replay.json \\
+        --login vendeur=lt_vendeur_1:lt-password-1234
+
+--speed 1 respecte les intervalles capturés, 10 les divise par dix,
+0 envoie tout sans attendre (limité par --workers). Chaque rôle rejoue
+avec un compte local (--login rôle=utilisateur:mot_de_passe ; par défaut
+les comptes lt_<rôle>_1 de manage.py loadtest). Les identifiants dans
+les chemins sont rejoués tels quels : utiliser une base restaurée ou
+générée (seed_scale) avec des ids comparables.
+
+Le rapport compare, par route, les latences capturées en production et
+celles du rejeu (p50/p95) ainsi que les statuts HTTP divergents.
+"""
+import json
+import queue
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from app.core.traffic import read_capture
+from app.core.management.commands.loadtest import PASSWORD, Client, Recorder
+
+ROLES = ('admin', 'vendeur', 'magasinier', 'livreur')
+
+
+def _percentiles(values):
+    p50, p95 = np.percentile(values, (50, 95))
+    return round(float(p50), 2), round(float(p95), 2)
+
+
+class Command(BaseCommand):
+    help = "Rejoue une capture de trafic d'API et compare les latences par route"
+
+    def add_arguments(self, parser):
+        parser.add_argument('capture', help='TRAFFIC_CAPTURE_FILE (fichiers de tous les workers) ou fichier JSONL d\'un worker')
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--speed', type=float, default=1.0, help='1 = temps réel, 10 = 10× plus vite, 0 = sans attente')
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--login', action='append', default=[], metavar='ROLE=USER:PASSWORD')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--limit', type=int, default=None, help='Ne rejouer que les N premières requêtes')
+        parser.add_argument('--report', default=None, help='Écrire le rapport JSON dans ce fichier')
+
+    def handle(self, *args, **options):
+        entries = [entry for entry in read_capture(options['capture']) if entry.get('replayable')]
+        if options['limit']:
+            entries = entries[:options['limit']]
+        if not entries:
+            raise CommandError('Aucune requête rejouable dans la capture')
+
+        recorder = Recorder()
+        clients = self.login_clients(options, recorder, {entry['role'] for entry in entries})
+
+        # Envoi : un thread de cadencement, --workers threads d'exécution
+        pending = queue.Queue(maxsize=options['workers'] * 4)
+        results = []
+        results_lock = threading.Lock()
+        lags = []
+
+        def worker():
+            while True:
+                item = pending.get()
+                if item is None:
+                    return
+                entry, due = item
+                client = clients[entry['role']]
+                path = entry['path'] + (f"?{entry['query']}" if entry['query'] else '')
+                status, _ = client.call(entry['method'], path, entry['route'] or entry['path'], entry['body'])
+                with results_lock:
+                    results.append((entry, status))
+                    if due is not None:
+                        lags.append(max(0.0, time.monotonic() - due))
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(options['workers'])]
+        for thread in threads:
+            thread.start()
+
+        speed = options['speed']
+        origin = parse_datetime(entries[0]['ts'])
+        self.stdout.write(f"Rejeu de {len(entries)} requêtes sur {options['url']} "
+                          f"({'sans attente' if speed <= 0 else f'{speed:g}×'}, {options['workers']} workers)")
+        start = time.monotonic()
+        for entry in entries:
+            due = None
+            if speed > 0:
+                due = start + (parse_datetime(entry['ts']) - origin).total_seconds() / speed
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            pending.put((entry, due))
+        for _ in threads:
+            pending.put(None)
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - start
+
+        report = self.build_report(recorder, results, lags, elapsed, options)
+        self.print_report(report)
+        if options['report']:
+            with open(options['report'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Rapport écrit dans {options['report']}"))
+
+    def login_clients(self, options, recorder, roles):
+        credentials = {role: (f'lt_{role}_1', PASSWORD) for role in ROLES}
+        for value in options['login']:
+            try:
+                role, rest = value.split('=', 1)
+                username, password = rest.split(':', 1)
+            except ValueError:
+                raise CommandError(f'--login attendu sous la forme rôle=utilisateur:mot_de_passe, reçu {value!r}')
+            credentials[role] = (username, password)
+
+        clients = {}
+        for role in roles:
+            client = Client(options['url'], recorder, options['timeout'])
+            if role is not None:
+                if role not in credentials:
+                    raise CommandError(f'Aucun compte pour le rôle {role} (utiliser --login)')
+                client.login(*credentials[role])
+            clients[role] = client
+        return clients
+
+    def build_report(self, recorder, results, lags, elapsed, options):
+        captured = defaultdict(list)
+        mismatches = defaultdict(int)
+        for entry, status in results:
+            route = entry['route'] or entry['path']
+            captured[route].append(entry['duration_ms'])
+            if status != entry['status']:
+                mismatches[route] += 1
+
+        routes = {}
+        for route, samples in sorted(recorder.samples.items()):
+            replayed = [latency * 1000 for latency, _ in samples]
+            before_p50, before_p95 = _percentiles(captured[route])
+            after_p50, after_p95 = _percentiles(replayed)
+            routes[route] = {
+                'requests': len(samples),
+                'captured_p50_ms': before_p50,
+                'captured_p95_ms': before_p95,
+                'replay_p50_ms': after_p50,
+                'replay_p95_ms': after_p95,
+                'p50_change_pct': round((after_p50 - before_p50) / before_p50 * 100, 1) if before_p50 else None,
+                'p95_change_pct': round((after_p95 - before_p95) / before_p95 * 100, 1) if before_p95 else None,
+                'status_mismatches': mismatches[route],
+            }
+        return {
+            'replayed_at': timezone.now().isoformat(),
+            'capture': options['capture'],
+            'speed': options['speed'],
+            'workers': options['workers'],
+            'duration_s': round(elapsed, 2),
+            'requests': len(results),
+            'throughput_rps': round(len(results) / elapsed, 2) if elapsed else None,
+            # Retard moyen sur l'horaire prévu : > 0 si les workers ne suivent pas la cadence
+            'mean_schedule_lag_ms': round(sum(lags) / len(lags) * 1000, 2) if lags else None,
+            'routes': routes,
+        }
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"\n{'route':<28}{'req':>6}{'capt p50':>10}{'rejeu p50':>11}{'Δ':>8}"
+            f"{'capt p95':>10}{'rejeu p95':>11}{'Δ':>8}{'statut≠':>9}"
+        )
+        for route, stats in report['routes'].items():
+            self.stdout.write(
+                f"{route:<28}{stats['requests']:>6}"
+                f"{stats['captured_p50_ms']:>10.1f}{stats['replay_p50_ms']:>11.1f}{self.pct(stats['p50_change_pct']):>8}"
+                f"{stats['captured_p95_ms']:>10.1f}{stats['replay_p95_ms']:>11.1f}{self.pct(stats['p95_change_pct']):>8}"
+                f"{stats['status_mismatches']:>9}"
+            )
+        self.stdout.write(
+            f"{report['requests']} requêtes en {report['duration_s']} s ({report['throughput_rps']} req/s), "
+            f"retard moyen sur la cadence : {report['mean_schedule_lag_ms']} ms"
+        )
+
+    @staticmethod
+    def pct(value):
+        return '-' if value is None else f'{value:+.0f}%'
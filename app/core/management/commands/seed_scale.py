@@ -0,0 +1,212 @@
+"""
+Données synthétiques à grande échelle : utilisateurs, produits, commandes,
+lignes, historique et notifications, réparties sur les rôles, les statuts
+et le temps de façon réaliste (voir app/core/seeding.py).
+
+    python manage.py seed_scale --orders 10000 --days 30
+    python manage.py seed_scale --orders 850000 --workers 8     # ≈ 10 M lignes
+
+La génération est répartie dans un pool de processus ; le chargement se
+fait au fil de l'eau dans le processus principal, par COPY sur PostgreSQL
+et par bulk_create sur les autres bases. À graine (--seed) et date de fin
+(--end) identiques, les données générées sont identiques.
+
+Les comptes créés (seed_<rôle>_NNNN) ont tous le mot de passe --password.
+"""
+import csv
+import io
+import multiprocessing
+import os
+import random
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from app.core import seeding
+from app.notifications.models import Notification
+from app.orders.models import CONFIRMATION_DELAY, Order, OrderHistory, OrderItem
+from app.products.models import Product
+from app.users.models import User
+
+TABLES = (
+    ('orders', Order, seeding.ORDER_COLUMNS),
+    ('items', OrderItem, seeding.ITEM_COLUMNS),
+    ('history', OrderHistory, seeding.HISTORY_COLUMNS),
+    ('notifications', Notification, seeding.NOTIFICATION_COLUMNS),
+)
+BATCH_SIZE = 5000
+FIRST_NAMES = ('Awa', 'Moussa', 'Fatou', 'Ibrahim', 'Aminata', 'Seydou', 'Mariam', 'Oumar', 'Kadiatou', 'Souleymane')
+LAST_NAMES = ('Diallo', 'Traoré', 'Koné', 'Camara', 'Sow', 'Ouédraogo', 'Bamba', 'Touré', 'Keïta', 'Cissé')
+UNITS = ('kg', 'pièce', 'carton', 'sac', 'litre', 'bouteille')
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """bulk_create applique auto_now_add : le suspendre pour garder les dates générées"""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = 'Génère un grand volume de données réalistes et déterministes pour les tests de charge'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=100_000)
+        parser.add_argument('--vendeurs', type=int, default=200)
+        parser.add_argument('--magasiniers', type=int, default=30)
+        parser.add_argument('--livreurs', type=int, default=100)
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--days', type=int, default=365, help="Période couverte, jusqu'à --end")
+        parser.add_argument('--end', default=None, help='Date de fin ISO (défaut: heure courante)')
+        parser.add_argument('--confirm-fanout', type=int, default=1,
+                            help='Magasiniers notifiés par commande confirmée (la vue les notifie tous)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--chunk-size', type=int, default=20_000, help='Commandes par bloc généré')
+        parser.add_argument('--password', default='seed-password')
+
+    def handle(self, *args, **options):
+        if options['end']:
+            end = parse_datetime(options['end'])
+            if end is None:
+                raise CommandError('--end doit être une date ISO 8601')
+            if timezone.is_naive(end):
+                end = timezone.make_aware(end)
+        else:
+            end = timezone.localtime().replace(minute=0, second=0, microsecond=0)
+        # Heures locales pour la répartition horaire des commandes
+        end = timezone.localtime(end)
+
+        started = time.monotonic()
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            password = make_password(options['password'])
+            vendeurs = self.seed_users('vendeur', options['vendeurs'], password, rng)
+            magasiniers = self.seed_users('magasinier', options['magasiniers'], password, rng)
+            livreurs = self.seed_users('livreur', options['livreurs'], password, rng)
+            products = self.seed_products(options['products'], rng)
+        if not (vendeurs and magasiniers and livreurs and products):
+            raise CommandError('Il faut au moins un vendeur, un magasinier, un livreur et un produit')
+
+        world = {
+            'seed': options['seed'],
+            'end': end,
+            'days': options['days'],
+            'vendeurs': vendeurs,
+            'magasiniers': magasiniers,
+            'livreurs': livreurs,
+            'products': products,
+            'confirm_fanout': options['confirm_fanout'],
+            'confirmation_delay': CONFIRMATION_DELAY,
+            'base_id': (Order.objects.aggregate(Max('pk'))['pk__max'] or 0) + 1,
+        }
+        size = options['chunk_size']
+        tasks = [
+            (chunk, start, min(start + size, options['orders']), world)
+            for chunk, start in enumerate(range(0, options['orders'], size))
+        ]
+
+        load = self.copy_rows if connection.vendor == 'postgresql' else self.bulk_rows
+        totals = {name: 0 for name, _, _ in TABLES}
+        # Les processus du pool ne doivent pas hériter d'une connexion ouverte
+        connections.close_all()
+        with multiprocessing.Pool(max(1, options['workers'])) as pool, \
+                explicit_timestamps(*(model for _, model, _ in TABLES)):
+            for done, (_, rows) in enumerate(pool.imap(seeding.generate_chunk, tasks), start=1):
+                with transaction.atomic():
+                    for name, model, columns in TABLES:
+                        load(model, columns, rows[name])
+                        totals[name] += len(rows[name])
+                elapsed = time.monotonic() - started
+                loaded = sum(totals.values())
+                self.stdout.write(
+                    f'Bloc {done}/{len(tasks)} : {loaded:,} lignes en {elapsed:.1f} s ({loaded / elapsed:,.0f} lignes/s)'
+                )
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), [model for _, model, _ in TABLES]):
+                    cursor.execute(sql)
+                for _, model, _ in TABLES:
+                    cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{sum(totals.values()):,} lignes en {elapsed:.1f} s : "
+            + ', '.join(f'{name} {count:,}' for name, count in totals.items())
+        ))
+
+    def seed_users(self, role, count, password, rng):
+        """Comptes seed_<rôle>_NNNN (réutilisés s'ils existent) ; renvoie [(id, nom affiché)]"""
+        User.objects.bulk_create([
+            User(
+                username=f'seed_{role}_{i:04d}', role=role, password=password,
+                first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+            )
+            for i in range(1, count + 1)
+        ], ignore_conflicts=True)
+        return [
+            (pk, f'{first} {last}'.strip() or username)
+            for pk, username, first, last in User.objects.filter(
+                role=role, username__startswith=f'seed_{role}_'
+            ).order_by('username').values_list('pk', 'username', 'first_name', 'last_name')[:count]
+        ]
+
+    def seed_products(self, count, rng):
+        """Produits validés seed_product_NNNNN ; renvoie [(id, nom, unité, prix)]"""
+        Product.objects.bulk_create([
+            Product(
+                name=f'seed_product_{i:05d}', unit=rng.choice(UNITS),
+                price=Decimal(rng.randint(50, 100_000)) / 100, stock=rng.randint(0, 100_000),
+                is_validated=True, validated_at=timezone.now(),
+            )
+            for i in range(1, count + 1)
+        ], ignore_conflicts=True)
+        return list(
+            Product.objects.filter(name__startswith='seed_product_')
+            .order_by('name').values_list('pk', 'name', 'unit', 'price')[:count]
+        )
+
+    @staticmethod
+    def bulk_rows(model, columns, rows):
+        model.objects.bulk_create(
+            [model(**dict(zip(columns, row))) for row in rows], batch_size=BATCH_SIZE
+        )
+
+    @staticmethod
+    def copy_rows(model, columns, rows):
+        """COPY ... FROM STDIN (CSV) : None devient NULL, aucune colonne texte générée n'est vide"""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        quote = connection.ops.quote_name
+        sql = (
+            f'COPY {quote(model._meta.db_table)} ({", ".join(quote(c) for c in columns)}) '
+            'FROM STDIN WITH (FORMAT csv)'
+        )
+        with connection.cursor() as cursor:
+            raw = cursor.cursor
+            if hasattr(raw, 'copy_expert'):
+                # psycopg2
+                buffer.seek(0)
+                raw.copy_expert(sql, buffer)
+            else:
+                # psycopg 3
+                with raw.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
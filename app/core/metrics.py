@@ -0,0 +1,232 @@
+"""
+Métriques par route (nom d'URL) : nombre de requêtes, histogramme de
+latence, requêtes SQL (nombre et durée) et taille des réponses.
+
+Chaque worker agrège dans un dict de listes modifiées sur place, sous un
+verrou (workers gthread : plusieurs threads par processus), puis publie
+périodiquement un instantané dans METRICS_SPOOL_DIR/<pid>.json. /api/metrics/ fusionne les instantanés de
+tous les workers et les rend au format texte Prometheus. L'instantané
+contient aussi les compteurs des pools de connexions (app.core.dbpool).
+
+Les instantanés des workers morts (pid disparu ou repris par un autre
+processus, voir app.core.processes) sont ignorés et supprimés ; le
+maître gunicorn vide le répertoire au démarrage (clear_spool). Un worker
+inactif mais vivant reste compté, même s'il n'a pas réécrit son fichier
+depuis longtemps : ses compteurs ne redescendent pas.
+"""
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+from . import dbpool, processes
+
+logger = logging.getLogger(__name__)
+
+# Bornes (secondes) de l'histogramme de latence
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Index dans la liste de statistiques d'une route
+COUNT, LATENCY_SUM, QUERIES, DB_TIME, RESPONSE_BYTES, BUCKET_START = range(6)
+
+# (route, méthode) -> [count, latence, requêtes SQL, temps SQL, octets, *buckets, +Inf]
+_routes = {}
+# (route, méthode, statut) -> nombre de réponses
+_statuses = {}
+_last_flush = 0.0
+# Protège _routes, _statuses et _last_flush (threads d'un worker gthread)
+_lock = threading.Lock()
+
+
+def record(route, method, status, latency, queries, db_time, size):
+    key = (route, method)
+    status_key = (route, method, status)
+    bucket = BUCKET_START + bisect.bisect_left(BUCKETS, latency)
+    due = False
+    with _lock:
+        stats = _routes.get(key)
+        if stats is None:
+            stats = _routes[key] = [0, 0.0, 0, 0.0, 0] + [0] * (len(BUCKETS) + 1)
+        stats[COUNT] += 1
+        stats[LATENCY_SUM] += latency
+        stats[QUERIES] += queries
+        stats[DB_TIME] += db_time
+        stats[RESPONSE_BYTES] += size
+        stats[bucket] += 1
+        _statuses[status_key] = _statuses.get(status_key, 0) + 1
+
+        if settings.METRICS_SPOOL_DIR:
+            global _last_flush
+            now = time.monotonic()
+            if now - _last_flush >= settings.METRICS_FLUSH_INTERVAL:
+                _last_flush = now
+                due = True
+    if due:
+        flush()
+
+
+def snapshot():
+    """Copie cohérente des compteurs de ce worker"""
+    with _lock:
+        routes = [[route, method, list(stats)] for (route, method), stats in _routes.items()]
+        statuses = [[route, method, status, count] for (route, method, status), count in _statuses.items()]
+    return {'routes': routes, 'statuses': statuses, 'pools': dbpool.stats(), 'started': _started_at()}
+
+
+_started = (None, None)
+
+
+def _started_at():
+    """Démarrage de ce processus (garde contre la réutilisation du pid), relu après un fork"""
+    global _started
+    pid = os.getpid()
+    if _started[0] != pid:
+        _started = (pid, processes.started_at(pid))
+    return _started[1]
+
+
+def flush():
+    """
+    Publie l'instantané de ce worker dans le répertoire de spool (écriture atomique)
+    Une erreur d'écriture est journalisée : elle ne doit pas faire échouer la requête
+    """
+    directory = settings.METRICS_SPOOL_DIR
+    path = os.path.join(directory, f'{os.getpid()}.json')
+    # Fichier temporaire propre au thread : deux threads peuvent publier en même temps
+    tmp = f'{path}.{threading.get_ident()}.tmp'
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(tmp, 'w') as f:
+            json.dump(snapshot(), f)
+        os.replace(tmp, path)
+    except (OSError, TypeError, ValueError):
+        logger.exception('Publication des métriques impossible (%s)', path)
+
+
+def clear_spool():
+    """Supprime les instantanés d'une exécution précédente (maître gunicorn, avant les workers)"""
+    directory = settings.METRICS_SPOOL_DIR
+    if not directory or not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name.endswith(('.json', '.tmp')):
+            _remove(os.path.join(directory, name))
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def collect():
+    """Instantanés de tous les workers fusionnés (ce processus : données en direct)"""
+    snapshots = [snapshot()]
+    directory = settings.METRICS_SPOOL_DIR
+    if directory and os.path.isdir(directory):
+        own = f'{os.getpid()}.json'
+        for name in os.listdir(directory):
+            if not name.endswith('.json') or name == own:
+                continue
+            path = os.path.join(directory, name)
+            try:
+                pid = int(name[:-len('.json')])
+                with open(path) as f:
+                    data = json.load(f)
+            except ValueError:
+                _remove(path)
+                continue
+            except OSError:
+                continue
+            # Worker mort : ses compteurs disparaissent avec lui
+            if not processes.is_running(pid, data.get('started')):
+                _remove(path)
+                continue
+            snapshots.append(data)
+
+    routes, statuses, pools = {}, {}, {}
+    for data in snapshots:
+        for route, method, stats in data['routes']:
+            merged = routes.setdefault((route, method), [0] * len(stats))
+            for i, value in enumerate(stats):
+                merged[i] += value
+        for route, method, status, count in data['statuses']:
+            key = (route, method, status)
+            statuses[key] = statuses.get(key, 0) + count
+        # Somme sur les workers : connexions ouvertes au total, capacité totale...
+        for alias, values in data.get('pools', {}).items():
+            merged = pools.setdefault(alias, {})
+            for key, value in values.items():
+                merged[key] = merged.get(key, 0) + value
+    return routes, statuses, pools
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in labels.items()) + '}'
+
+
+def render_prometheus():
+    routes, statuses, pools = collect()
+    lines = [
+        '# HELP pda_http_requests_total Requêtes HTTP par route, méthode et statut.',
+        '# TYPE pda_http_requests_total counter',
+    ]
+    for (route, method, status), count in sorted(statuses.items()):
+        lines.append(f'pda_http_requests_total{_labels(route=route, method=method, status=status)} {count}')
+
+    lines += [
+        '# HELP pda_http_request_duration_seconds Latence des requêtes HTTP.',
+        '# TYPE pda_http_request_duration_seconds histogram',
+    ]
+    for (route, method), stats in sorted(routes.items()):
+        cumulative = 0
+        for bound, count in zip(BUCKETS + (float('inf'),), stats[BUCKET_START:]):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(
+                f'pda_http_request_duration_seconds_bucket{_labels(route=route, method=method, le=le)} {cumulative}'
+            )
+        labels = _labels(route=route, method=method)
+        lines.append(f'pda_http_request_duration_seconds_sum{labels} {stats[LATENCY_SUM]:.6f}')
+        lines.append(f'pda_http_request_duration_seconds_count{labels} {stats[COUNT]}')
+
+    for name, index, help_text, fmt in (
+        ('pda_db_queries_total', QUERIES, 'Requêtes SQL exécutées.', '{}'),
+        ('pda_db_query_duration_seconds_total', DB_TIME, 'Temps passé en base.', '{:.6f}'),
+        ('pda_http_response_size_bytes_total', RESPONSE_BYTES, 'Octets renvoyés.', '{}'),
+    ):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for (route, method), stats in sorted(routes.items()):
+            lines.append(f'{name}{_labels(route=route, method=method)} {fmt.format(stats[index])}')
+
+    if pools:
+        lines += [
+            '# HELP pda_db_pool_connections Connexions des pools, tous workers confondus.',
+            '# TYPE pda_db_pool_connections gauge',
+        ]
+        for alias, values in sorted(pools.items()):
+            lines.append(f'pda_db_pool_connections{_labels(database=alias, state="in_use")} {values["in_use"]}')
+            lines.append(f'pda_db_pool_connections{_labels(database=alias, state="idle")} {values["pool_available"]}')
+        for name, key, help_text, kind, scale in (
+            ('pda_db_pool_max_connections', 'pool_max', 'Capacité totale des pools.', 'gauge', 1),
+            ('pda_db_pool_waiting_requests', 'requests_waiting', 'Emprunts en attente de connexion.', 'gauge', 1),
+            ('pda_db_pool_checkouts_total', 'requests_num', 'Connexions empruntées.', 'counter', 1),
+            ('pda_db_pool_checkouts_queued_total', 'requests_queued', "Emprunts qui ont dû attendre.", 'counter', 1),
+            ('pda_db_pool_checkout_wait_seconds_total', 'requests_wait_ms', "Temps d'attente cumulé des emprunts.", 'counter', 1000),
+            ('pda_db_pool_checkout_errors_total', 'requests_errors', "Emprunts en échec (délai dépassé).", 'counter', 1),
+            ('pda_db_pool_connections_opened_total', 'connections_num', 'Connexions ouvertes par les pools.', 'counter', 1),
+            ('pda_db_pool_connections_lost_total', 'connections_lost', 'Connexions perdues détectées au contrôle.', 'counter', 1),
+        ):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+            for alias, values in sorted(pools.items()):
+                value = values[key] / scale if scale != 1 else values[key]
+                lines.append(f'{name}{_labels(database=alias)} {value}')
+
+    return '\n'.join(lines) + '\n'
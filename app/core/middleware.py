@@ -0,0 +1,410 @@
+import cProfile
+import functools
+import logging
+import pstats
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from app.authentication.backends import CachedJWTAuthentication
+from . import db_router, metrics, profiling, traffic
+from .querylog import QueryLogger
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCounter:
+    """Nombre et durée des requêtes SQL de la requête HTTP en cours"""
+
+    __slots__ = ('count', 'duration')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+_current_counter = ContextVar('query_counter', default=None)
+_query_wrappers = ContextVar('query_wrappers', default=())
+
+
+@contextmanager
+def query_wrapper(wrapper):
+    """
+    Comme connection.execute_wrapper(), mais lié à la requête HTTP en cours et non à la
+    connexion : sous ASGI, l'ORM async exécute le SQL dans un thread où le proxy
+    connection n'est pas celui de la vue, alors que le contexte y est copié.
+    """
+    token = _query_wrappers.set(_query_wrappers.get() + (wrapper,))
+    try:
+        yield
+    finally:
+        _query_wrappers.reset(token)
+
+
+def count_queries(execute, sql, params, many, context):
+    """
+    execute_wrapper installé sur chaque connexion, actif seulement pendant une requête
+    mesurée : compte les requêtes SQL et applique les wrappers de query_wrapper()
+    """
+    wrappers = _query_wrappers.get()
+    if wrappers:
+        for wrapper in reversed(wrappers):
+            execute = functools.partial(wrapper, execute)
+    counter = _current_counter.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        counter.duration += time.perf_counter() - start
+        counter.count += 1
+
+
+def install_query_counter(sender, connection, **kwargs):
+    # Installé une fois par connexion plutôt qu'un « with connection.execute_wrapper() »
+    # à chaque requête : l'accès au proxy connection coûte plus cher que la mesure
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+connection_created.connect(install_query_counter, dispatch_uid='metrics_query_counter')
+
+
+class HybridMiddleware:
+    """
+    Base des middlewares du projet : synchrones sous WSGI, asynchrones sous
+    ASGI (vues async de app.core.async_api) sans passage par un thread.
+    Les sous-classes implémentent handle() et ahandle().
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.ahandle(request)
+        return self.handle(request)
+
+    def handle(self, request):
+        raise NotImplementedError
+
+    async def ahandle(self, request):
+        raise NotImplementedError
+
+
+class MetricsMiddleware(HybridMiddleware):
+    """
+    Latence, requêtes SQL et taille de réponse par nom de route.
+    À placer en tête de MIDDLEWARE pour mesurer toute la chaîne.
+    """
+
+    def handle(self, request):
+        counter = QueryCounter()
+        token = _current_counter.set(counter)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_counter.reset(token)
+        self.record(request, response, counter, time.perf_counter() - start)
+        return response
+
+    async def ahandle(self, request):
+        # Le ContextVar suit la tâche et est copié dans les threads de sync_to_async (ORM async)
+        counter = QueryCounter()
+        token = _current_counter.set(counter)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_counter.reset(token)
+        self.record(request, response, counter, time.perf_counter() - start)
+        return response
+
+    @staticmethod
+    def record(request, response, counter, latency):
+        match = request.resolver_match
+        route = (match.url_name or match.view_name) if match else 'unmatched'
+        # Content-Length est posé par CommonMiddleware : évite de recopier le corps
+        size = response.get('Content-Length')
+        if size is None:
+            size = 0 if response.streaming else len(response.content)
+        try:
+            metrics.record(route, request.method, response.status_code, latency,
+                           counter.count, counter.duration, int(size))
+        except Exception:
+            # Les métriques ne doivent jamais faire échouer une réponse
+            logger.exception('Enregistrement des métriques impossible')
+
+
+class SlowQueryMiddleware(HybridMiddleware):
+    """Journalise les requêtes SQL lentes et les N+1 (voir app.core.querylog)"""
+
+    def __init__(self, get_response):
+        if settings.SLOW_QUERY_THRESHOLD_MS <= 0:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def handle(self, request):
+        query_logger = QueryLogger(request)
+        with query_wrapper(query_logger):
+            response = self.get_response(request)
+        query_logger.finish()
+        return response
+
+    async def ahandle(self, request):
+        query_logger = QueryLogger(request)
+        with query_wrapper(query_logger):
+            response = await self.get_response(request)
+        query_logger.finish()
+        return response
+
+
+def _is_admin(request):
+    """Le middleware s'exécute avant l'authentification DRF : vérifier le JWT ici"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return getattr(user, 'role', None) == 'admin'
+    try:
+        result = CachedJWTAuthentication().authenticate(request)
+    except (AuthenticationFailed, InvalidToken):
+        return False
+    return result is not None and result[0].role == 'admin'
+
+
+async def _ais_admin(request):
+    try:
+        result = await CachedJWTAuthentication().aauthenticate(request)
+    except (AuthenticationFailed, InvalidToken):
+        return False
+    return result is not None and result[0].role == 'admin'
+
+
+def _wants_profile(request):
+    return request.META['HTTP_X_PROFILE'].lower() in ('1', 'true')
+
+
+class ProfilingMiddleware(HybridMiddleware):
+    """
+    Profil complet des requêtes portant « X-Profile: 1 » envoyées par un admin (voir app.core.profiling).
+    Sous ASGI, le profil couvre la boucle d'événements : les requêtes concurrentes
+    du même worker y apparaissent aussi.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def handle(self, request):
+        if 'HTTP_X_PROFILE' not in request.META:
+            return self.get_response(request)
+        if not _wants_profile(request) or not _is_admin(request):
+            return self.get_response(request)
+        session = self.start()
+        try:
+            with query_wrapper(session[2]):
+                response = self.get_response(request)
+        finally:
+            self.stop(session)
+        return self.finish(request, response, session)
+
+    async def ahandle(self, request):
+        if 'HTTP_X_PROFILE' not in request.META:
+            return await self.get_response(request)
+        if not _wants_profile(request) or not await _ais_admin(request):
+            return await self.get_response(request)
+        session = self.start()
+        try:
+            with query_wrapper(session[2]):
+                response = await self.get_response(request)
+        finally:
+            self.stop(session)
+        return self.finish(request, response, session)
+
+    @staticmethod
+    def start():
+        profile_id = profiling.new_profile_id()
+        origin = time.perf_counter()
+        timeline = profiling.QueryTimeline(origin)
+        sampler = profiling.StackSampler(
+            threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL_MS / 1000
+        )
+        profiler = cProfile.Profile()
+
+        sampler.start()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Un autre profileur est déjà actif (débogueur, coverage) : échantillonnage seul
+            profiler = None
+        return profile_id, origin, timeline, sampler, profiler
+
+    @staticmethod
+    def stop(session):
+        _, _, _, sampler, profiler = session
+        if profiler is not None:
+            profiler.disable()
+        sampler.stop()
+
+    @staticmethod
+    def finish(request, response, session):
+        profile_id, origin, timeline, sampler, profiler = session
+        duration = time.perf_counter() - origin
+
+        stats = pstats.Stats(profiler) if profiler is not None else None
+        match = request.resolver_match
+        profiling.save(profile_id, {
+            'id': profile_id,
+            'created_at': timezone.now().isoformat(),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 3),
+            'query_count': len(timeline.queries),
+            'db_ms': round(sum(query['duration_ms'] for query in timeline.queries), 3),
+            'serializer_ms': round(profiling.serializer_time(stats) * 1000, 3) if stats else None,
+            'samples': sum(sampler.stacks.values()),
+            'queries': timeline.queries,
+            'top_functions': profiling.top_functions(stats) if stats else [],
+        }, profiler, sampler)
+
+        response['X-Profile-Id'] = profile_id
+        return response
+
+
+class TrafficCaptureMiddleware(HybridMiddleware):
+    """Échantillon de requêtes d'API anonymisées au format JSONL (voir app.core.traffic)"""
+
+    def __init__(self, get_response):
+        if settings.TRAFFIC_CAPTURE_RATE <= 0:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.rate = settings.TRAFFIC_CAPTURE_RATE
+
+    def sampled(self, request):
+        return random.random() < self.rate and traffic.should_capture(request.path)
+
+    def handle(self, request):
+        if not self.sampled(request):
+            return self.get_response(request)
+
+        # Lu avant la vue : le flux ne peut être consommé qu'une fois
+        body, replayable = traffic.captured_body(request)
+        started_at = timezone.now()
+        start = time.perf_counter()
+        response = self.get_response(request)
+        traffic.record(request, response, started_at, time.perf_counter() - start, body, replayable)
+        return response
+
+    async def ahandle(self, request):
+        if not self.sampled(request):
+            return await self.get_response(request)
+
+        # Sous ASGI le corps est déjà reçu en entier : sa lecture ne bloque pas
+        body, replayable = traffic.captured_body(request)
+        started_at = timezone.now()
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        traffic.record(request, response, started_at, time.perf_counter() - start, body, replayable)
+        return response
+
+
+def _token_user_id(request):
+    """Identifiant de l'utilisateur porté par le JWT, sans requête SQL"""
+    authentication = CachedJWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return None
+    try:
+        return authentication.get_validated_token(raw_token).get(api_settings.USER_ID_CLAIM)
+    except InvalidToken:
+        return None
+
+
+class ReplicaRoutingMiddleware(HybridMiddleware):
+    """Lectures des requêtes GET sur les réplicas, avec lecture de ses écritures (voir app.core.db_router)"""
+
+    def __init__(self, get_response):
+        if not settings.REPLICA_DATABASES:
+            raise MiddlewareNotUsed
+        db_router.check_pin_cache()
+        super().__init__(get_response)
+
+    def handle(self, request):
+        user_id = _token_user_id(request)
+        replica = request.method in db_router.SAFE_METHODS and not (
+            user_id is not None and db_router.is_pinned(user_id)
+        )
+        state, token = db_router.begin(replica)
+        try:
+            response = self.get_response(request)
+        finally:
+            db_router.end(token)
+        if state.wrote and user_id is not None:
+            db_router.pin(user_id)
+        return response
+
+    async def ahandle(self, request):
+        user_id = _token_user_id(request)
+        replica = request.method in db_router.SAFE_METHODS and not (
+            user_id is not None and await db_router.ais_pinned(user_id)
+        )
+        state, token = db_router.begin(replica)
+        try:
+            response = await self.get_response(request)
+        finally:
+            db_router.end(token)
+        if state.wrote and user_id is not None:
+            await db_router.apin(user_id)
+        return response
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise 6 n'est que synchrone : sous ASGI il ferait passer chaque
+    requête par un thread. Ici seule la recherche du fichier (un dict) se
+    fait dans la boucle ; le service d'un fichier statique part dans un thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.ahandle(request)
+        return super().__call__(request)
+
+    async def ahandle(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file, thread_sensitive=False)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve, thread_sensitive=False)(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,115 @@
+"""
+Mode préchargé de gunicorn (Backend/gunicorn_conf.py).
+
+Le maître importe l'application, la prépare (warm_up), ferme ses
+connexions (before_fork) puis gèle ses objets (gc.freeze) avant de
+forker les workers : ceux-ci partagent en copy-on-write le code et les
+structures construites une fois pour toutes, au lieu de tout reconstruire
+chacun de leur côté. after_fork() s'exécute dans chaque worker neuf.
+
+Ce qui est préparé dans le maître :
+  - résolveurs d'URL (tables de reverse) et vues différées (lazy_view) ;
+  - métadonnées des modèles ;
+  - champs des sérialiseurs DRF du projet et plans des FastSerializer ;
+  - schéma OpenAPI (génération à blanc, pour charger drf_spectacular) ;
+  - modules lourds importés à la demande ailleurs (pandas...).
+"""
+import importlib
+import time
+
+from django.apps import apps
+from django.core.cache import caches
+from django.db import connections
+from django.urls import URLResolver, get_resolver
+from rest_framework import serializers
+
+from .fast_serializers import FastSerializer
+
+
+def _subclasses(cls):
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from _subclasses(subclass)
+
+
+def _project_classes(base):
+    return [cls for cls in _subclasses(base) if cls.__module__.startswith('app.')]
+
+
+def _walk(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _walk(pattern.url_patterns)
+        else:
+            yield pattern
+
+
+def warm_urls():
+    resolver = get_resolver()
+    # Construit les tables de reverse() et de namespaces du maître
+    resolver.reverse_dict, resolver.namespace_dict, resolver.app_dict
+    for pattern in _walk(resolver.url_patterns):
+        load = getattr(pattern.callback, 'load', None)
+        if load is not None:
+            load()
+
+
+def warm_models():
+    for model in apps.get_models():
+        model._meta.get_fields()
+
+
+def warm_serializers():
+    for serializer_class in _project_classes(serializers.Serializer):
+        serializer_class().fields
+    for fast_class in _project_classes(FastSerializer):
+        if fast_class.serializer_class is not None:
+            fast_class.compile()
+
+
+def warm_schema():
+    from drf_spectacular.drainage import GENERATOR_STATS
+    from drf_spectacular.settings import spectacular_settings
+
+    with GENERATOR_STATS.silence():
+        spectacular_settings.DEFAULT_GENERATOR_CLASS().get_schema(request=None, public=True)
+
+
+def warm_up(modules=(), schema=True):
+    """Prépare l'application dans le maître ; renvoie {étape: durée en secondes}"""
+    steps = [
+        ('modules', lambda: [importlib.import_module(module) for module in modules]),
+        ('urls', warm_urls),
+        ('models', warm_models),
+        ('serializers', warm_serializers),
+    ]
+    if schema:
+        steps.append(('schema', warm_schema))
+
+    timings = {}
+    for name, step in steps:
+        start = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - start
+    return timings
+
+
+def before_fork():
+    """Le maître ne doit rien garder d'ouvert que les workers hériteraient"""
+    for conn in connections.all(initialized_only=True):
+        conn.close()
+        # Pool psycopg (DB_POOL) : ses threads de maintenance ne survivent pas au fork
+        if hasattr(conn, 'close_pool'):
+            conn.close_pool()
+    caches.close_all()
+
+
+def after_fork():
+    """Dans le worker : oublier toute connexion héritée du maître"""
+    for conn in connections.all(initialized_only=True):
+        # Le socket appartient au maître : le fermer ici couperait aussi sa session
+        conn.connection = None
+        conn.close()
+        pools = getattr(type(conn), '_connection_pools', None)
+        if pools:
+            pools.clear()
@@ -0,0 +1,43 @@
+"""
+Fichiers déposés par chaque worker sous son pid (métriques, journaux) :
+savoir si le worker qui a écrit un fichier tourne encore.
+
+Un pid seul ne suffit pas : celui d'un worker mort peut être repris par
+un autre processus. L'instant de démarrage du processus (/proc, Linux)
+est donc conservé avec le pid et comparé ; ailleurs, seul le pid compte.
+"""
+import os
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Processus d'un autre utilisateur : vivant
+        return True
+    except (OverflowError, ValueError):
+        return False
+    return True
+
+
+def started_at(pid):
+    """Démarrage du processus (tops d'horloge depuis le boot, /proc/<pid>/stat), ou None si inconnu"""
+    try:
+        with open(f'/proc/{pid}/stat', 'rb') as f:
+            stat = f.read()
+        # Le nom du programme (2e champ, entre parenthèses) peut contenir des espaces
+        return int(stat[stat.rindex(b')') + 2:].split()[19])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def is_running(pid, started=None):
+    """Le processus pid tourne, et c'est bien celui démarré à `started` si on le connaît"""
+    if not is_alive(pid):
+        return False
+    if started is None:
+        return True
+    current = started_at(pid)
+    return current is None or current == started
@@ -0,0 +1,210 @@
+"""
+Profilage à la demande : un admin ajoute l'en-tête « X-Profile: 1 » à
+n'importe quel appel d'API.
+
+Pour cette requête seulement, ProfilingMiddleware active :
+  - cProfile (profile.prof, lisible avec pstats / snakeviz) ;
+  - un échantillonneur de piles (stacks.collapsed, format « collapsed »
+    prêt pour flamegraph.pl / speedscope) ;
+  - la chronologie des requêtes SQL (début, durée, SQL, ligne d'origine) ;
+  - le temps passé dans les sérialiseurs (DRF et FastSerializer).
+
+Le résultat est stocké dans PROFILE_DIR/<id>/ et l'id est renvoyé dans
+l'en-tête X-Profile-Id ; /api/admin/profiles/<id>/ le restitue.
+Sans l'en-tête, le middleware ne fait qu'une recherche dans request.META.
+"""
+import json
+import os
+import re
+import secrets
+import shutil
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.utils import timezone
+
+from .querylog import caller
+
+PROFILE_ID_RE = re.compile(r'^[0-9]{14}-[0-9a-f]{8}$')
+ARTIFACTS = {
+    'prof': ('profile.prof', 'application/octet-stream'),
+    'collapsed': ('stacks.collapsed', 'text/plain; charset=utf-8'),
+}
+
+# Fichiers dont le temps est compté comme « sérialisation »
+SERIALIZER_FILES = re.compile(
+    r'(rest_framework[\\/](serializers|fields|relations)\.py'
+    r'|app[\\/]core[\\/](fast_serializers|fieldsets)\.py'
+    r'|app[\\/]\w+[\\/]serializers\.py)$'
+)
+
+
+# sys.setswitchinterval() vaut pour tout le processus : avec des workers gthread,
+# plusieurs requêtes profilées se chevauchent. L'intervalle d'origine est gardé
+# par le premier échantillonneur et rétabli par le dernier qui s'arrête.
+_switch_lock = threading.Lock()
+_switch_users = 0
+_switch_saved = None
+
+
+def _lower_switch_interval(interval):
+    global _switch_users, _switch_saved
+    with _switch_lock:
+        if _switch_users == 0:
+            _switch_saved = sys.getswitchinterval()
+        _switch_users += 1
+        sys.setswitchinterval(min(sys.getswitchinterval(), interval))
+
+
+def _restore_switch_interval():
+    global _switch_users
+    with _switch_lock:
+        _switch_users -= 1
+        if _switch_users == 0:
+            sys.setswitchinterval(_switch_saved)
+
+
+def profile_path(profile_id, *parts):
+    return os.path.join(settings.PROFILE_DIR, profile_id, *parts)
+
+
+def is_valid_id(profile_id):
+    return bool(PROFILE_ID_RE.match(profile_id))
+
+
+class StackSampler(threading.Thread):
+    """Relève la pile du thread profilé toutes les PROFILE_SAMPLE_INTERVAL_MS"""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def start(self):
+        # Sans cela le thread profilé garde le GIL 5 ms d'affilée (sys.getswitchinterval())
+        _lower_switch_interval(self.interval / 2)
+        try:
+            super().start()
+        except BaseException:
+            _restore_switch_interval()
+            raise
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        _restore_switch_interval()
+
+
+class QueryTimeline:
+    """execute_wrapper : début (relatif à la requête), durée, SQL et origine de chaque requête"""
+
+    def __init__(self, origin):
+        self.origin = origin
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            end = time.perf_counter()
+            self.queries.append({
+                'start_ms': round((start - self.origin) * 1000, 3),
+                'duration_ms': round((end - start) * 1000, 3),
+                'sql': sql,
+                'many': many,
+                'source': caller(),
+            })
+
+
+def serializer_time(stats):
+    """
+    Temps inclusif des fonctions de sérialisation, compté sur les seuls appels
+    venant de l'extérieur de ces fichiers (pas de double comptage des imbrications)
+    """
+    total = 0.0
+    for (filename, _, _), (_, _, _, _, callers) in stats.stats.items():
+        if not SERIALIZER_FILES.search(filename):
+            continue
+        for (caller_file, _, _), (_, _, _, cumulative) in callers.items():
+            if not SERIALIZER_FILES.search(caller_file):
+                total += cumulative
+    return total
+
+
+def top_functions(stats, limit=30):
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {
+            'function': f'{name} ({filename}:{line})',
+            'calls': calls,
+            'own_ms': round(own * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3),
+        }
+        for (filename, line, name), (_, calls, own, cumulative, _) in rows
+    ]
+
+
+def new_profile_id():
+    return f'{timezone.now():%Y%m%d%H%M%S}-{secrets.token_hex(4)}'
+
+
+def save(profile_id, summary, profiler, sampler):
+    directory = profile_path(profile_id)
+    os.makedirs(directory, exist_ok=True)
+    if profiler is not None:
+        profiler.dump_stats(os.path.join(directory, ARTIFACTS['prof'][0]))
+    with open(os.path.join(directory, ARTIFACTS['collapsed'][0]), 'w', encoding='utf-8') as f:
+        for stack, count in sampler.stacks.most_common():
+            f.write(f'{stack} {count}\n')
+    with open(os.path.join(directory, 'summary.json'), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False)
+    prune()
+
+
+def prune():
+    """Ne garde que les PROFILE_KEEP profils les plus récents"""
+    root = settings.PROFILE_DIR
+    ids = sorted(name for name in os.listdir(root) if is_valid_id(name))
+    for profile_id in ids[:-settings.PROFILE_KEEP] if settings.PROFILE_KEEP > 0 else ():
+        shutil.rmtree(os.path.join(root, profile_id), ignore_errors=True)
+
+
+def load_summary(profile_id):
+    path = profile_path(profile_id, 'summary.json')
+    if not is_valid_id(profile_id) or not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def list_profiles():
+    root = settings.PROFILE_DIR
+    if not os.path.isdir(root):
+        return []
+    profiles = []
+    for profile_id in sorted(os.listdir(root), reverse=True):
+        summary = load_summary(profile_id)
+        if summary is None:
+            continue
+        profiles.append({key: summary[key] for key in (
+            'id', 'created_at', 'method', 'path', 'view', 'status', 'duration_ms',
+            'query_count', 'db_ms', 'serializer_ms',
+        )})
+    return profiles
@@ -0,0 +1,181 @@
+"""
+Journal des requêtes SQL lentes et des suspicions de N+1.
+
+SlowQueryMiddleware installe un QueryLogger (execute_wrapper lié à la requête)
+pour la durée de chaque requête HTTP :
+  - toute requête SQL plus longue que SLOW_QUERY_THRESHOLD_MS est écrite
+    immédiatement (kind="slow") ;
+  - un même SQL exécuté au moins SLOW_QUERY_N_PLUS_ONE fois dans la même
+    requête HTTP (doublons ou boucle sur une relation) est écrit en fin de
+    requête (kind="n_plus_one").
+
+Chaque entrée porte la vue, la ligne de code applicatif à l'origine de la
+requête, le SQL et une empreinte des paramètres (jamais leurs valeurs).
+Chaque worker écrit dans son propre fichier JSONL dérivé de
+SLOW_QUERY_LOG_FILE (voir app.core.logfiles), qui tourne à
+SLOW_QUERY_LOG_MAX_BYTES ; l'ensemble des fichiers est borné à
+SLOW_QUERY_LOG_TOTAL_BYTES.
+"""
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import logfiles
+
+CORE_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+APP_DIR = os.path.dirname(CORE_DIR.rstrip(os.sep)) + os.sep
+PROJECT_DIR = os.path.dirname(APP_DIR.rstrip(os.sep))
+
+SQL_MAX_LENGTH = 2000
+
+logger = logging.getLogger('pda.slow_queries')
+logger.propagate = False
+
+
+def _ensure_handler():
+    logfiles.attach_handler(
+        logger,
+        settings.SLOW_QUERY_LOG_FILE,
+        settings.SLOW_QUERY_LOG_MAX_BYTES,
+        settings.SLOW_QUERY_LOG_BACKUPS,
+        settings.SLOW_QUERY_LOG_TOTAL_BYTES,
+    )
+
+
+def fingerprint(value):
+    return hashlib.sha1(value.encode('utf-8', 'replace')).hexdigest()[:12]
+
+
+def caller():
+    """Première frame du code applicatif (hors app/core) : 'app/orders/views.py:42 in create_order'"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(APP_DIR) and not filename.startswith(CORE_DIR):
+            relative = os.path.relpath(filename, PROJECT_DIR)
+            return f'{relative}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+class QueryLogger:
+    """execute_wrapper d'une requête HTTP : chronomètre chaque requête SQL"""
+
+    def __init__(self, request):
+        self.request = request
+        self.threshold = settings.SLOW_QUERY_THRESHOLD_MS / 1000
+        self.n_plus_one = settings.SLOW_QUERY_N_PLUS_ONE
+        # sql -> [nombre d'exécutions, durée cumulée, origine, paramètres des premières exécutions]
+        # Les paramètres ne sont comparés (repr) qu'en fin de requête, pour les seuls N+1
+        self.seen = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            stats = self.seen.get(sql)
+            if stats is None:
+                stats = self.seen[sql] = [0, 0.0, None, []]
+            stats[0] += 1
+            stats[1] += duration
+            if stats[0] <= self.n_plus_one:
+                stats[3].append(params)
+            if duration >= self.threshold:
+                source = caller()
+                stats[2] = stats[2] or source
+                self.write('slow', sql, params, duration * 1000, source,
+                           database=context['connection'].alias)
+            elif stats[0] == self.n_plus_one and stats[2] is None:
+                # L'origine n'est cherchée qu'au franchissement du seuil
+                stats[2] = caller()
+
+    def finish(self):
+        """Écrit les suspicions de N+1 une fois la requête HTTP terminée"""
+        for sql, (count, total, source, params) in self.seen.items():
+            if count >= self.n_plus_one:
+                # distinct_params > 1 : boucle sur une relation ; 1 : même requête répétée
+                self.write('n_plus_one', sql, None, total * 1000, source,
+                           count=count, distinct_params=len({repr(value) for value in params}))
+
+    def write(self, kind, sql, params, duration_ms, source, count=1, distinct_params=None, database=None):
+        match = self.request.resolver_match
+        entry = {
+            'ts': timezone.now().isoformat(),
+            'kind': kind,
+            'fingerprint': fingerprint(sql),
+            'params_fingerprint': fingerprint(repr(params)) if params is not None else None,
+            'sql': sql[:SQL_MAX_LENGTH],
+            'duration_ms': round(duration_ms, 3),
+            'count': count,
+            'distinct_params': distinct_params,
+            'database': database,
+            'view': match.view_name if match else None,
+            'method': self.request.method,
+            'path': self.request.path,
+            'source': source,
+        }
+        _ensure_handler()
+        logger.info(json.dumps(entry, ensure_ascii=False))
+
+
+def log_files():
+    """Fichiers de tous les workers, sauvegardes de rotation comprises"""
+    return logfiles.worker_files(settings.SLOW_QUERY_LOG_FILE, settings.SLOW_QUERY_LOG_BACKUPS)
+
+
+def read_entries(kind=None):
+    for path in log_files():
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if kind is None or entry.get('kind') == kind:
+                    yield entry
+
+
+def top_offenders(kind=None, sort='total', limit=20):
+    """Entrées regroupées par (kind, empreinte SQL), triées par temps total, max ou occurrences"""
+    groups = {}
+    for entry in read_entries(kind):
+        key = (entry['kind'], entry['fingerprint'])
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {
+                'kind': entry['kind'],
+                'fingerprint': entry['fingerprint'],
+                'sql': entry['sql'],
+                'occurrences': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'max_count': 0,
+                'views': set(),
+                'sources': set(),
+                'last_seen': entry['ts'],
+            }
+        group['occurrences'] += 1
+        group['total_ms'] += entry['duration_ms']
+        group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+        group['max_count'] = max(group['max_count'], entry.get('count', 1))
+        if entry.get('view'):
+            group['views'].add(entry['view'])
+        if entry.get('source'):
+            group['sources'].add(entry['source'])
+        group['last_seen'] = max(group['last_seen'], entry['ts'])
+
+    sort_key = {'total': 'total_ms', 'max': 'max_ms', 'count': 'occurrences'}[sort]
+    offenders = sorted(groups.values(), key=lambda g: g[sort_key], reverse=True)[:limit]
+    for group in offenders:
+        group['total_ms'] = round(group['total_ms'], 3)
+        group['views'] = sorted(group['views'])
+        group['sources'] = sorted(group['sources'])
+    return offenders
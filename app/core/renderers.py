@@ -0,0 +1,41 @@
+"""
+Renderer JSON rapide basé sur orjson.
+
+Même sortie que le JSONRenderer DRF (datetimes aware en ISO 8601 avec « Z »
+pour UTC, Decimal en float, chaînes paresseuses résolues) ; retombe sur le
+json de la bibliothèque standard si orjson n'est pas installé, si une
+indentation est demandée (API navigable) ou si orjson refuse une valeur.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    orjson = None
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+# Types non natifs pour orjson (Decimal, lazy strings, QuerySet...) : même conversion que DRF
+_default = JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.ensure_ascii or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Comme DRF : échapper U+2028 / U+2029 pour rester un sous-ensemble strict de JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -0,0 +1,194 @@
+"""
+Génération de données synthétiques pour les tests à grande échelle
+(utilisé par manage.py seed_scale).
+
+Ce module ne dépend pas de l'ORM : generate_chunk() s'exécute dans les
+processus d'un pool et renvoie des tuples prêts à charger (bulk_create ou
+COPY). Chaque bloc a son propre générateur aléatoire, dérivé de la graine
+et du numéro de bloc : le résultat ne dépend pas du nombre de processus.
+
+Cycle de vie simulé d'une commande (délais tirés de lois exponentielles) :
+created → confirmed (+3 min) → preparing → ready → in_delivery → delivered,
+avec des annulations (vendeur pendant les 3 minutes, livreur en cours de
+livraison). Une commande dont l'étape suivante tombe après `end` reste
+dans son statut courant : les commandes récentes sont en cours de
+traitement, les anciennes sont livrées ou annulées.
+"""
+import itertools
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+ORDER_COLUMNS = (
+    'id', 'order_number', 'seller_id', 'seller_name', 'customer_name', 'status', 'total_amount',
+    'is_paid', 'created_at', 'confirmed_at', 'prepared_at', 'ready_at', 'delivered_at',
+    'cancelled_at', 'magasinier_id', 'deliverer_id', 'deliverer_name', 'cancellation_reason',
+    'cancelled_by_id',
+)
+ITEM_COLUMNS = ('order_id', 'product_id', 'product_name', 'quantity', 'unit', 'unit_price', 'total_price')
+HISTORY_COLUMNS = ('order_id', 'action', 'user_id', 'user_role', 'description', 'created_at')
+NOTIFICATION_COLUMNS = ('user_id', 'notification_type', 'title', 'message', 'order_id', 'is_read', 'created_at')
+
+# Répartition horaire des créations de commandes (heure locale du dépôt, 0h → 23h)
+HOURLY_WEIGHTS = (
+    1, 1, 1, 1, 1, 2, 4, 8, 12, 14, 14, 12,
+    10, 11, 13, 14, 13, 11, 8, 5, 3, 2, 1, 1,
+)
+HOURLY_CUM_WEIGHTS = tuple(itertools.accumulate(HOURLY_WEIGHTS))
+# Nombre de lignes par commande
+LINE_COUNTS = (1, 2, 3, 4, 5, 6, 8, 10)
+LINE_CUM_WEIGHTS = tuple(itertools.accumulate((22, 24, 18, 12, 9, 6, 5, 4)))
+
+# Délais moyens entre étapes (secondes)
+MEAN_PREPARE_WAIT = 15 * 60
+MEAN_PREPARATION = 25 * 60
+MEAN_ASSIGN_WAIT = 10 * 60
+MEAN_DELIVERY = 40 * 60
+
+SELLER_CANCEL_RATE = 0.04
+DELIVERY_CANCEL_RATE = 0.03
+READ_AFTER = timedelta(days=2)
+
+CUSTOMERS = (
+    'Alimentation Diallo', 'Boutique Koné', 'Supérette Traoré', 'Épicerie Camara', 'Marché Sow',
+    'Dépôt Ouédraogo', 'Kiosque Bamba', 'Magasin Touré', 'Restaurant Keïta', 'Hôtel Cissé',
+)
+CANCEL_REASONS = ('Client absent', 'Adresse introuvable', 'Client a refusé la livraison', 'Véhicule en panne')
+
+
+def _skewed(rng, values):
+    """Choix biaisé vers le début de la liste (quelques vendeurs / livreurs très actifs)"""
+    return values[int(len(values) * rng.random() ** 2)]
+
+
+def _after(rng, moment, mean):
+    return moment + timedelta(seconds=rng.expovariate(1 / mean))
+
+
+def generate_chunk(args):
+    """
+    args : (numéro de bloc, premier index, dernier index exclu, world)
+    world : dict picklable (ids des utilisateurs, produits, fenêtre de temps, graine,
+            délai de confirmation...)
+    Renvoie (numéro de bloc, {'orders': [...], 'items': [...], 'history': [...], 'notifications': [...]})
+    """
+    chunk, start, stop, world = args
+    rng = random.Random(f"{world['seed']}:{chunk}")
+    end = world['end']
+    days = world['days']
+    vendeurs = world['vendeurs']
+    magasiniers = world['magasiniers']
+    livreurs = world['livreurs']
+    products = world['products']
+    fanout = min(world['confirm_fanout'], len(magasiniers))
+    base_id = world['base_id']
+    confirmation_delay = world['confirmation_delay']
+    hours = range(24)
+
+    orders, items, history, notifications = [], [], [], []
+
+    for index in range(start, stop):
+        order_id = base_id + index
+        seller_id, seller_name = _skewed(rng, vendeurs)
+        day = end.date() - timedelta(days=rng.randrange(days))
+        created = end.replace(
+            year=day.year, month=day.month, day=day.day,
+            hour=rng.choices(hours, cum_weights=HOURLY_CUM_WEIGHTS)[0], minute=rng.randrange(60),
+            second=rng.randrange(60), microsecond=rng.randrange(1_000_000),
+        )
+        if created > end:
+            created -= timedelta(days=1)
+        customer = f'{rng.choice(CUSTOMERS)} {rng.randint(1, 500)}'
+
+        # Lignes
+        total = Decimal('0')
+        lines = min(len(products), rng.choices(LINE_COUNTS, cum_weights=LINE_CUM_WEIGHTS)[0])
+        for product_id, name, unit, price in rng.sample(products, lines):
+            quantity = rng.randint(1, 20)
+            line_total = price * quantity
+            total += line_total
+            items.append((order_id, product_id, name, quantity, unit, price, line_total))
+
+        order = {
+            'status': 'pending', 'confirmed_at': None, 'prepared_at': None, 'ready_at': None,
+            'delivered_at': None, 'cancelled_at': None, 'magasinier_id': None, 'deliverer_id': None,
+            'deliverer_name': None, 'cancellation_reason': None, 'cancelled_by_id': None,
+        }
+        history.append((order_id, 'created', seller_id, 'vendeur',
+                        f'Commande créée par {seller_name} pour {customer}', created))
+
+        def notify(user_id, kind, title, message, moment):
+            notifications.append((user_id, kind, title, message, order_id,
+                                  moment < end - READ_AFTER and rng.random() < 0.95, moment))
+
+        # Étapes successives, interrompues dès qu'une date dépasse `end`
+        while True:
+            if rng.random() < SELLER_CANCEL_RATE:
+                moment = created + timedelta(seconds=rng.uniform(5, confirmation_delay))
+                if moment > end:
+                    break
+                order.update(status='cancelled', cancelled_at=moment, cancelled_by_id=seller_id,
+                             cancellation_reason='Annulée par le vendeur')
+                history.append((order_id, 'cancelled', seller_id, 'vendeur', 'Commande annulée par le vendeur', moment))
+                break
+
+            moment = created + timedelta(seconds=confirmation_delay)
+            if moment > end:
+                break
+            order.update(status='confirmed', confirmed_at=moment)
+            history.append((order_id, 'confirmed', seller_id, 'vendeur',
+                            'Commande automatiquement confirmée après 3 minutes', moment))
+            for magasinier_id, _ in rng.sample(magasiniers, fanout):
+                notify(magasinier_id, 'order_confirmed', 'Nouvelle commande confirmée',
+                       f'Commande reçue de {customer}', moment)
+
+            moment = _after(rng, moment, MEAN_PREPARE_WAIT)
+            if moment > end:
+                break
+            magasinier_id, magasinier_name = rng.choice(magasiniers)
+            order.update(status='preparing', prepared_at=moment, magasinier_id=magasinier_id)
+            history.append((order_id, 'preparing', magasinier_id, 'magasinier',
+                            f'Préparation commencée par {magasinier_name}', moment))
+
+            moment = _after(rng, moment, MEAN_PREPARATION)
+            if moment > end:
+                break
+            order.update(status='ready', ready_at=moment)
+            history.append((order_id, 'ready', magasinier_id, 'magasinier',
+                            "Commande prête, en attente d'assignation livreur", moment))
+
+            moment = _after(rng, moment, MEAN_ASSIGN_WAIT)
+            if moment > end:
+                break
+            deliverer_id, deliverer_name = _skewed(rng, livreurs)
+            order.update(status='in_delivery', deliverer_id=deliverer_id, deliverer_name=deliverer_name)
+            history.append((order_id, 'assigned', magasinier_id, 'magasinier',
+                            f'Livreur {deliverer_name} assigné par {magasinier_name}', moment))
+            notify(deliverer_id, 'order_assigned', 'Nouvelle livraison assignée',
+                   f'Commande pour {customer}', moment)
+
+            moment = _after(rng, moment, MEAN_DELIVERY)
+            if moment > end:
+                break
+            if rng.random() < DELIVERY_CANCEL_RATE:
+                reason = rng.choice(CANCEL_REASONS)
+                order.update(status='cancelled', cancelled_at=moment, cancelled_by_id=deliverer_id,
+                             cancellation_reason=reason)
+                history.append((order_id, 'delivery_cancelled', deliverer_id, 'livreur',
+                                f'Livraison annulée : {reason}', moment))
+                break
+            order.update(status='delivered', delivered_at=moment)
+            history.append((order_id, 'delivered', deliverer_id, 'livreur',
+                            f'Commande livrée avec succès par {deliverer_name}', moment))
+            notify(seller_id, 'order_delivered', 'Commande livrée', f'Commande livrée à {customer}', moment)
+            break
+
+        orders.append((
+            order_id, f'CMD-{created:%Y%m%d%H%M%S%f}-{order_id:04d}', seller_id, seller_name, customer,
+            order['status'], total, order['status'] == 'delivered', created,
+            order['confirmed_at'], order['prepared_at'], order['ready_at'], order['delivered_at'],
+            order['cancelled_at'], order['magasinier_id'], order['deliverer_id'], order['deliverer_name'],
+            order['cancellation_reason'], order['cancelled_by_id'],
+        ))
+
+    return chunk, {'orders': orders, 'items': items, 'history': history, 'notifications': notifications}
@@ -0,0 +1,325 @@
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.utils import OperationalError
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from app.users.models import User
+from . import db_router
+from .middleware import ReplicaRoutingMiddleware
+
+REPLICA = 'replica_1'
+
+# Cache partagé entre processus pour les tests (un LocMemCache est refusé avec des réplicas)
+SHARED_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': tempfile.mkdtemp(prefix='db-router-tests-'),
+    }
+}
+
+
+def _health(**healthy):
+    """ReplicaHealth déjà vérifié, dans l'état healthy (réplica sain par défaut)"""
+    healthy = healthy or {REPLICA: True}
+    health = db_router.ReplicaHealth(healthy)
+    health.healthy.update(healthy)
+    health.checked_at = dict.fromkeys(healthy, time.monotonic())
+    health.check = lambda alias: healthy[alias]
+    return health
+
+
+def _wait_for_check(health):
+    """Attend la fin de la vérification lancée en fond par refresh()"""
+    with health.lock:
+        pass
+
+
+def _bearer(user_id):
+    token = AccessToken()
+    token[settings.SIMPLE_JWT.get('USER_ID_CLAIM', 'user_id')] = user_id
+    return f'Bearer {token}'
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    """Choix de la base par ReplicaRouter selon l'état de la requête"""
+
+    def setUp(self):
+        patcher = mock.patch.object(db_router, 'health', _health())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = db_router.ReplicaRouter()
+
+    def read_in(self, replica):
+        state, token = db_router.begin(replica)
+        try:
+            return self.router.db_for_read(User)
+        finally:
+            db_router.end(token)
+
+    def test_outside_request_reads_primary(self):
+        self.assertEqual(self.router.db_for_read(User), DEFAULT_DB_ALIAS)
+
+    def test_safe_request_reads_replica(self):
+        self.assertEqual(self.read_in(True), REPLICA)
+
+    def test_unsafe_request_reads_primary(self):
+        self.assertEqual(self.read_in(False), DEFAULT_DB_ALIAS)
+
+    def test_reads_after_write_go_to_primary(self):
+        state, token = db_router.begin(True)
+        try:
+            self.assertEqual(self.router.db_for_read(User), REPLICA)
+            self.assertEqual(self.router.db_for_write(User), DEFAULT_DB_ALIAS)
+            self.assertTrue(state.wrote)
+            self.assertEqual(self.router.db_for_read(User), DEFAULT_DB_ALIAS)
+        finally:
+            db_router.end(token)
+
+    def test_primary_block_reads_primary(self):
+        state, token = db_router.begin(True)
+        try:
+            with db_router.primary():
+                self.assertEqual(self.router.db_for_read(User), DEFAULT_DB_ALIAS)
+            self.assertEqual(self.router.db_for_read(User), REPLICA)
+        finally:
+            db_router.end(token)
+
+    def test_atomic_block_reads_primary(self):
+        with mock.patch.object(connections[DEFAULT_DB_ALIAS], 'in_atomic_block', True):
+            self.assertEqual(self.read_in(True), DEFAULT_DB_ALIAS)
+
+    def test_replica_down_falls_back_to_primary(self):
+        with mock.patch.object(db_router, 'health', _health(**{REPLICA: False})):
+            self.assertEqual(self.read_in(True), DEFAULT_DB_ALIAS)
+
+    def test_unhealthy_replica_is_skipped(self):
+        with mock.patch.object(db_router, 'health', _health(replica_1=False, replica_2=True)):
+            self.assertEqual({self.read_in(True) for _ in range(4)}, {'replica_2'})
+
+    def test_connection_error_marks_replica_down(self):
+        connection = mock.Mock(alias=REPLICA)
+
+        def execute(sql, params, many, context):
+            raise OperationalError('connexion perdue')
+
+        with self.assertRaises(OperationalError):
+            db_router._watch_errors(execute, 'SELECT 1', None, False, {'connection': connection})
+        self.assertEqual(db_router.health.status(), {REPLICA: False})
+        self.assertEqual(self.read_in(True), DEFAULT_DB_ALIAS)
+
+    def test_check_reports_unreachable_replica(self):
+        connection = mock.MagicMock(vendor='sqlite')
+        connection.cursor.side_effect = OperationalError('connexion refusée')
+        with mock.patch.object(connections, 'create_connection', return_value=connection):
+            self.assertFalse(db_router.ReplicaHealth.check(REPLICA))
+        connection.close.assert_called_once()
+
+    def test_replica_rechecked_after_interval(self):
+        health = _health(**{REPLICA: False})
+        with mock.patch.object(db_router, 'health', health), \
+                override_settings(REPLICA_HEALTH_INTERVAL=0):
+            self.assertEqual(self.read_in(True), DEFAULT_DB_ALIAS)
+            _wait_for_check(health)
+            health.check = lambda alias: True
+            self.read_in(True)
+            _wait_for_check(health)
+            self.assertEqual(self.read_in(True), REPLICA)
+
+    def test_check_does_not_block_request(self):
+        health = _health()
+        started, release = threading.Event(), threading.Event()
+
+        def hanging_check(alias):
+            started.set()
+            release.wait(5)
+            return False
+
+        health.check = hanging_check
+        with mock.patch.object(db_router, 'health', health), \
+                override_settings(REPLICA_HEALTH_INTERVAL=0):
+            begin = time.monotonic()
+            self.assertEqual(self.read_in(True), REPLICA)
+            self.assertTrue(started.wait(1))
+            self.assertEqual(self.read_in(True), REPLICA)
+            self.assertLess(time.monotonic() - begin, 1)
+            release.set()
+            _wait_for_check(health)
+            self.assertEqual(self.read_in(True), DEFAULT_DB_ALIAS)
+
+    @override_settings(REPLICA_CHECK_TIMEOUT=2)
+    def test_check_connection_has_timeouts(self):
+        connection = mock.MagicMock(vendor='postgresql')
+        connection.settings_dict = {'OPTIONS': {'pool': {'min_size': 2}, 'sslmode': 'require'}}
+        connection.cursor.side_effect = OperationalError('délai dépassé')
+        with mock.patch.object(connections, 'create_connection', return_value=connection):
+            self.assertFalse(db_router.ReplicaHealth.check(REPLICA))
+        self.assertEqual(connection.settings_dict['OPTIONS'], {
+            'sslmode': 'require', 'connect_timeout': 2, 'options': '-c statement_timeout=2000',
+        })
+
+    def test_replicas_never_migrated(self):
+        self.assertTrue(self.router.allow_migrate(DEFAULT_DB_ALIAS, 'orders'))
+        self.assertFalse(self.router.allow_migrate(REPLICA, 'orders'))
+
+
+@override_settings(REPLICA_DATABASES=[REPLICA], REPLICA_PIN_SECONDS=10, CACHES=SHARED_CACHE)
+class ReplicaRoutingMiddlewareTests(SimpleTestCase):
+    """Routage des requêtes HTTP et épinglage après écriture"""
+
+    def setUp(self):
+        patcher = mock.patch.object(db_router, 'health', _health())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+        self.router = db_router.ReplicaRouter()
+        self.reads = []
+        self.write = False
+        self.middleware = ReplicaRoutingMiddleware(self.view)
+        cache.clear()
+
+    def view(self, request):
+        self.reads.append(self.router.db_for_read(User))
+        if self.write:
+            self.router.db_for_write(User)
+        return HttpResponse()
+
+    def request(self, method, user_id=7):
+        headers = {'HTTP_AUTHORIZATION': _bearer(user_id)} if user_id is not None else {}
+        self.middleware(self.factory.generic(method, '/api/orders/', **headers))
+        return self.reads[-1]
+
+    def test_get_reads_replica(self):
+        self.assertEqual(self.request('GET'), REPLICA)
+        self.assertEqual(self.request('HEAD'), REPLICA)
+
+    def test_other_methods_read_primary(self):
+        for method in ('POST', 'PUT', 'PATCH', 'DELETE'):
+            with self.subTest(method=method):
+                self.assertEqual(self.request(method), DEFAULT_DB_ALIAS)
+
+    def test_user_pinned_after_write(self):
+        self.write = True
+        self.request('POST')
+        self.write = False
+        self.assertTrue(db_router.is_pinned(7))
+        self.assertEqual(self.request('GET'), DEFAULT_DB_ALIAS)
+        # Les autres utilisateurs lisent toujours sur le réplica
+        self.assertEqual(self.request('GET', user_id=8), REPLICA)
+
+    def test_get_that_writes_pins_user(self):
+        self.write = True
+        self.assertEqual(self.request('GET'), REPLICA)
+        self.write = False
+        self.assertEqual(self.request('GET'), DEFAULT_DB_ALIAS)
+
+    def test_anonymous_write_not_pinned(self):
+        self.write = True
+        self.request('POST', user_id=None)
+        self.write = False
+        self.assertEqual(self.request('GET', user_id=None), REPLICA)
+
+    def test_pin_expires(self):
+        self.write = True
+        with override_settings(REPLICA_PIN_SECONDS=0.2):
+            self.request('POST')
+        self.write = False
+        self.assertEqual(self.request('GET'), DEFAULT_DB_ALIAS)
+        time.sleep(0.3)
+        self.assertFalse(db_router.is_pinned(7))
+        self.assertEqual(self.request('GET'), REPLICA)
+
+    def test_invalid_token_reads_replica(self):
+        request = self.factory.get('/api/orders/', HTTP_AUTHORIZATION='Bearer invalide')
+        self.middleware(request)
+        self.assertEqual(self.reads[-1], REPLICA)
+
+    def test_state_reset_after_request(self):
+        self.request('GET')
+        self.assertEqual(self.router.db_for_read(User), DEFAULT_DB_ALIAS)
+
+    def test_replica_down_falls_back_to_primary(self):
+        with mock.patch.object(db_router, 'health', _health(**{REPLICA: False})):
+            self.assertEqual(self.request('GET'), DEFAULT_DB_ALIAS)
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_disabled_without_replicas(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ReplicaRoutingMiddleware(self.view)
+
+    def test_process_local_cache_refused(self):
+        for backend in ('locmem.LocMemCache', 'dummy.DummyCache'):
+            with self.subTest(backend=backend), override_settings(
+                CACHES={'default': {'BACKEND': f'django.core.cache.backends.{backend}'}}
+            ):
+                with self.assertRaises(ImproperlyConfigured):
+                    ReplicaRoutingMiddleware(self.view)
+
+
+@override_settings(CACHES=SHARED_CACHE)
+class ReplicaDatabaseTests(TransactionTestCase):
+    """
+    Bout en bout sur deux bases locales ; lancer avec un réplica configuré, ex :
+    DATABASE_REPLICA_URLS=sqlite:////tmp/replica.sqlite3 python manage.py test app.core
+    (en test, le réplica est un miroir de la base principale)
+    """
+
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        if REPLICA not in settings.DATABASES:
+            cls.skipTest(cls, 'DATABASE_REPLICA_URLS non configuré')
+        super().setUpClass()
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(db_router, 'health', db_router.ReplicaHealth([REPLICA]))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        user = User.objects.create_user(username='replica_vendeur', password='replica-1234', role='vendeur')
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {RefreshToken.for_user(user).access_token}'
+
+    def queries(self, method, path):
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary, \
+                CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = getattr(self.client, method)(path)
+        self.assertLess(response.status_code, 400)
+        return len(primary), len(replica)
+
+    def test_get_on_replica_then_pinned_after_write(self):
+        primary, replica = self.queries('get', '/api/notifications/')
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+        primary, replica = self.queries('post', '/api/notifications/read-all/')
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+        primary, replica = self.queries('get', '/api/notifications/')
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_replica_down_reads_primary(self):
+        db_router.health.mark_down(REPLICA)
+        primary, replica = self.queries('get', '/api/notifications/')
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_transaction_reads_primary(self):
+        with transaction.atomic():
+            state, token = db_router.begin(True)
+            try:
+                self.assertEqual(User.objects.db_manager().db, DEFAULT_DB_ALIAS)
+                self.assertTrue(User.objects.filter(username='replica_vendeur').exists())
+            finally:
+                db_router.end(token)
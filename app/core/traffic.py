@@ -0,0 +1,143 @@
+"""
+Capture du trafic d'API pour rejeu (manage.py replay_traffic).
+
+TrafficCaptureMiddleware enregistre une fraction (TRAFFIC_CAPTURE_RATE)
+des requêtes /api/, une ligne JSON par requête, dans un fichier par
+worker dérivé de TRAFFIC_CAPTURE_FILE (voir app.core.logfiles), le tout
+borné à TRAFFIC_CAPTURE_TOTAL_BYTES :
+
+    {"ts": "...", "route": "create-order", "method": "POST",
+     "path": "/api/orders/create/", "query": "", "body": {...},
+     "role": "vendeur", "user": "3f1c9a02b7de", "status": 201,
+     "duration_ms": 41.2, "size": 913, "replayable": true}
+
+Le corps et la query string sont anonymisés : structure, clés, nombres
+et booléens conservés, chaînes remplacées par des « x » de même longueur,
+secrets masqués.
+L'utilisateur n'est identifié que par un pseudonyme stable (haché avec
+SECRET_KEY) et son rôle. Les chemins d'authentification et
+d'administration ne sont jamais capturés.
+"""
+import hashlib
+import json
+import logging
+import math
+from urllib.parse import parse_qsl, urlencode
+
+from django.conf import settings
+
+from . import logfiles
+
+SENSITIVE_KEYS = {'password', 'old_password', 'new_password', 'token', 'refresh', 'access', 'file'}
+EXCLUDED_PREFIXES = ('/api/auth/', '/api/admin/', '/api/metrics/', '/api/docs/', '/api/schema/', '/api/redoc/')
+REDACTED = '***'
+
+logger = logging.getLogger('pda.traffic')
+logger.propagate = False
+
+
+def _ensure_handler():
+    logfiles.attach_handler(
+        logger,
+        settings.TRAFFIC_CAPTURE_FILE,
+        settings.TRAFFIC_CAPTURE_MAX_BYTES,
+        settings.TRAFFIC_CAPTURE_BACKUPS,
+        settings.TRAFFIC_CAPTURE_TOTAL_BYTES,
+    )
+
+
+def should_capture(path):
+    return path.startswith('/api/') and not path.startswith(EXCLUDED_PREFIXES)
+
+
+def anonymize(value, key=None):
+    """Même forme et même taille, sans données personnelles"""
+    if key is not None and key.lower() in SENSITIVE_KEYS:
+        return REDACTED
+    if isinstance(value, dict):
+        return {k: anonymize(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [anonymize(v) for v in value]
+    if isinstance(value, str):
+        return 'x' * len(value)
+    return value
+
+
+def _is_number(value):
+    # « nan », « Infinity »... passent float() mais peuvent être des noms
+    try:
+        return math.isfinite(float(value))
+    except ValueError:
+        return False
+
+
+def anonymize_query(query):
+    """Query string anonymisée comme le corps (les valeurs y sont toutes des chaînes)"""
+    if not query:
+        return ''
+    params = []
+    for key, value in parse_qsl(query, keep_blank_values=True):
+        if key.lower() in SENSITIVE_KEYS:
+            value = REDACTED
+        elif not (_is_number(value) or value.lower() in ('true', 'false')):
+            value = 'x' * len(value)
+        params.append((key, value))
+    return urlencode(params, safe='*')
+
+
+def pseudonym(user_id):
+    return hashlib.sha256(f'{settings.SECRET_KEY}:{user_id}'.encode()).hexdigest()[:12]
+
+
+def captured_body(request):
+    """(corps anonymisé, rejouable ?) ; les envois de fichiers ne sont pas rejouables"""
+    if request.method in ('GET', 'HEAD', 'OPTIONS', 'DELETE'):
+        return None, True
+    content_type = request.content_type or ''
+    if content_type.startswith('multipart/') or not content_type.endswith('json'):
+        return {'_content_type': content_type, '_size': int(request.META.get('CONTENT_LENGTH') or 0)}, False
+    try:
+        return anonymize(json.loads(request.body or b'null')), True
+    except ValueError:
+        return None, False
+
+
+def record(request, response, started_at, duration, body, replayable):
+    match = request.resolver_match
+    user = getattr(request, 'user', None)
+    authenticated = user is not None and user.is_authenticated
+    size = response.get('Content-Length')
+    entry = {
+        # Heure d'arrivée (et non de fin) : c'est elle que le rejeu reproduit
+        'ts': started_at.isoformat(),
+        'route': match.url_name or match.view_name if match else None,
+        'method': request.method,
+        'path': request.path,
+        'query': anonymize_query(request.META.get('QUERY_STRING', '')),
+        'body': body,
+        'role': getattr(user, 'role', None) if authenticated else None,
+        'user': pseudonym(user.pk) if authenticated else None,
+        'status': response.status_code,
+        'duration_ms': round(duration * 1000, 3),
+        'size': int(size) if size is not None else None,
+        'replayable': replayable,
+    }
+    _ensure_handler()
+    logger.info(json.dumps(entry, ensure_ascii=False))
+
+
+def read_capture(path):
+    """Entrées d'une capture (fichiers de tous les workers), dans l'ordre chronologique"""
+    entries = []
+    for capture in logfiles.worker_files(path, settings.TRAFFIC_CAPTURE_BACKUPS):
+        with open(capture, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    entries.sort(key=lambda entry: entry['ts'])
+    return entries
@@ -0,0 +1,11 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('metrics/', views.prometheus_metrics, name='metrics'),
+    path('batch/', views.batch_operations, name='batch-operations'),
+    path('admin/slow-queries/', views.slow_queries, name='slow-queries'),
+    path('admin/profiles/', views.list_profiles, name='list-profiles'),
+    path('admin/profiles/<str:profile_id>/', views.profile_detail, name='profile-detail'),
+    path('admin/profiles/<str:profile_id>/<str:artifact>/', views.profile_artifact, name='profile-artifact'),
+]
@@ -0,0 +1,148 @@
+import os
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.utils.module_loading import import_string
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from app.users.permissions import IsAdmin
+from . import batch, metrics, profiling, querylog
+
+
+def prometheus_metrics(request):
+    """Métriques par route au format texte Prometheus (tous workers confondus)"""
+    if settings.METRICS_TOKEN:
+        expected = f'Bearer {settings.METRICS_TOKEN}'
+        if not constant_time_compare(request.headers.get('Authorization', ''), expected):
+            return HttpResponse('Non autorisé\n', status=401, content_type='text/plain; charset=utf-8')
+
+    return HttpResponse(
+        metrics.render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def batch_operations(request):
+    """
+    Exécuter plusieurs appels d'API en une requête (synchronisation des terminaux hors ligne)
+    Data: {
+        "atomic": false,
+        "operations": [
+            {"id": "a1", "method": "POST", "path": "/api/orders/create/", "body": {...}},
+            {"id": "a2", "method": "POST", "path": "/api/notifications/12/read/"}
+        ]
+    }
+    Routes autorisées : /api/orders/, /api/products/, /api/notifications/
+    atomic: true -> tout ou rien, arrêt à la première opération en erreur (400)
+    """
+    atomic = request.data.get('atomic', False) if isinstance(request.data, dict) else False
+    if not isinstance(atomic, bool):
+        return Response({'error': 'atomic doit être un booléen'}, status=status.HTTP_400_BAD_REQUEST)
+    operations = request.data.get('operations') if isinstance(request.data, dict) else None
+    try:
+        results, committed = batch.run(request, operations, atomic=atomic)
+    except batch.BatchError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    data = {'atomic': atomic, 'committed': committed, 'results': results}
+    if not committed:
+        data['error'] = f'Opération {len(results) - 1} en erreur : lot annulé'
+        return Response(data, status=status.HTTP_400_BAD_REQUEST)
+    return Response(data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdmin])
+def slow_queries(request):
+    """
+    ADMIN: Requêtes SQL les plus coûteuses du journal (toutes rotations confondues)
+    Query params:
+        kind: slow | n_plus_one (défaut: les deux)
+        sort: total | max | count (défaut: total)
+        limit: nombre de lignes (défaut: 20, max: 200)
+    """
+    kind = request.query_params.get('kind') or None
+    if kind not in (None, 'slow', 'n_plus_one'):
+        return Response({'error': 'kind doit valoir slow ou n_plus_one'}, status=status.HTTP_400_BAD_REQUEST)
+
+    sort = request.query_params.get('sort', 'total')
+    if sort not in ('total', 'max', 'count'):
+        return Response({'error': 'sort doit valoir total, max ou count'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 200)
+    except ValueError:
+        return Response({'error': 'limit doit être un entier'}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'threshold_ms': settings.SLOW_QUERY_THRESHOLD_MS,
+        'n_plus_one_threshold': settings.SLOW_QUERY_N_PLUS_ONE,
+        'offenders': querylog.top_offenders(kind=kind, sort=sort, limit=limit),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdmin])
+def list_profiles(request):
+    """ADMIN: Profils enregistrés (appels envoyés avec l'en-tête X-Profile: 1), du plus récent au plus ancien"""
+    return Response(profiling.list_profiles())
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdmin])
+def profile_detail(request, profile_id):
+    """
+    ADMIN: Résumé d'un profil (chronologie SQL, temps de sérialisation, fonctions les plus coûteuses)
+    Fichiers bruts : /api/admin/profiles/<id>/prof/ (cProfile) et /api/admin/profiles/<id>/collapsed/ (flame graph)
+    """
+    summary = profiling.load_summary(profile_id)
+    if summary is None:
+        return Response({'error': 'Profil non trouvé'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(summary)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdmin])
+def profile_artifact(request, profile_id, artifact):
+    """ADMIN: Télécharger le fichier cProfile (prof) ou les piles échantillonnées (collapsed)"""
+    if artifact not in profiling.ARTIFACTS or not profiling.is_valid_id(profile_id):
+        return Response({'error': 'Profil non trouvé'}, status=status.HTTP_404_NOT_FOUND)
+
+    filename, content_type = profiling.ARTIFACTS[artifact]
+    path = profiling.profile_path(profile_id, filename)
+    if not os.path.exists(path):
+        return Response({'error': 'Profil non trouvé'}, status=status.HTTP_404_NOT_FOUND)
+    return FileResponse(
+        open(path, 'rb'), as_attachment=True,
+        filename=f'{profile_id}-{filename}', content_type=content_type
+    )
+
+
+def lazy_view(path, **initkwargs):
+    """
+    Vue basée sur une classe importée au premier appel :
+    path('api/docs/', lazy_view('drf_spectacular.views.SpectacularSwaggerView', url_name='schema'))
+    Pour les vues rarement appelées dont le module est lourd à charger ;
+    dispatch.load() force le chargement (maître gunicorn préchargé).
+    """
+    view = None
+
+    def load():
+        nonlocal view
+        if view is None:
+            view = import_string(path).as_view(**initkwargs)
+        return view
+
+    @csrf_exempt
+    def dispatch(request, *args, **kwargs):
+        return (view or load())(request, *args, **kwargs)
+
+    dispatch.load = load
+    return dispatch
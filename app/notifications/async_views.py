@@ -0,0 +1,14 @@
+"""
+Version asynchrone de la liste des notifications, utilisée quand
+ASYNC_API est actif (voir app.core.async_api).
+"""
+from app.core.async_api import async_api_view
+from .models import Notification
+from .serializers import NotificationFastSerializer
+
+
+@async_api_view(['GET'])
+async def my_notifications(request):
+    """Notifications de l'utilisateur connecté"""
+    notifications = Notification.objects.filter(user_id=request.user.id)
+    return await NotificationFastSerializer(notifications, many=True, context={'request': request}).adata()
@@ -1,7 +1,9 @@
 from rest_framework import serializers
 from .models import Notification
+from app.core.fast_serializers import FastSerializer
+from app.core.fieldsets import SparseFieldsMixin
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     notification_type_display = serializers.CharField(source='get_notification_type_display', read_only=True)
     order_number = serializers.CharField(source='order.order_number', read_only=True)
 
@@ -11,4 +13,11 @@ class NotificationSerializer(serializers.ModelSerializer):
             'id', 'notification_type', 'notification_type_display',
             'title', 'message', 'order', 'order_number',
             'is_read', 'created_at'
-        ]
\ No newline at end of file
+        ]
+        compact_exclude = ['notification_type_display']
+
+
+class NotificationFastSerializer(FastSerializer):
+    """NotificationSerializer sur des lignes .values()"""
+    serializer_class = NotificationSerializer
+
@@ -1,8 +1,12 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Sous ASGI, liste des notifications en vue async native
+reads = async_views if settings.ASYNC_API else views
 
 urlpatterns = [
-    path('', views.my_notifications, name='my-notifications'),
+    path('', reads.my_notifications, name='my-notifications'),
     path('<int:pk>/read/', views.mark_as_read, name='mark-as-read'),
     path('read-all/', views.mark_all_as_read, name='mark-all-as-read'),
     path('<int:pk>/delete/', views.delete_notification, name='delete-notification'),
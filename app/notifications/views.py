@@ -4,14 +4,14 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from .models import Notification
-from .serializers import NotificationSerializer
+from .serializers import NotificationFastSerializer
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def my_notifications(request):
     """Notifications de l'utilisateur connecté"""
-    notifications = Notification.objects.filter(user=request.user)
-    serializer = NotificationSerializer(notifications, many=True)
+    notifications = Notification.objects.filter(user_id=request.user.id)
+    serializer = NotificationFastSerializer(notifications, many=True, context={'request': request})
     return Response(serializer.data)
 
 @api_view(['POST'])
@@ -19,7 +19,7 @@ def my_notifications(request):
 def mark_as_read(request, pk):
     """Marquer une notification comme lue"""
     try:
-        notification = Notification.objects.get(pk=pk, user=request.user)
+        notification = Notification.objects.get(pk=pk, user_id=request.user.id)
         notification.is_read = True
         notification.save()
         return Response({'message': 'Notification marquée comme lue'})
@@ -30,7 +30,7 @@ def mark_as_read(request, pk):
 @permission_classes([IsAuthenticated])
 def mark_all_as_read(request):
     """Marquer toutes les notifications comme lues"""
-    Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+    Notification.objects.filter(user_id=request.user.id, is_read=False).update(is_read=True)
     return Response({'message': 'Toutes les notifications marquées comme lues'})
 
 @api_view(['DELETE'])
@@ -38,7 +38,7 @@ def mark_all_as_read(request):
 def delete_notification(request, pk):
     """Supprimer une notification"""
     try:
-        notification = Notification.objects.get(pk=pk, user=request.user)
+        notification = Notification.objects.get(pk=pk, user_id=request.user.id)
         notification.delete()
         return Response({'message': 'Notification supprimée'})
     except Notification.DoesNotExist:
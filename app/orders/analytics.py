@@ -0,0 +1,117 @@
+"""
+Analytique du circuit de traitement des commandes.
+
+Les timestamps sont extraits en colonnes avec values_list() puis traités
+en bloc par pandas/NumPy : aucun objet Order n'est instancié. Les deux
+sont importés au premier calcul, pas au chargement des vues.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from app.users.models import User
+from .models import Order
+
+# (nom de l'étape, timestamp de début, timestamp de fin)
+STAGES = (
+    ('confirm_to_prepare', 'confirmed_at', 'prepared_at'),
+    ('prepare_to_ready', 'prepared_at', 'ready_at'),
+    ('ready_to_delivered', 'ready_at', 'delivered_at'),
+)
+
+PERCENTILES = (50, 90, 99)
+
+COLUMNS = (
+    'magasinier_id', 'deliverer_id',
+    'confirmed_at', 'prepared_at', 'ready_at', 'delivered_at',
+)
+
+
+def _summary(durations):
+    """count + p50/p90/p99 (en secondes) d'un tableau de durées"""
+    import numpy as np
+
+    summary = {'count': int(len(durations))}
+    if len(durations):
+        values = np.percentile(durations, PERCENTILES)
+    else:
+        values = [None] * len(PERCENTILES)
+    for q, value in zip(PERCENTILES, values):
+        summary[f'p{q}'] = round(float(value), 1) if value is not None else None
+    return summary
+
+
+def _breakdown(frame, key, label, names=None):
+    """Percentiles par groupe (magasinier, livreur ou heure)"""
+    frame = frame.dropna(subset=[key])
+    if frame.empty:
+        return []
+
+    grouped = frame.groupby(frame[key].astype('int64'))['duration']
+    stats = grouped.quantile([q / 100 for q in PERCENTILES]).unstack()
+    counts = grouped.size()
+
+    rows = []
+    for group, quantiles in stats.iterrows():
+        row = {label: int(group)}
+        if names is not None:
+            row['username'] = names.get(int(group))
+        row['count'] = int(counts[group])
+        for q, value in zip(PERCENTILES, quantiles.to_numpy()):
+            row[f'p{q}'] = round(float(value), 1)
+        rows.append(row)
+    return rows
+
+
+def compute_stage_latencies(start, end):
+    """
+    Durées p50/p90/p99 de chaque étape pour les commandes créées
+    dans [start, end[, globales et par magasinier, livreur et heure
+    """
+    rows = Order.objects.filter(
+        created_at__gte=start,
+        created_at__lt=end,
+        confirmed_at__isnull=False,
+    ).order_by().values_list(*COLUMNS)
+
+    import pandas as pd
+
+    df = pd.DataFrame.from_records(list(rows), columns=COLUMNS)
+    for column in COLUMNS[2:]:
+        df[column] = pd.to_datetime(df[column], utc=True)
+
+    user_ids = pd.concat([df['magasinier_id'], df['deliverer_id']]).dropna().unique()
+    names = dict(
+        User.objects.filter(id__in=[int(i) for i in user_ids]).values_list('id', 'username')
+    )
+
+    stages = {}
+    for name, start_col, end_col in STAGES:
+        frame = pd.DataFrame({
+            'magasinier_id': df['magasinier_id'],
+            'deliverer_id': df['deliverer_id'],
+            'duration': (df[end_col] - df[start_col]).dt.total_seconds(),
+            'hour': df[start_col].dt.tz_convert(settings.TIME_ZONE).dt.hour,
+        }).dropna(subset=['duration'])
+
+        stages[name] = {
+            **_summary(frame['duration'].to_numpy()),
+            'by_magasinier': _breakdown(frame, 'magasinier_id', 'magasinier_id', names),
+            'by_livreur': _breakdown(frame, 'deliverer_id', 'deliverer_id', names),
+            'by_hour': _breakdown(frame, 'hour', 'hour'),
+        }
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'orders': int(len(df)),
+        'stages': stages,
+    }
+
+
+def stage_latencies(start, end):
+    """compute_stage_latencies() mis en cache par fenêtre de temps"""
+    key = f'orders:latency:{int(start.timestamp())}:{int(end.timestamp())}'
+    data = cache.get(key)
+    if data is None:
+        data = compute_stage_latencies(start, end)
+        cache.set(key, data, settings.ORDER_ANALYTICS_CACHE_SECONDS)
+    return data
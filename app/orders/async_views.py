@@ -0,0 +1,153 @@
+"""
+Versions asynchrones (ORM async) des endpoints de lecture et de suivi des
+commandes, utilisées quand ASYNC_API est actif (voir app.core.async_api).
+Réponses identiques à celles de app.orders.views.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+
+from app.core.async_api import async_api_view
+from app.core.db_router import use_primary
+from .confirmation import confirm_overdue
+from .models import Order
+from .serializers import OrderDetailFastSerializer, STATUS_FIELDS, order_status
+
+
+async def _orders(request, queryset, now=None):
+    context = {'request': request, 'now': now} if now else {'request': request}
+    return await OrderDetailFastSerializer(queryset, many=True, context=context).adata()
+
+
+# ========== VENDEUR ==========
+
+@async_api_view(['GET'], roles=('vendeur',))
+async def vendeur_history(request):
+    """Historique des commandes du vendeur (?status= : statuts effectifs)"""
+    now = timezone.now()
+    orders = Order.objects.filter(seller_id=request.user.id).with_effective_status(now).order_by('-created_at')
+    statuses = request.GET.get('status')
+    if statuses:
+        orders = orders.filter(effective_status__in=statuses.split(','))
+    return await _orders(request, orders, now)
+
+
+# ========== MAGASINIER ==========
+
+@async_api_view(['GET'], roles=('magasinier',))
+async def magasinier_orders(request):
+    """Liste des commandes confirmées pour le magasinier"""
+    now = timezone.now()
+    return await _orders(request, Order.objects.with_effective_status(now).filter(
+        effective_status__in=['confirmed', 'preparing', 'ready']
+    ).order_by('-created_at'), now)
+
+
+@async_api_view(['GET'], roles=('magasinier',))
+async def magasinier_history(request):
+    """Historique des commandes préparées par le magasinier"""
+    now = timezone.now()
+    return await _orders(request, Order.objects.with_effective_status(now).filter(
+        Q(magasinier_id=request.user.id) | Q(effective_status__in=['confirmed', 'preparing', 'ready'])
+    ).order_by('-created_at'), now)
+
+
+# ========== LIVREUR ==========
+
+@async_api_view(['GET'], roles=('livreur',))
+async def livreur_deliveries(request):
+    """Liste des livraisons du livreur"""
+    return await _orders(request, Order.objects.filter(
+        deliverer_id=request.user.id,
+        status='in_delivery'
+    ).order_by('-created_at'))
+
+
+@async_api_view(['GET'], roles=('livreur',))
+async def livreur_history(request):
+    """Historique de toutes les livraisons du livreur"""
+    return await _orders(request, Order.objects.filter(deliverer_id=request.user.id).order_by('-created_at'))
+
+
+# ========== COMMUN ==========
+
+@async_api_view(['GET'])
+async def order_detail(request, pk):
+    """Détails complets d'une commande"""
+    data = await OrderDetailFastSerializer(Order.objects.filter(pk=pk), context={'request': request}).adata()
+    if data is None:
+        return {'error': 'Commande introuvable'}, status.HTTP_404_NOT_FOUND
+    return data
+
+
+@async_api_view(['GET'])
+@use_primary
+async def check_order_status(request, pk):
+    """
+    Vérifier le statut d'une commande et la confirmer si les 3 minutes sont écoulées.
+    Les clients interrogent cette route en boucle : la confirmation (confirm_overdue)
+    verrouille la ligne et ne porte que sur une commande encore 'pending', une seule
+    requête concurrente la fait aboutir.
+    """
+    try:
+        order = await Order.objects.aget(pk=pk)
+    except Order.DoesNotExist:
+        return {'error': 'Commande introuvable'}, status.HTTP_404_NOT_FOUND
+
+    elapsed = order.get_elapsed_time()
+    remaining = order.get_remaining_time()
+    if order.should_be_confirmed():
+        # Même écriture que les autres chemins (app.orders.confirmation) ; une commande
+        # déjà confirmée (ou annulée) entre-temps par une autre requête est ignorée
+        await sync_to_async(confirm_overdue)([order.pk])
+        await order.arefresh_from_db(fields=['status', 'confirmed_at'])
+
+    return {
+        'order_id': order.id,
+        'order_number': order.order_number,
+        'status': order.status,
+        'elapsed_seconds': elapsed,
+        'remaining_seconds': remaining,
+        'can_modify': order.can_modify(),
+        'can_cancel': order.can_cancel(),
+        'confirmed': order.status == 'confirmed'
+    }
+
+
+@async_api_view(['GET'], roles=('vendeur',))
+async def order_statuses(request):
+    """
+    VENDEUR: Statut et décompte de plusieurs de ses commandes en une requête
+    Query params:
+        ids: identifiants séparés par des virgules (au plus ORDER_STATUS_MAX_IDS)
+        pending: 1 pour toutes ses commandes encore modifiables (sans ids)
+    confirm_deadline permet au client de faire le décompte localement ;
+    next_deadline est la prochaine échéance (moment utile pour réinterroger).
+    """
+    now = timezone.now()
+    orders = Order.objects.filter(seller_id=request.user.id).order_by('created_at')
+    ids = request.GET.get('ids')
+    if ids:
+        try:
+            ids = list(dict.fromkeys(int(order_id) for order_id in ids.split(',')))
+        except ValueError:
+            return {'error': 'ids doit être une liste d\'identifiants séparés par des virgules'}, status.HTTP_400_BAD_REQUEST
+        if len(ids) > settings.ORDER_STATUS_MAX_IDS:
+            return {'error': f'Au plus {settings.ORDER_STATUS_MAX_IDS} commandes par appel'}, status.HTTP_400_BAD_REQUEST
+        orders = orders.filter(pk__in=ids)
+    elif request.GET.get('pending') in ('1', 'true'):
+        orders = orders.with_effective_status(now).filter(effective_status='pending')[:settings.ORDER_STATUS_MAX_IDS]
+    else:
+        return {'error': 'ids ou pending=1 requis'}, status.HTTP_400_BAD_REQUEST
+
+    statuses = [order_status(row, now) async for row in orders.values(*STATUS_FIELDS)]
+    deadlines = [entry['confirm_deadline'] for entry in statuses if entry['remaining_seconds']]
+    found = {entry['order_id'] for entry in statuses}
+    return {
+        'server_time': now,
+        'next_deadline': min(deadlines) if deadlines else None,
+        'orders': statuses,
+        'missing': [order_id for order_id in ids if order_id not in found] if ids else [],
+    }
@@ -0,0 +1,71 @@
+"""
+Écriture différée des confirmations automatiques (3 minutes écoulées).
+
+Les listes n'écrivent rien : elles calculent le statut effectif en SQL
+(Order.objects.with_effective_status). La confirmation est écrite plus
+tard, en bloc, par confirm_overdue() :
+  - pour une commande, dès qu'une action en dépend (préparation, vague) ;
+  - pour toutes, par manage.py confirm_orders (tâche planifiée).
+
+confirmed_at vaut created_at + CONFIRMATION_DELAY, l'instant où la
+commande est effectivement devenue confirmée, quel que soit le moment de
+l'écriture.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from app.notifications.models import Notification
+from app.users.models import User
+from .models import CONFIRMATION_DELAY, Order, OrderHistory
+
+
+def confirm_overdue(order_ids=None, now=None):
+    """
+    Confirme les commandes 'pending' dont le délai est écoulé (toutes, ou parmi order_ids),
+    au plus ORDER_CONFIRM_BATCH par appel : un UPDATE, historique et notifications
+    des magasiniers insérés en bloc. Retourne les identifiants confirmés.
+    """
+    with transaction.atomic():
+        overdue = Order.objects.overdue(now)
+        if order_ids is not None:
+            overdue = overdue.filter(pk__in=order_ids)
+        orders = list(
+            overdue.select_for_update().order_by('pk')
+            .values_list('id', 'seller_id', 'order_number', 'customer_name')[:settings.ORDER_CONFIRM_BATCH]
+        )
+        if not orders:
+            return []
+        confirmed = [order_id for order_id, _, _, _ in orders]
+        Order.objects.filter(pk__in=confirmed).update(
+            status='confirmed',
+            confirmed_at=F('created_at') + timedelta(seconds=CONFIRMATION_DELAY),
+        )
+
+        OrderHistory.objects.bulk_create([
+            OrderHistory(
+                order_id=order_id,
+                action='confirmed',
+                user_id=seller_id,
+                user_role='vendeur',
+                description="Commande automatiquement confirmée après 3 minutes"
+            )
+            for order_id, seller_id, _, _ in orders
+        ])
+        magasiniers = list(User.objects.filter(
+            role='magasinier', is_active_account=True
+        ).values_list('pk', flat=True))
+        Notification.objects.bulk_create([
+            Notification(
+                user_id=magasinier_id,
+                notification_type='order_confirmed',
+                title='Nouvelle commande confirmée',
+                message=f'Commande {order_number} de {customer_name} reçue',
+                order_id=order_id
+            )
+            for order_id, _, order_number, customer_name in orders
+            for magasinier_id in magasiniers
+        ], batch_size=1000)
+    return confirmed
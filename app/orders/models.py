@@ -1,8 +1,34 @@
+from datetime import timedelta
+
 from django.db import models
+from django.db.models import Case, F, Value, When
 from django.utils import timezone
 from app.users.models import User
 from app.products.models import Product
 
+# Délai (secondes) pendant lequel le vendeur peut modifier/annuler une commande
+CONFIRMATION_DELAY = 180
+
+
+class OrderQuerySet(models.QuerySet):
+    def with_effective_status(self, now=None):
+        """
+        Annote effective_status : 'confirmed' pour une commande encore 'pending' dont
+        les 3 minutes sont écoulées (confirmation pas encore écrite), sinon status.
+        Filtrer et trier sur effective_status ; passer le même now au sérialiseur.
+        """
+        deadline = (now or timezone.now()) - timedelta(seconds=CONFIRMATION_DELAY)
+        return self.annotate(effective_status=Case(
+            When(status='pending', created_at__lte=deadline, then=Value('confirmed')),
+            default=F('status'),
+            output_field=models.CharField(max_length=20),
+        ))
+
+    def overdue(self, now=None):
+        """Commandes 'pending' dont les 3 minutes sont écoulées"""
+        deadline = (now or timezone.now()) - timedelta(seconds=CONFIRMATION_DELAY)
+        return self.filter(status='pending', created_at__lte=deadline)
+
 
 # Create your models here.
 class Order(models.Model):
@@ -26,6 +52,11 @@ class Order(models.Model):
 # Client
     customer_name = models.CharField(max_length=255)
 
+# Livraison (position utilisée pour l'ordre de la tournée du livreur)
+    delivery_address = models.CharField(max_length=255, blank=True, null=True)
+    delivery_latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    delivery_longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+
 # Statut
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
 
@@ -77,6 +108,8 @@ class Order(models.Model):
     )
 
 
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         db_table = 'orders'
         ordering = ['-created_at']
@@ -104,7 +137,7 @@ class Order(models.Model):
     def get_elapsed_time(self):
         """Temps écoulé depuis la création (en secondes)"""
         if self.status != 'pending':
-            return 180  # Plus de 3 minutes
+            return CONFIRMATION_DELAY  # Plus de 3 minutes
         elapsed = (timezone.now() - self.created_at).total_seconds()
         return int(elapsed)
 
@@ -112,7 +145,7 @@ class Order(models.Model):
         """Temps restant avant envoi automatique (en secondes)"""
         if self.status != 'pending':
             return 0
-        remaining = 180 - self.get_elapsed_time()
+        remaining = CONFIRMATION_DELAY - self.get_elapsed_time()
         return max(0, remaining)
 
     def can_modify(self):
@@ -125,7 +158,7 @@ class Order(models.Model):
 
     def should_be_confirmed(self):
         """Est-ce que les 3 minutes sont écoulées ?"""
-        return self.status == 'pending' and self.get_elapsed_time() >= 180
+        return self.status == 'pending' and self.get_elapsed_time() >= CONFIRMATION_DELAY
 
     def __str__(self):
         return f"{self.order_number} - {self.customer_name}"
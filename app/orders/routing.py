@@ -0,0 +1,122 @@
+"""
+Ordre de passage d'une tournée de livraison à plusieurs arrêts.
+
+Heuristique du voyageur de commerce sur une matrice de distances
+haversine calculée d'un bloc (NumPy) :
+  1. plus proche voisin depuis la position du livreur ;
+  2. 2-opt : pour chaque arrêt, les gains de toutes les inversions de
+     segment qui commencent à cet arrêt sont évalués ensemble et la
+     meilleure est appliquée, jusqu'à ce qu'aucune ne raccourcisse la
+     tournée (au plus ROUTE_MAX_PASSES passes).
+
+La tournée est ouverte : elle part du livreur et se termine au dernier
+arrêt (un nœud de fin à distance nulle de tous les arrêts). Sans
+position connue du livreur, le nœud de départ est lui aussi à distance
+nulle : le premier arrêt est libre.
+
+L'ordre calculé est gardé dans le cache Django par livreur tant que
+l'ensemble des arrêts (commandes et positions) ne change pas. NumPy est
+importé au premier calcul, pas au chargement des vues.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from app.users.spatial import EARTH_RADIUS_M
+
+
+def distance_matrix(latitudes, longitudes):
+    """Matrice (n, n) des distances haversine en mètres"""
+    import numpy as np
+
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lon = np.radians(np.asarray(longitudes, dtype=float))
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.outer(np.cos(lat), np.cos(lat)) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _nearest_neighbour(matrix):
+    """Chemin du nœud 0 au dernier nœud, en allant chaque fois à l'arrêt le plus proche"""
+    import numpy as np
+
+    size = len(matrix)
+    visited = np.zeros(size, dtype=bool)
+    visited[0] = visited[-1] = True
+    route = [0]
+    for _ in range(size - 2):
+        following = int(np.where(visited, np.inf, matrix[route[-1]]).argmin())
+        visited[following] = True
+        route.append(following)
+    route.append(size - 1)
+    return route
+
+
+def _two_opt(route, matrix, max_passes):
+    """Améliore le chemin en inversant des segments ; les deux extrémités restent en place"""
+    import numpy as np
+
+    route = np.asarray(route)
+    size = len(route)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, size - 2):
+            # Inversion de route[i..k] pour k = i+1 .. size-2 : a-b ... c-d devient a-c ... b-d
+            a, b = route[i - 1], route[i]
+            c, d = route[i + 1:size - 1], route[i + 2:size]
+            gains = matrix[a, c] + matrix[b, d] - matrix[a, b] - matrix[c, d]
+            best = int(gains.argmin())
+            if gains[best] < -1e-6:
+                route[i:i + best + 2] = route[i:i + best + 2][::-1].copy()
+                improved = True
+        if not improved:
+            break
+    return route.tolist()
+
+
+def plan_route(stops, origin=None):
+    """
+    Ordre de passage des arrêts
+    stops: [(clé, latitude, longitude)] ; origin: (latitude, longitude) du livreur ou None
+    Retourne ([(clé, distance depuis l'arrêt précédent en m)], distance totale en m)
+    """
+    if not stops:
+        return [], 0.0
+    start = origin or (0.0, 0.0)
+    matrix = distance_matrix(
+        [start[0]] + [stop[1] for stop in stops] + [0.0],
+        [start[1]] + [stop[2] for stop in stops] + [0.0],
+    )
+    if origin is None:
+        matrix[0, :] = matrix[:, 0] = 0.0
+    matrix[-1, :] = matrix[:, -1] = 0.0
+
+    route = _two_opt(_nearest_neighbour(matrix), matrix, settings.ROUTE_MAX_PASSES)
+    legs = [
+        (stops[node - 1][0], round(float(matrix[previous, node]), 1))
+        for previous, node in zip(route, route[1:-1])
+    ]
+    return legs, round(sum(distance for _, distance in legs), 1)
+
+
+def _signature(stops):
+    raw = ';'.join(f'{key}:{latitude:.6f}:{longitude:.6f}' for key, latitude, longitude in sorted(stops))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def livreur_route(livreur_id, stops, origin=None, refresh=False):
+    """
+    plan_route() mis en cache par livreur tant que les arrêts ne changent pas
+    Retourne (legs, distance totale, depuis le cache ?)
+    """
+    key = f'orders:route:{livreur_id}'
+    signature = _signature(stops)
+    if not refresh:
+        cached = cache.get(key)
+        if cached is not None and cached['signature'] == signature:
+            return cached['legs'], cached['distance'], True
+    legs, distance = plan_route(stops, origin)
+    cache.set(key, {'signature': signature, 'legs': legs, 'distance': distance}, settings.ROUTE_CACHE_SECONDS)
+    return legs, distance, False
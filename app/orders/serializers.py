@@ -1,22 +1,28 @@
+import copy
+from datetime import timedelta
+
 from rest_framework import serializers
-from .models import Order, OrderItem, OrderHistory
+from .models import Order, OrderItem, OrderHistory, CONFIRMATION_DELAY
 from app.products.models import Product
+from app.core.fast_serializers import FastSerializer
+from app.core.fieldsets import SparseFieldsMixin
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = OrderItem
         fields = ['id', 'product', 'product_name', 'quantity', 'unit',
                 'unit_price', 'total_price']
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     status_display = serializers.CharField(source='get_status_display', read_only=True)
 
     class Meta:
         model = Order
         fields = ['id', 'order_number', 'customer_name', 'status',
                 'status_display', 'total_amount', 'created_at']
+        compact_exclude = ['status_display']
 
-class OrderDetailSerializer(serializers.ModelSerializer):
+class OrderDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     elapsed_time = serializers.SerializerMethodField()
@@ -29,12 +35,24 @@ class OrderDetailSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'order_number', 'seller', 'seller_name',
             'customer_name',
+            'delivery_address', 'delivery_latitude', 'delivery_longitude',
             'status', 'status_display', 'items', 'total_amount',
             'deliverer', 'deliverer_name', 'cancellation_reason',
             'created_at', 'confirmed_at', 'prepared_at',
             'delivered_at', 'cancelled_at',
             'elapsed_time', 'remaining_time', 'can_modify', 'can_cancel'
         ]
+        compact_exclude = ['status_display', 'items']
+
+    def to_representation(self, instance):
+        if isinstance(instance, Order) and instance.should_be_confirmed():
+            # Statut effectif (comme OrderDetailFastSerializer) : confirmée, pas encore
+            # écrite ; copie pour ne pas modifier l'instance que la vue peut enregistrer
+            instance = copy.copy(instance)
+            instance.status = 'confirmed'
+            instance.confirmed_at = instance.created_at + timedelta(seconds=CONFIRMATION_DELAY)
+        return super().to_representation(instance)
+
     def get_elapsed_time(self, obj):
         return obj.get_elapsed_time()
 
@@ -47,7 +65,7 @@ class OrderDetailSerializer(serializers.ModelSerializer):
     def get_can_cancel(self, obj):
         return obj.can_cancel()
 
-class OrderHistorySerializer(serializers.ModelSerializer):
+class OrderHistorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     action_display = serializers.CharField(source='get_action_display', read_only=True)
     user_name = serializers.CharField(source='user.username', read_only=True)
 
@@ -55,6 +73,7 @@ class OrderHistorySerializer(serializers.ModelSerializer):
         model = OrderHistory
         fields = ['id', 'action', 'action_display', 'user', 'user_name', 
                 'user_role', 'description', 'created_at']
+        compact_exclude = ['action_display']
 
 
 class OrderCreateSerializer(serializers.Serializer):
@@ -64,4 +83,61 @@ class OrderCreateSerializer(serializers.Serializer):
     )
 
 
+# ========== SÉRIALISEURS RAPIDES (lecture) ==========
+
+class OrderItemFastSerializer(FastSerializer):
+    serializer_class = OrderItemSerializer
+
+
+class OrderDetailFastSerializer(FastSerializer):
+    """OrderDetailSerializer sur des lignes .values(), temps calculés une seule fois"""
+    serializer_class = OrderDetailSerializer
+    nested = {'items': (OrderItemFastSerializer, 'order')}
+    requires = ('status', 'created_at')
+
+    def compute(self, row, now):
+        if row['status'] != 'pending':
+            return {'elapsed_time': CONFIRMATION_DELAY, 'remaining_time': 0,
+                    'can_modify': False, 'can_cancel': False}
+        elapsed = int((now - row['created_at']).total_seconds())
+        if elapsed >= CONFIRMATION_DELAY:
+            # Statut effectif (Order.objects.with_effective_status) : confirmée, pas encore écrite
+            return {'status': 'confirmed',
+                    'confirmed_at': row['created_at'] + timedelta(seconds=CONFIRMATION_DELAY),
+                    'elapsed_time': CONFIRMATION_DELAY, 'remaining_time': 0,
+                    'can_modify': False, 'can_cancel': False}
+        remaining = CONFIRMATION_DELAY - elapsed
+        return {'elapsed_time': elapsed, 'remaining_time': remaining,
+                'can_modify': True, 'can_cancel': True}
+
+
+# Colonnes lues par order_status()
+STATUS_FIELDS = ('id', 'order_number', 'status', 'created_at')
+
 
+def order_status(row, now):
+    """
+    Statut effectif et décompte d'une commande (mêmes valeurs que check_order_status),
+    depuis une ligne .values(*STATUS_FIELDS) ; confirm_deadline : fin du délai de 3 minutes
+    """
+    deadline = row['created_at'] + timedelta(seconds=CONFIRMATION_DELAY)
+    effective = row['status']
+    elapsed, remaining = CONFIRMATION_DELAY, 0
+    if effective == 'pending':
+        elapsed = int((now - row['created_at']).total_seconds())
+        if elapsed >= CONFIRMATION_DELAY:
+            # Confirmée, pas encore écrite (Order.objects.with_effective_status)
+            effective, elapsed = 'confirmed', CONFIRMATION_DELAY
+        else:
+            remaining = CONFIRMATION_DELAY - elapsed
+    return {
+        'order_id': row['id'],
+        'order_number': row['order_number'],
+        'status': effective,
+        'elapsed_seconds': elapsed,
+        'remaining_seconds': remaining,
+        'confirm_deadline': deadline,
+        'can_modify': remaining > 0,
+        'can_cancel': remaining > 0,
+        'confirmed': effective == 'confirmed',
+    }
@@ -1,30 +1,43 @@
+from django.conf import settings
 from django.urls import path
-from app.orders import views
+from app.orders import async_views, views
+
+# Sous ASGI, lectures et suivi en vues async natives
+reads = async_views if settings.ASYNC_API else views
 
 
 urlpatterns = [
     # Commun
-    path('<int:pk>/', views.order_detail, name='order-detail'),
+    path('<int:pk>/', reads.order_detail, name='order-detail'),
     path('<int:pk>/history/', views.order_history_view, name='order-history'),
-    path('<int:pk>/status/', views.check_order_status, name='check-order-status'),
+    path('<int:pk>/status/', reads.check_order_status, name='check-order-status'),
+    path('status/', reads.order_statuses, name='order-statuses'),
 
     # Vendeur
     path('create/', views.create_order, name='create-order'),
     path('<int:pk>/modify/', views.modify_order, name='modify-order'),
     path('<int:pk>/cancel/', views.cancel_order, name='cancel-order'),
-    path('vendeur/history/', views.vendeur_history, name='vendeur-history'),
+    path('vendeur/history/', reads.vendeur_history, name='vendeur-history'),
 
     # Magasinier
-    path('magasinier/list/', views.magasinier_orders, name='magasinier-orders'),
+    path('magasinier/list/', reads.magasinier_orders, name='magasinier-orders'),
     path('<int:pk>/prepare/', views.start_preparing, name='start-preparing'),
     path('<int:pk>/ready/', views.mark_ready, name='mark-ready'),
+    path('waves/pick-list/', views.wave_pick_list, name='wave-pick-list'),
+    path('waves/prepare/', views.wave_start_preparing, name='wave-start-preparing'),
+    path('waves/ready/', views.wave_mark_ready, name='wave-mark-ready'),
     path('deliverers/', views.available_deliverers, name='available-deliverers'),
+    path('deliverers/nearest/', views.nearest_deliverers, name='nearest-deliverers'),
     path('<int:pk>/assign/', views.assign_deliverer, name='assign-deliverer'),
-    path('magasinier/history/', views.magasinier_history, name='magasinier-history'),
+    path('magasinier/history/', reads.magasinier_history, name='magasinier-history'),
 
     # Livreur
-    path('livreur/deliveries/', views.livreur_deliveries, name='livreur-deliveries'),
+    path('livreur/deliveries/', reads.livreur_deliveries, name='livreur-deliveries'),
+    path('livreur/route/', views.livreur_route, name='livreur-route'),
     path('<int:pk>/deliver/', views.mark_delivered, name='mark-delivered'),
     path('<int:pk>/cancel-delivery/', views.cancel_delivery, name='cancel-delivery'),
-    path('livreur/history/', views.livreur_history, name='livreur-history'),
+    path('livreur/history/', reads.livreur_history, name='livreur-history'),
+
+    # Admin
+    path('analytics/latency/', views.order_latency_analytics, name='order-latency-analytics'),
 ]
\ No newline at end of file
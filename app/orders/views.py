@@ -4,17 +4,54 @@ from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
 from django.utils import timezone
-from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.db.models import Count, Q
+from datetime import datetime, timedelta
+from decimal import Decimal
+import math
 from .models import Order, OrderItem, OrderHistory
 from app.products.models import Product
 from app.users.models import User
 from app.notifications.models import Notification
 from .serializers import (
     OrderSerializer, OrderCreateSerializer, OrderItemSerializer,
-    OrderHistorySerializer, OrderDetailSerializer
+    OrderHistorySerializer, OrderDetailSerializer, OrderDetailFastSerializer,
+    STATUS_FIELDS, order_status
 )
-from app.users.permissions import IsVendeur, IsMagasinier, IsLivreur
+from app.users.permissions import IsAdmin, IsVendeur, IsMagasinier, IsLivreur
+from .analytics import stage_latencies
+from app.core.db_router import use_primary
+from app.users import locations
+from app.users.spatial import deliverers
+from .routing import livreur_route as plan_livreur_route
+from . import waves
+from .confirmation import confirm_overdue
+
+def _delivery_fields(data):
+    """
+    Champs de livraison présents dans la requête -> dict pour Order
+    ValueError (message affichable) si la position est invalide
+    """
+    fields = {}
+    if 'delivery_address' in data:
+        fields['delivery_address'] = data['delivery_address'] or None
+    if 'delivery_latitude' not in data and 'delivery_longitude' not in data:
+        return fields
+    latitude, longitude = data.get('delivery_latitude'), data.get('delivery_longitude')
+    if latitude is None and longitude is None:
+        fields['delivery_latitude'] = fields['delivery_longitude'] = None
+        return fields
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        raise ValueError('delivery_latitude et delivery_longitude doivent être des nombres')
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError('Position de livraison hors limites')
+    fields['delivery_latitude'] = Decimal(f'{latitude:.6f}')
+    fields['delivery_longitude'] = Decimal(f'{longitude:.6f}')
+    return fields
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsVendeur])
@@ -26,11 +63,19 @@ def create_order(request):
         "items": [
             {"product_id": 1, "quantity": 2},
             {"product_id": 3, "quantity": 5}
-        ]
+        ],
+        "delivery_address": "...", "delivery_latitude": 33.57, "delivery_longitude": -7.59  (optionnels)
     }
     """
     customer_name = request.data.get('customer_name')
     items = request.data.get('items', [])
+    try:
+        delivery = _delivery_fields(request.data)
+    except ValueError as exc:
+        return Response(
+            {'error': str(exc)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
     if not customer_name:
         return Response(
@@ -49,7 +94,8 @@ def create_order(request):
         seller_name=request.user.get_full_name() or request.user.username,
         customer_name=customer_name,
         status='pending',
-        total_amount=0
+        total_amount=0,
+        **delivery
     )
 
     # Ajouter les produits et vérifier/décrémenter le stock
@@ -57,7 +103,7 @@ def create_order(request):
     for item_data in items:
         try:
             product = Product.objects.get(id=item_data['product_id'], is_validated=True)
-            quantity = float(item_data['quantity'])
+            quantity = int(item_data['quantity'])
             
             # Vérifier si le stock est suffisant
             if product.stock is not None and product.stock < quantity:
@@ -109,6 +155,7 @@ def create_order(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@use_primary
 def check_order_status(request, pk):
     """
     API QUI CALCULE LES 3 MINUTES
@@ -121,39 +168,21 @@ def check_order_status(request, pk):
         elapsed = order.get_elapsed_time()
         remaining = order.get_remaining_time()
         # SI 3 MINUTES ÉCOULÉES ET STATUS = PENDING → CONFIRMER
+        # (écriture conditionnelle : une seule requête concurrente la fait aboutir)
         if order.should_be_confirmed():
-            order.status = 'confirmed'
-            order.confirmed_at = timezone.now()
-            order.save()
+            confirm_overdue([order.pk])
+            order.refresh_from_db(fields=['status', 'confirmed_at'])
 
-            # Historique
-            OrderHistory.objects.create(
-                order=order,
-                action='confirmed',
-                user=order.seller,
-                user_role='vendeur',
-                description=f"Commande automatiquement confirmée après 3 minutes"
-            )
-            # Notification magasinier
-            magasiniers = User.objects.filter(role='magasinier', is_active_account=True)
-            for mag in magasiniers:
-                Notification.objects.create(
-                    user=mag,
-                    notification_type='order_confirmed',
-                    title='Nouvelle commande confirmée',
-                    message=f'Commande {order.order_number} de {order.customer_name} reçue',
-                    order=order
-                )
-                return Response({
-                    'order_id': order.id,
-                    'order_number': order.order_number,
-                    'status': order.status,
-                    'elapsed_seconds': elapsed,
-                    'remaining_seconds': remaining,
-                    'can_modify': order.can_modify(),
-                    'can_cancel': order.can_cancel(),
-                    'confirmed': order.status == 'confirmed'
-                })
+        return Response({
+            'order_id': order.id,
+            'order_number': order.order_number,
+            'status': order.status,
+            'elapsed_seconds': elapsed,
+            'remaining_seconds': remaining,
+            'can_modify': order.can_modify(),
+            'can_cancel': order.can_cancel(),
+            'confirmed': order.status == 'confirmed'
+        })
 
     except Order.DoesNotExist:
         return Response(
@@ -161,6 +190,52 @@ def check_order_status(request, pk):
             status=status.HTTP_404_NOT_FOUND
         )
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsVendeur])
+def order_statuses(request):
+    """
+    VENDEUR: Statut et décompte de plusieurs de ses commandes en une requête
+    Query params:
+        ids: identifiants séparés par des virgules (au plus ORDER_STATUS_MAX_IDS)
+        pending: 1 pour toutes ses commandes encore modifiables (sans ids)
+    confirm_deadline permet au client de faire le décompte localement ;
+    next_deadline est la prochaine échéance (moment utile pour réinterroger).
+    """
+    now = timezone.now()
+    orders = Order.objects.filter(seller_id=request.user.id).order_by('created_at')
+    ids = request.query_params.get('ids')
+    if ids:
+        try:
+            ids = list(dict.fromkeys(int(order_id) for order_id in ids.split(',')))
+        except ValueError:
+            return Response(
+                {'error': 'ids doit être une liste d\'identifiants séparés par des virgules'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(ids) > settings.ORDER_STATUS_MAX_IDS:
+            return Response(
+                {'error': f'Au plus {settings.ORDER_STATUS_MAX_IDS} commandes par appel'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        orders = orders.filter(pk__in=ids)
+    elif request.query_params.get('pending') in ('1', 'true'):
+        orders = orders.with_effective_status(now).filter(effective_status='pending')[:settings.ORDER_STATUS_MAX_IDS]
+    else:
+        return Response(
+            {'error': 'ids ou pending=1 requis'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    statuses = [order_status(row, now) for row in orders.values(*STATUS_FIELDS)]
+    deadlines = [entry['confirm_deadline'] for entry in statuses if entry['remaining_seconds']]
+    found = {entry['order_id'] for entry in statuses}
+    return Response({
+        'server_time': now,
+        'next_deadline': min(deadlines) if deadlines else None,
+        'orders': statuses,
+        'missing': [order_id for order_id in ids if order_id not in found] if ids else [],
+    })
+
 @api_view(['PUT'])
 @permission_classes([IsAuthenticated, IsVendeur])
 def modify_order(request, pk):
@@ -176,8 +251,18 @@ def modify_order(request, pk):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        try:
+            delivery = _delivery_fields(request.data)
+        except ValueError as exc:
+            return Response(
+                {'error': str(exc)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         # Modifier les infos
         order.customer_name = request.data.get('customer_name', order.customer_name)
+        for field, value in delivery.items():
+            setattr(order, field, value)
 
         # Modifier les items si fournis
         items = request.data.get('items')
@@ -279,9 +364,17 @@ def cancel_order(request, pk):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsVendeur])
 def vendeur_history(request):
-    """Historique des commandes du vendeur"""
-    orders = Order.objects.filter(seller=request.user).order_by('-created_at')
-    serializer = OrderDetailSerializer(orders, many=True)
+    """
+    Historique des commandes du vendeur
+    Query params:
+        status: statuts effectifs séparés par des virgules (ex : pending,confirmed)
+    """
+    now = timezone.now()
+    orders = Order.objects.filter(seller_id=request.user.id).with_effective_status(now).order_by('-created_at')
+    statuses = request.query_params.get('status')
+    if statuses:
+        orders = orders.filter(effective_status__in=statuses.split(','))
+    serializer = OrderDetailFastSerializer(orders, many=True, context={'request': request, 'now': now})
     return Response(serializer.data)
 
 
@@ -291,11 +384,12 @@ def vendeur_history(request):
 @permission_classes([IsAuthenticated, IsMagasinier])
 def magasinier_orders(request):
     """Liste des commandes confirmées pour le magasinier"""
-    orders = Order.objects.filter(
-        status__in=['confirmed', 'preparing', 'ready']
+    now = timezone.now()
+    orders = Order.objects.with_effective_status(now).filter(
+        effective_status__in=['confirmed', 'preparing', 'ready']
     ).order_by('-created_at')
 
-    serializer = OrderDetailSerializer(orders, many=True)
+    serializer = OrderDetailFastSerializer(orders, many=True, context={'request': request, 'now': now})
     return Response(serializer.data)
 
 @api_view(['POST'])
@@ -305,6 +399,11 @@ def start_preparing(request, pk):
     try:
         order = Order.objects.get(pk=pk)
 
+        if order.should_be_confirmed():
+            # Confirmation affichée par les listes mais pas encore écrite
+            confirm_overdue([order.pk])
+            order.refresh_from_db()
+
         if order.status != 'confirmed':
             return Response(
                 {'error': 'Cette commande ne peut pas être préparée'},
@@ -371,6 +470,72 @@ def mark_ready(request, pk):
             status=status.HTTP_404_NOT_FOUND
         )
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsMagasinier])
+def wave_pick_list(request):
+    """
+    MAGASINIER: Liste de prélèvement d'une vague de commandes confirmées
+    Data: {"order_ids": [1, 2, 3]}
+    Les commandes introuvables ou non confirmées sont renvoyées dans "skipped"
+    """
+    try:
+        order_ids = waves.parse_order_ids(request.data)
+    except ValueError as exc:
+        return Response(
+            {'error': str(exc)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    retained, lines = waves.pick_list(order_ids)
+    skipped = sorted(set(order_ids) - set(retained))
+    return Response({
+        'orders': retained,
+        'skipped': skipped,
+        'lines': lines,
+    })
+
+
+def _advance_wave(request, from_status, message):
+    try:
+        order_ids = waves.parse_order_ids(request.data)
+    except ValueError as exc:
+        return Response(
+            {'error': str(exc)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    moved = waves.advance(order_ids, from_status, request.user)
+    if not moved:
+        return Response(
+            {'error': f'Aucune commande au statut {from_status} dans cette vague'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return Response({
+        'message': message.format(count=len(moved)),
+        'orders': moved,
+        'skipped': sorted(set(order_ids) - set(moved)),
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsMagasinier])
+def wave_start_preparing(request):
+    """
+    MAGASINIER: Commencer la préparation de toute une vague (confirmed -> preparing)
+    Data: {"order_ids": [1, 2, 3]}
+    """
+    return _advance_wave(request, 'confirmed', 'Préparation commencée pour {count} commande(s)')
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsMagasinier])
+def wave_mark_ready(request):
+    """
+    MAGASINIER: Marquer toute une vague comme prête (preparing -> ready)
+    Data: {"order_ids": [1, 2, 3]}
+    """
+    return _advance_wave(request, 'preparing', '{count} commande(s) prête(s) pour livraison')
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsMagasinier])
 def available_deliverers(request):
@@ -405,6 +570,73 @@ def available_deliverers(request):
 
     return Response(data)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsMagasinier])
+def nearest_deliverers(request):
+    """
+    Livreurs disponibles les plus proches d'un point, du plus proche au plus lointain
+    Query params:
+        latitude, longitude: point de départ (ex : adresse de livraison)
+        k: nombre de livreurs (défaut: 5, max: SPATIAL_MAX_NEAREST)
+        max_km: rayon maximal en km, strictement positif (optionnel)
+    """
+    try:
+        latitude = float(request.query_params['latitude'])
+        longitude = float(request.query_params['longitude'])
+        k = int(request.query_params.get('k', 5))
+        max_km = request.query_params.get('max_km')
+        max_distance_m = float(max_km) * 1000 if max_km else None
+    except KeyError:
+        return Response(
+            {'error': 'latitude et longitude requises'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except ValueError:
+        return Response(
+            {'error': 'latitude, longitude, k et max_km doivent être des nombres'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return Response(
+            {'error': 'Coordonnées hors limites'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    # float() accepte aussi 'nan', 'inf' et les rayons négatifs
+    if max_distance_m is not None and not (math.isfinite(max_distance_m) and max_distance_m > 0):
+        return Response(
+            {'error': 'max_km doit être un nombre strictement positif'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    k = min(max(k, 1), settings.SPATIAL_MAX_NEAREST)
+
+    ranked = deliverers.nearest(latitude, longitude, k, max_distance_m)
+    livreurs = User.objects.filter(
+        pk__in=[user_id for user_id, _ in ranked],
+        role='livreur', is_active=True, is_active_account=True
+    ).annotate(
+        active_deliveries=Count('delivered_orders', filter=Q(delivered_orders__status='in_delivery'))
+    ).in_bulk()
+
+    data = []
+    for user_id, distance in ranked:
+        livreur = livreurs.get(user_id)
+        # Compte désactivé depuis la dernière synchronisation de l'index
+        if livreur is None:
+            continue
+        data.append({
+            'id': livreur.id,
+            'username': livreur.username,
+            'full_name': livreur.get_full_name() or livreur.username,
+            'phone': getattr(livreur, 'phone', None),
+            'active_deliveries': livreur.active_deliveries,
+            'latitude': float(livreur.latitude) if livreur.latitude is not None else None,
+            'longitude': float(livreur.longitude) if livreur.longitude is not None else None,
+            'location_updated_at': livreur.location_updated_at,
+            'distance_m': round(distance),
+        })
+
+    return Response(data)
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsMagasinier])
 def assign_deliverer(request, pk):
@@ -463,11 +695,12 @@ def assign_deliverer(request, pk):
 @permission_classes([IsAuthenticated, IsMagasinier])
 def magasinier_history(request):
     """Historique des commandes préparées par le magasinier"""
-    orders = Order.objects.filter(
-        Q(magasinier=request.user) | Q(status__in=['confirmed', 'preparing', 'ready'])
+    now = timezone.now()
+    orders = Order.objects.with_effective_status(now).filter(
+        Q(magasinier_id=request.user.id) | Q(effective_status__in=['confirmed', 'preparing', 'ready'])
     ).order_by('-created_at')
 
-    serializer = OrderDetailSerializer(orders, many=True)
+    serializer = OrderDetailFastSerializer(orders, many=True, context={'request': request, 'now': now})
     return Response(serializer.data)
 
 
@@ -478,13 +711,62 @@ def magasinier_history(request):
 def livreur_deliveries(request):
     """Liste des livraisons du livreur"""
     orders = Order.objects.filter(
-        deliverer=request.user,
+        deliverer_id=request.user.id,
         status='in_delivery'
     ).order_by('-created_at')
 
-    serializer = OrderDetailSerializer(orders, many=True)
+    serializer = OrderDetailFastSerializer(orders, many=True, context={'request': request})
     return Response(serializer.data)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsLivreur])
+def livreur_route(request):
+    """
+    LIVREUR: Livraisons en cours dans l'ordre de passage (tournée la plus courte)
+    L'ordre est recalculé quand les commandes en livraison changent
+    Query params:
+        refresh: 1 pour recalculer depuis la position actuelle
+    """
+    points = list(Order.objects.filter(
+        deliverer_id=request.user.id, status='in_delivery'
+    ).order_by('-created_at', '-id').values_list('id', 'delivery_latitude', 'delivery_longitude'))
+    # Mêmes lignes, même ordre : la sortie peut être réduite par ?fields= sans perdre les positions
+    orders = OrderDetailFastSerializer(
+        Order.objects.filter(pk__in=[pk for pk, _, _ in points]).order_by('-created_at', '-id'),
+        many=True, context={'request': request}
+    ).data
+    located = {}
+    unlocated = []
+    for (pk, latitude, longitude), order in zip(points, orders):
+        if latitude is None or longitude is None:
+            unlocated.append(order)
+        else:
+            located[pk] = (order, float(latitude), float(longitude))
+
+    # Position la plus récente connue de ce worker, sinon celle écrite en base
+    fix = locations.latest(request.user.id)
+    if fix is not None:
+        origin = (fix.latitude, fix.longitude)
+    elif request.user.latitude is not None and request.user.longitude is not None:
+        origin = (float(request.user.latitude), float(request.user.longitude))
+    else:
+        origin = None
+
+    legs, distance, cached = plan_livreur_route(
+        request.user.id,
+        [(pk, latitude, longitude) for pk, (_, latitude, longitude) in located.items()],
+        origin,
+        refresh=request.query_params.get('refresh') in ('1', 'true'),
+    )
+
+    return Response({
+        'stops': [{**located[pk][0], 'leg_distance_m': leg} for pk, leg in legs],
+        'unlocated': unlocated,
+        'total_distance_m': distance,
+        'origin': {'latitude': origin[0], 'longitude': origin[1]} if origin else None,
+        'cached': cached,
+    })
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsLivreur])
 def mark_delivered(request, pk):
@@ -603,10 +885,10 @@ def cancel_delivery(request, pk):
 def livreur_history(request):
     """Historique de toutes les livraisons du livreur"""
     orders = Order.objects.filter(
-        deliverer=request.user
+        deliverer_id=request.user.id
     ).order_by('-created_at')
 
-    serializer = OrderDetailSerializer(orders, many=True)
+    serializer = OrderDetailFastSerializer(orders, many=True, context={'request': request})
     return Response(serializer.data)
 
 # ========== COMMUN ==========
@@ -615,14 +897,13 @@ def livreur_history(request):
 @permission_classes([IsAuthenticated])
 def order_detail(request, pk):
     """Détails complets d'une commande"""
-    try:
-        order = Order.objects.get(pk=pk)
-        return Response(OrderDetailSerializer(order).data)
-    except Order.DoesNotExist:
+    data = OrderDetailFastSerializer(Order.objects.filter(pk=pk), context={'request': request}).data
+    if data is None:
         return Response(
             {'error': 'Commande introuvable'},
             status=status.HTTP_404_NOT_FOUND
         )
+    return Response(data)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -631,10 +912,61 @@ def order_history_view(request, pk):
     try:
         order = Order.objects.get(pk=pk)
         history = order.history.all()
-        serializer = OrderHistorySerializer(history, many=True)
+        serializer = OrderHistorySerializer(history, many=True, context={'request': request})
         return Response(serializer.data)
     except Order.DoesNotExist:
         return Response(
             {'error': 'Commande introuvable'},
             status=status.HTTP_404_NOT_FOUND
-        )
\ No newline at end of file
+        )
+
+# ========== ANALYTIQUE ==========
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdmin])
+def order_latency_analytics(request):
+    """
+    ADMIN: Durées p50/p90/p99 des étapes (confirmation → préparation → prête → livrée)
+    par magasinier, livreur et heure de la journée
+    Params: ?start=<ISO>&end=<ISO> ou ?days=7
+    """
+    start = request.query_params.get('start')
+    end = request.query_params.get('end')
+
+    if start or end:
+        try:
+            start = parse_datetime(start) if start else None
+            end = parse_datetime(end) if end else timezone.now()
+        except ValueError:
+            # Format reconnu mais date impossible (ex : mois 13)
+            start = end = None
+        if start is None or end is None:
+            return Response(
+                {'error': 'Dates invalides (format ISO 8601 attendu)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if timezone.is_naive(start):
+            start = timezone.make_aware(start)
+        if timezone.is_naive(end):
+            end = timezone.make_aware(end)
+    else:
+        # Aligner la fin sur la durée du cache pour que les appels successifs partagent la même fenêtre
+        bucket = max(settings.ORDER_ANALYTICS_CACHE_SECONDS, 1)
+        now = int(timezone.now().timestamp())
+        end = datetime.fromtimestamp(now - now % bucket, tz=timezone.get_current_timezone())
+        try:
+            start = end - timedelta(days=int(request.query_params.get('days', 7)))
+        except (ValueError, OverflowError):
+            # OverflowError : fenêtre au-delà des dates représentables
+            return Response(
+                {'error': 'Nombre de jours invalide'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+    if start >= end:
+        return Response(
+            {'error': 'La date de début doit précéder la date de fin'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    return Response(stage_latencies(start, end))
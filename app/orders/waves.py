@@ -0,0 +1,93 @@
+"""
+Préparation par vague (wave picking) pour les magasiniers.
+
+Une vague est un ensemble de commandes préparées ensemble : une seule
+liste de prélèvement (quantités totales par produit et unité, un
+GROUP BY sur order_items), puis un passage de toute la vague à
+« preparing » et à « ready » par un UPDATE chacun, avec les lignes
+d'historique insérées en bloc.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min, Sum
+from django.utils import timezone
+
+from .confirmation import confirm_overdue
+from .models import Order, OrderHistory, OrderItem
+
+# statut de départ -> (statut d'arrivée, action d'historique, champ horodaté, description)
+TRANSITIONS = {
+    'confirmed': ('preparing', 'preparing', 'prepared_at', 'Préparation commencée par {username} (vague de {count})'),
+    'preparing': ('ready', 'ready', 'ready_at', "Commande prête (vague de {count}), en attente d'assignation livreur"),
+}
+
+
+def parse_order_ids(data):
+    """order_ids de la requête -> liste d'entiers sans doublon ; ValueError (message affichable) si invalide"""
+    order_ids = data.get('order_ids') if isinstance(data, dict) else None
+    if not isinstance(order_ids, list) or not order_ids:
+        raise ValueError('order_ids requis (liste d\'identifiants de commandes)')
+    if len(order_ids) > settings.WAVE_MAX_ORDERS:
+        raise ValueError(f'Au plus {settings.WAVE_MAX_ORDERS} commandes par vague')
+    # Entiers JSON uniquement : int() tronquerait 1.5 et accepterait true ou "7"
+    if not all(isinstance(order_id, int) and not isinstance(order_id, bool) and order_id > 0
+               for order_id in order_ids):
+        raise ValueError('order_ids doit contenir des identifiants de commandes (entiers)')
+    return list(dict.fromkeys(order_ids))
+
+
+def pick_list(order_ids):
+    """
+    Liste de prélèvement des commandes confirmées parmi order_ids
+    Retourne (identifiants retenus, lignes {product, product_name, unit, quantity, orders})
+    """
+    retained = list(Order.objects.filter(pk__in=order_ids).with_effective_status().filter(
+        effective_status='confirmed'
+    ).order_by('created_at').values_list('id', flat=True))
+    lines = list(
+        OrderItem.objects.filter(order_id__in=retained)
+        .values('product_id', 'unit')
+        .annotate(product_name=Min('product_name'), quantity=Sum('quantity'), orders=Count('order_id', distinct=True))
+        .order_by('product_name', 'unit')
+    )
+    return retained, [
+        {
+            'product': line['product_id'],
+            'product_name': line['product_name'],
+            'unit': line['unit'],
+            'quantity': line['quantity'],
+            'orders': line['orders'],
+        }
+        for line in lines
+    ]
+
+
+def advance(order_ids, from_status, user):
+    """
+    Fait passer les commandes de order_ids au statut from_status à l'étape suivante
+    Un UPDATE et un INSERT groupé ; retourne les identifiants modifiés
+    """
+    to_status, action, timestamp_field, description = TRANSITIONS[from_status]
+    if from_status == 'confirmed':
+        # Confirmations affichées par les listes mais pas encore écrites
+        confirm_overdue(order_ids)
+    now = timezone.now()
+    with transaction.atomic():
+        moved = list(
+            Order.objects.select_for_update()
+            .filter(pk__in=order_ids, status=from_status)
+            .order_by('pk').values_list('id', flat=True)
+        )
+        if not moved:
+            return []
+        changes = {'status': to_status, timestamp_field: now}
+        if to_status == 'preparing':
+            changes['magasinier'] = user
+        Order.objects.filter(pk__in=moved).update(**changes)
+
+        text = description.format(username=user.username, count=len(moved))
+        OrderHistory.objects.bulk_create([
+            OrderHistory(order_id=order_id, action=action, user=user, user_role=user.role, description=text)
+            for order_id in moved
+        ])
+    return moved
@@ -1,7 +1,17 @@
 from rest_framework import serializers
 from .models import Product
+from app.core.fast_serializers import FastSerializer
+from app.core.fieldsets import SparseFieldsMixin
 
-class ProductSerializer(serializers.ModelSerializer):
+
+def validation_status(is_validated):
+    """Libellé de validation (ProductSerializer et ProductFastSerializer)"""
+    if is_validated:
+        return '✅ Validé'
+    return '⏳ En attente de validation'
+
+
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     created_by_name = serializers.CharField(source='created_by.username', read_only=True)
     validation_status = serializers.SerializerMethodField()
 
@@ -12,11 +22,10 @@ class ProductSerializer(serializers.ModelSerializer):
             'is_validated', 'is_active', 'created_by', 'created_by_name',
             'validated_at', 'created_at', 'updated_at', 'validation_status'
         ]
+        compact_exclude = ['validation_status']
 
     def get_validation_status(self, obj):
-        if obj.is_validated:
-            return '✅ Validé'
-        return '⏳ En attente de validation'
+        return validation_status(obj.is_validated)
 
 class ProductCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -24,3 +33,11 @@ class ProductCreateSerializer(serializers.ModelSerializer):
         fields = ['name', 'description', 'unit', 'price', 'stock']
 
 
+class ProductFastSerializer(FastSerializer):
+    """ProductSerializer sur des lignes .values()"""
+    serializer_class = ProductSerializer
+    requires = ('is_validated',)
+
+    def compute(self, row, now):
+        return {'validation_status': validation_status(row['is_validated'])}
+
@@ -7,9 +7,8 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.utils import timezone
 from .models import Product
-from .serializers import ProductSerializer, ProductCreateSerializer
+from .serializers import ProductSerializer, ProductCreateSerializer, ProductFastSerializer
 from app.users.permissions import IsAdmin
-import pandas as pd
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsAdmin])
@@ -141,7 +140,7 @@ def list_products(request):
     else:
         products = Product.objects.filter(is_validated=True, is_active=True)
 
-    serializer = ProductSerializer(products, many=True)
+    serializer = ProductFastSerializer(products, many=True, context={'request': request})
     return Response(serializer.data)
 
 @api_view(['GET'])
@@ -156,7 +155,7 @@ def search_products(request):
         is_active=True
     )
 
-    serializer = ProductSerializer(products, many=True)
+    serializer = ProductFastSerializer(products, many=True, context={'request': request})
     return Response(serializer.data)
 
 @api_view(['PUT'])
@@ -316,6 +315,8 @@ def import_products_excel(request):
         )
 
     file = request.FILES['file']
+    # Import différé : pandas (et openpyxl) pèsent sur le démarrage de chaque worker
+    import pandas as pd
 
     try:
         df = pd.read_excel(file)
@@ -0,0 +1,320 @@
+"""
+Positions GPS des livreurs (POST /api/users/location/).
+
+Les pings ne sont pas écrits un par un. Chaque worker garde en mémoire la
+dernière position de chaque livreur et un échantillon de son trajet ; un
+thread de fond les écrit par lots toutes les LOCATION_FLUSH_INTERVAL
+secondes :
+  - users.latitude/longitude/location_updated_at : un UPDATE par lot de
+    LOCATION_FLUSH_BATCH livreurs, conditionnel sur location_updated_at
+    (un worker ne remplace pas une position plus récente écrite par un
+    autre worker) ;
+  - user_locations : au plus une position toutes les
+    LOCATION_HISTORY_INTERVAL secondes par livreur, ou dès
+    LOCATION_HISTORY_DISTANCE mètres parcourus. Sous PostgreSQL la table
+    est partitionnée par jour ; les partitions sont créées à l'écriture et
+    supprimées par manage.py prune_locations.
+
+Entre deux écritures, latest() renvoie la position connue de ce worker.
+Un arrêt brutal du worker perd au plus LOCATION_FLUSH_INTERVAL secondes
+de pings. Une base injoignable remet le lot en attente ; une ligne
+refusée (livreur supprimé...) est écartée seule, sans bloquer les autres.
+"""
+import atexit
+import logging
+import math
+import os
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import DataError, IntegrityError, InterfaceError, OperationalError, connections, router
+from django.db.models import Case, F, Q, Value, When
+from django.utils.dateparse import parse_datetime
+
+from .models import LocationSample, User
+from .spatial import deliverers
+
+logger = logging.getLogger(__name__)
+
+# at : secondes depuis l'epoch (UTC)
+Fix = namedtuple('Fix', 'at latitude longitude accuracy')
+
+# Tolérance sur l'horloge des téléphones
+MAX_CLOCK_SKEW = 60
+
+EARTH_RADIUS_M = 6_371_000
+
+
+def parse_fix(data, now):
+    """dict JSON -> Fix ; ValueError (message affichable) si la position est invalide"""
+    if not isinstance(data, dict):
+        raise ValueError('objet attendu')
+    try:
+        latitude = float(data['latitude'])
+        longitude = float(data['longitude'])
+    except KeyError as exc:
+        raise ValueError(f'{exc.args[0]} requis')
+    except (TypeError, ValueError):
+        raise ValueError('latitude et longitude doivent être des nombres')
+    if not -90 <= latitude <= 90:
+        raise ValueError('latitude hors limites')
+    if not -180 <= longitude <= 180:
+        raise ValueError('longitude hors limites')
+
+    recorded_at = data.get('recorded_at')
+    if recorded_at is None:
+        at = now
+    elif isinstance(recorded_at, (int, float)) and not isinstance(recorded_at, bool):
+        # Epoch en secondes ou en millisecondes (Date.now() côté client)
+        try:
+            at = float(recorded_at)
+        except OverflowError:
+            raise ValueError('recorded_at invalide')
+        if at > 1e11:
+            at /= 1000
+    else:
+        try:
+            parsed = parse_datetime(str(recorded_at))
+        except ValueError:
+            parsed = None
+        if parsed is None or parsed.tzinfo is None:
+            raise ValueError('recorded_at doit être une date ISO 8601 avec fuseau ou un timestamp')
+        at = parsed.timestamp()
+    if not math.isfinite(at):
+        raise ValueError('recorded_at invalide')
+    if at > now + MAX_CLOCK_SKEW:
+        raise ValueError('recorded_at est dans le futur')
+    if at < now - settings.LOCATION_HISTORY_DAYS * 86400:
+        raise ValueError(f'recorded_at est antérieur à {settings.LOCATION_HISTORY_DAYS} jours')
+
+    accuracy = data.get('accuracy')
+    if accuracy is not None:
+        try:
+            accuracy = min(max(int(accuracy), 0), 32767)
+        except (TypeError, ValueError):
+            raise ValueError('accuracy doit être un nombre de mètres')
+    return Fix(at, latitude, longitude, accuracy)
+
+
+def distance_m(a, b):
+    """Distance approchée (équirectangulaire) entre deux Fix, suffisante pour quelques kilomètres"""
+    x = math.radians(b.longitude - a.longitude) * math.cos(math.radians((a.latitude + b.latitude) / 2))
+    y = math.radians(b.latitude - a.latitude)
+    return EARTH_RADIUS_M * math.hypot(x, y)
+
+
+def _datetime(at):
+    return datetime.fromtimestamp(at, tz=dt_timezone.utc)
+
+
+def _degrees(value):
+    return Decimal(f'{value:.6f}')
+
+
+# ----- Écriture -----
+
+def write_positions(fixes):
+    """{user_id: Fix} -> users, une requête par lot ; une position plus récente en base est conservée"""
+    items = list(fixes.items())
+    batch = settings.LOCATION_FLUSH_BATCH
+    for start in range(0, len(items), batch):
+        chunk = items[start:start + batch]
+        newer = {
+            user_id: Q(pk=user_id) & (Q(location_updated_at__isnull=True) | Q(location_updated_at__lt=_datetime(fix.at)))
+            for user_id, fix in chunk
+        }
+
+        def case(field, value):
+            return Case(
+                *[When(newer[user_id], then=Value(value(fix))) for user_id, fix in chunk],
+                default=F(field),
+                output_field=User._meta.get_field(field),
+            )
+
+        User.objects.filter(pk__in=[user_id for user_id, _ in chunk]).update(
+            latitude=case('latitude', lambda fix: _degrees(fix.latitude)),
+            longitude=case('longitude', lambda fix: _degrees(fix.longitude)),
+            location_updated_at=case('location_updated_at', lambda fix: _datetime(fix.at)),
+        )
+
+
+_partitions = set()
+
+
+def ensure_partitions(days):
+    """PostgreSQL : crée les partitions quotidiennes de user_locations manquantes"""
+    connection = connections[router.db_for_write(LocationSample)]
+    if connection.vendor != 'postgresql':
+        return
+    missing = [day for day in days if day not in _partitions]
+    if not missing:
+        return
+    with connection.cursor() as cursor:
+        for day in missing:
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS user_locations_{day:%Y%m%d} PARTITION OF user_locations '
+                f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+            )
+    _partitions.update(missing)
+
+
+def write_history(samples):
+    """[(user_id, Fix)] -> user_locations"""
+    rows = []
+    for user_id, fix in samples:
+        recorded_at = _datetime(fix.at)
+        rows.append(LocationSample(
+            user_id=user_id,
+            day=recorded_at.date(),
+            recorded_at=recorded_at,
+            latitude_e6=round(fix.latitude * 1e6),
+            longitude_e6=round(fix.longitude * 1e6),
+            accuracy=fix.accuracy,
+        ))
+    if rows:
+        days = {row.day for row in rows}
+        ensure_partitions(days)
+        try:
+            LocationSample.objects.bulk_create(rows, batch_size=1000)
+        except IntegrityError:
+            if not _partitions:
+                raise
+            # Partition supprimée par prune_locations depuis sa mise en cache : la recréer une fois
+            _partitions.clear()
+            ensure_partitions(days)
+            LocationSample.objects.bulk_create(rows, batch_size=1000)
+
+
+def write_history_isolating(samples):
+    """
+    write_history() ; si une ligne est refusée (livreur supprimé, valeur hors bornes),
+    le lot est coupé en deux jusqu'à isoler les lignes fautives, qui sont écartées.
+    Retourne le nombre de points écartés ; les erreurs passagères remontent.
+    """
+    try:
+        write_history(samples)
+        return 0
+    except (IntegrityError, DataError) as error:
+        if len(samples) == 1:
+            logger.warning('Point de position écarté (livreur %s) : %s', samples[0][0], error)
+            return 1
+    middle = len(samples) // 2
+    return write_history_isolating(samples[:middle]) + write_history_isolating(samples[middle:])
+
+
+# ----- Tampon du worker -----
+
+class LocationStore:
+    """Dernières positions et historique en attente, pour un processus"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latest = {}
+        self.dirty = set()
+        self.sampled = {}
+        self.samples = []
+        self.flusher = None
+        self.flusher_pid = None
+        self.start_lock = threading.Lock()
+        self.wake = threading.Event()
+
+    def record(self, user_id, fixes):
+        """Enregistre les positions d'un livreur ; les positions plus anciennes que la dernière connue sont ignorées"""
+        with self.lock:
+            current = self.latest.get(user_id)
+            for fix in sorted(fixes):
+                if current is not None and fix.at <= current.at:
+                    continue
+                current = fix
+                last = self.sampled.get(user_id)
+                if (last is None or fix.at - last.at >= settings.LOCATION_HISTORY_INTERVAL
+                        or distance_m(last, fix) >= settings.LOCATION_HISTORY_DISTANCE):
+                    self.sampled[user_id] = fix
+                    if len(self.samples) < settings.LOCATION_MAX_PENDING:
+                        self.samples.append((user_id, fix))
+            moved = current is not None and current is not self.latest.get(user_id)
+            if moved:
+                self.latest[user_id] = current
+                self.dirty.add(user_id)
+        if moved:
+            deliverers.move(user_id, current.latitude, current.longitude)
+        self.ensure_flusher()
+
+    def flush(self):
+        with self.lock:
+            positions = {user_id: self.latest[user_id] for user_id in self.dirty}
+            self.dirty = set()
+            samples, self.samples = self.samples, []
+        if not positions and not samples:
+            return
+        # Seules les erreurs passagères (base injoignable) remettent en attente : une
+        # ligne refusée à chaque essai bloquerait sinon le worker indéfiniment
+        try:
+            write_positions(positions)
+        except (OperationalError, InterfaceError):
+            logger.exception('Écriture des positions impossible (%d livreurs) : remise en attente', len(positions))
+            self.requeue(positions, samples)
+            return
+        except Exception:
+            logger.exception('Positions de %d livreurs abandonnées', len(positions))
+        try:
+            dropped = write_history_isolating(samples)
+        except (OperationalError, InterfaceError):
+            logger.exception('Écriture de l\'historique impossible (%d points) : remise en attente', len(samples))
+            self.requeue({}, samples)
+        except Exception:
+            logger.exception('Historique de %d points abandonné', len(samples))
+        else:
+            if dropped:
+                logger.warning('%d point(s) de position refusé(s) par la base et écarté(s)', dropped)
+
+    def requeue(self, positions, samples):
+        with self.lock:
+            # Un ping plus récent arrivé entre-temps est déjà en attente
+            self.dirty.update(user_id for user_id, fix in positions.items() if self.latest.get(user_id) is fix)
+            self.samples = (samples + self.samples)[-settings.LOCATION_MAX_PENDING:]
+
+    def ensure_flusher(self):
+        # Après un fork (gunicorn préchargé), le thread du parent n'existe pas dans l'enfant
+        if self.flusher_pid == os.getpid():
+            return
+        with self.start_lock:
+            if self.flusher_pid == os.getpid():
+                return
+            self.flusher = threading.Thread(target=self.run, name='location-flusher', daemon=True)
+            self.flusher.start()
+            self.flusher_pid = os.getpid()
+
+    def run(self):
+        while True:
+            self.wake.wait(settings.LOCATION_FLUSH_INTERVAL)
+            self.wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Thread d\'écriture des positions')
+            finally:
+                # Connexions propres à ce thread : ne pas les garder ouvertes entre deux lots
+                connections.close_all()
+
+
+store = LocationStore()
+
+
+def record(user_id, fixes):
+    store.record(user_id, fixes)
+
+
+def latest(user_id):
+    """Dernière position connue de ce worker (Fix) ou None"""
+    return store.latest.get(user_id)
+
+
+def flush():
+    store.flush()
+
+
+atexit.register(flush)
@@ -0,0 +1,74 @@
+# Generated by Django 6.0 on 2026-10-19 10:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# PostgreSQL : table partitionnée par jour ; la clé primaire doit inclure la clé de partition.
+# Les partitions quotidiennes sont créées à l'écriture (app.users.locations.ensure_partitions).
+POSTGRES_CREATE = [
+    '''
+    CREATE TABLE user_locations (
+        id bigint GENERATED BY DEFAULT AS IDENTITY,
+        user_id bigint NOT NULL REFERENCES users (id) DEFERRABLE INITIALLY DEFERRED,
+        day date NOT NULL,
+        recorded_at timestamp with time zone NOT NULL,
+        latitude_e6 integer NOT NULL,
+        longitude_e6 integer NOT NULL,
+        accuracy smallint NULL CHECK (accuracy >= 0),
+        PRIMARY KEY (id, day)
+    ) PARTITION BY RANGE (day)
+    ''',
+    'CREATE INDEX user_locations_user_time ON user_locations (user_id, recorded_at)',
+]
+
+
+def create_location_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in POSTGRES_CREATE:
+            schema_editor.execute(sql)
+    else:
+        schema_editor.create_model(apps.get_model('users', 'LocationSample'))
+
+
+def drop_location_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP TABLE user_locations CASCADE')
+    else:
+        schema_editor.delete_model(apps.get_model('users', 'LocationSample'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_is_active_account_alter_user_is_active'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='location_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='LocationSample',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('day', models.DateField()),
+                        ('recorded_at', models.DateTimeField()),
+                        ('latitude_e6', models.IntegerField()),
+                        ('longitude_e6', models.IntegerField()),
+                        ('accuracy', models.PositiveSmallIntegerField(blank=True, null=True)),
+                        ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='location_samples', to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'user_locations',
+                        'indexes': [models.Index(fields=['user', 'recorded_at'], name='user_locations_user_time')],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_location_table, drop_location_table),
+    ]
@@ -20,6 +20,8 @@ class User(AbstractUser):
     # Pour livreur - localisation
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    # Heure de la position (relevé GPS), pas de son écriture : voir app.users.locations
+    location_updated_at = models.DateTimeField(null=True, blank=True)
 
 
     created_at = models.DateTimeField(auto_now_add=True)
@@ -32,3 +34,31 @@ class User(AbstractUser):
 
     def __str__(self):
         return f"{self.username} -{self.get_role_display()}"
+
+
+class LocationSample(models.Model):
+    """
+    Historique échantillonné des positions des livreurs (app.users.locations).
+    Coordonnées en microdegrés (entiers) ; sous PostgreSQL la table est
+    partitionnée par jour (une partition user_locations_AAAAMMJJ par jour).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='location_samples', db_index=False)
+    day = models.DateField()
+    recorded_at = models.DateTimeField()
+    latitude_e6 = models.IntegerField()
+    longitude_e6 = models.IntegerField()
+    accuracy = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'user_locations'
+        indexes = [
+            models.Index(fields=['user', 'recorded_at'], name='user_locations_user_time'),
+        ]
+
+    @property
+    def latitude(self):
+        return self.latitude_e6 / 1e6
+
+    @property
+    def longitude(self):
+        return self.longitude_e6 / 1e6
@@ -1,10 +1,11 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from app.core.fieldsets import SparseFieldsMixin
 
 User = get_user_model()
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     #Serializer pour afficher les utilisateurs#
     role_display = serializers.CharField(source='get_role_display', read_only=True)
     class Meta:
@@ -13,6 +14,7 @@ class UserSerializer(serializers.ModelSerializer):
                 'role', 'role_display', 'is_active_account',
                 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
+        compact_exclude = ['role_display']
 
 class UserCreateSerializer(serializers.ModelSerializer):
     #Serializer pour créer un utilisateur#
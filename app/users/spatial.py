@@ -0,0 +1,198 @@
+"""
+Index spatial des positions des livreurs (k plus proches d'un point).
+
+Grille uniforme en degrés (SPATIAL_GRID_CELL_DEGREES ; 0,01° ≈ 1,1 km) :
+chaque cellule contient les livreurs qui s'y trouvent. Une recherche
+parcourt des anneaux de cellules autour du point jusqu'à ce que la k-ième
+distance trouvée soit inférieure à la distance minimale de toute cellule
+non parcourue, puis classe les candidats par distance haversine
+vectorisée (NumPy). Quand l'anneau devient plus grand que le nombre de
+cellules occupées, les cellules occupées sont toutes classées d'un coup.
+
+L'index de chaque worker (deliverers) est mis à jour :
+  - aussitôt pour les pings reçus par ce worker (app.users.locations) et
+    les modifications faites par l'admin (update_user, toggle_user_status) ;
+  - depuis la base, au plus toutes les SPATIAL_INDEX_REFRESH secondes,
+    pour les livreurs modifiés depuis la dernière synchronisation
+    (positions écrites par les autres workers) ; rechargement complet
+    toutes les SPATIAL_INDEX_FULL_REFRESH secondes.
+"""
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import User
+
+EARTH_RADIUS_M = 6_371_000
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+
+
+def haversine_m(latitude, longitude, latitudes, longitudes):
+    """Distances (m) d'un point à des tableaux de points, vectorisées"""
+    import numpy as np
+
+    lat1 = math.radians(latitude)
+    lat2 = np.radians(latitudes)
+    dlat = lat2 - lat1
+    dlon = np.radians(longitudes) - math.radians(longitude)
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GridIndex:
+    """Grille uniforme {cellule: identifiants} ; non protégée contre les accès concurrents"""
+
+    def __init__(self, cell_degrees):
+        self.cell_degrees = cell_degrees
+        self.cells = {}
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def cell(self, latitude, longitude):
+        return math.floor(latitude / self.cell_degrees), math.floor(longitude / self.cell_degrees)
+
+    def update(self, key, latitude, longitude):
+        cell = self.cell(latitude, longitude)
+        previous = self.positions.get(key)
+        if previous is not None and previous[2] != cell:
+            self._discard(key, previous[2])
+        self.cells.setdefault(cell, set()).add(key)
+        self.positions[key] = (latitude, longitude, cell)
+
+    def remove(self, key):
+        previous = self.positions.pop(key, None)
+        if previous is not None:
+            self._discard(key, previous[2])
+
+    def _discard(self, key, cell):
+        members = self.cells[cell]
+        members.discard(key)
+        if not members:
+            del self.cells[cell]
+
+    @staticmethod
+    def _ring(row, column, radius):
+        if radius == 0:
+            yield row, column
+            return
+        for j in range(column - radius, column + radius + 1):
+            yield row - radius, j
+            yield row + radius, j
+        for i in range(row - radius + 1, row + radius):
+            yield i, column - radius
+            yield i, column + radius
+
+    def _reach_m(self, latitude, radius):
+        """Distance minimale entre le point et une cellule hors des anneaux 0..radius"""
+        edge = min(89.9, abs(latitude) + (radius + 1) * self.cell_degrees)
+        return radius * self.cell_degrees * METERS_PER_DEGREE * math.cos(math.radians(edge))
+
+    def _rank(self, latitude, longitude, keys):
+        keys = list(keys)
+        if not keys:
+            return []
+        latitudes = [self.positions[key][0] for key in keys]
+        longitudes = [self.positions[key][1] for key in keys]
+        distances = haversine_m(latitude, longitude, latitudes, longitudes)
+        order = distances.argsort(kind='stable')
+        return [(keys[i], float(distances[i])) for i in order]
+
+    def nearest(self, latitude, longitude, k, max_distance_m=None):
+        """[(identifiant, distance en m)] des k plus proches, du plus proche au plus lointain"""
+        if k <= 0 or not self.positions:
+            return []
+        row, column = self.cell(latitude, longitude)
+        candidates = []
+        radius = 0
+        while True:
+            if (2 * radius + 1) ** 2 > len(self.cells):
+                # Anneau plus grand que la partie occupée de la grille : tout classer
+                ranked = self._rank(latitude, longitude, self.positions)
+                break
+            for cell in self._ring(row, column, radius):
+                candidates.extend(self.cells.get(cell, ()))
+            reach = self._reach_m(latitude, radius)
+            if len(candidates) >= k or len(candidates) == len(self.positions):
+                ranked = self._rank(latitude, longitude, candidates)
+                if len(ranked) == len(self.positions) or ranked[k - 1][1] <= reach:
+                    break
+            if max_distance_m is not None and reach >= max_distance_m:
+                ranked = self._rank(latitude, longitude, candidates)
+                break
+            radius += 1
+
+        if max_distance_m is not None:
+            ranked = [item for item in ranked if item[1] <= max_distance_m]
+        return ranked[:k]
+
+
+class DelivererIndex:
+    """Index des livreurs actifs dont la position est connue, pour un processus"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self.grid = GridIndex(settings.SPATIAL_GRID_CELL_DEGREES)
+        self.synced_at = None
+        self.checked_at = 0.0
+        self.full_at = 0.0
+
+    def move(self, user_id, latitude, longitude):
+        with self.lock:
+            self.grid.update(user_id, latitude, longitude)
+
+    def sync_user(self, user):
+        """Après une modification du compte : ajouter, déplacer ou retirer le livreur"""
+        available = (user.role == 'livreur' and user.is_active and user.is_active_account
+                     and user.latitude is not None and user.longitude is not None)
+        with self.lock:
+            if available:
+                self.grid.update(user.pk, float(user.latitude), float(user.longitude))
+            else:
+                self.grid.remove(user.pk)
+
+    def refresh(self):
+        now = time.monotonic()
+        if now - self.checked_at < settings.SPATIAL_INDEX_REFRESH:
+            return
+        if not self.refresh_lock.acquire(blocking=False):
+            return
+        try:
+            full = self.synced_at is None or now - self.full_at >= settings.SPATIAL_INDEX_FULL_REFRESH
+            started = timezone.now()
+            users = User.objects.filter(role='livreur')
+            if not full:
+                # location_updated_at est l'heure du relevé, écrit jusqu'à un cycle d'écriture plus tard
+                since = self.synced_at - timedelta(seconds=2 * settings.LOCATION_FLUSH_INTERVAL + 60)
+                users = users.filter(Q(updated_at__gte=since) | Q(location_updated_at__gte=since))
+            rows = list(users.values_list('id', 'latitude', 'longitude', 'is_active', 'is_active_account'))
+
+            with self.lock:
+                grid = GridIndex(settings.SPATIAL_GRID_CELL_DEGREES) if full else self.grid
+                for user_id, latitude, longitude, is_active, is_active_account in rows:
+                    if is_active and is_active_account and latitude is not None and longitude is not None:
+                        grid.update(user_id, float(latitude), float(longitude))
+                    else:
+                        grid.remove(user_id)
+                self.grid = grid
+            self.synced_at = started
+            if full:
+                self.full_at = now
+        finally:
+            self.checked_at = time.monotonic()
+            self.refresh_lock.release()
+
+    def nearest(self, latitude, longitude, k, max_distance_m=None):
+        self.refresh()
+        with self.lock:
+            return self.grid.nearest(latitude, longitude, k, max_distance_m)
+
+
+deliverers = DelivererIndex()
@@ -7,4 +7,5 @@ urlpatterns = [
     path('create/', views.create_user, name='create-user'),
     path('<int:pk>/update/', views.update_user, name='update-user'),
     path('<int:pk>/toggle-status/', views.toggle_user_status, name='toggle-user-status'),
+    path('location/', views.location_ping, name='location-ping'),
 ]
\ No newline at end of file
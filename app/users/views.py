@@ -1,13 +1,20 @@
+import time
+
 from django.shortcuts import render
 
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from .serializers import UserSerializer, UserCreateSerializer
-from .permissions import IsAdmin
+from .permissions import IsAdmin, IsLivreur
+from . import locations
+from .spatial import deliverers
 from app.notifications.models import Notification
+from app.authentication.backends import invalidate_user
 
 User = get_user_model()
 
@@ -22,7 +29,7 @@ def list_users(request):
     else:
         users = User.objects.all()
 
-    serializer = UserSerializer(users, many=True)
+    serializer = UserSerializer(users, many=True, context={'request': request})
     return Response(serializer.data)
 
 @api_view(['POST'])
@@ -59,15 +66,19 @@ def update_user(request, pk):
         user.first_name = request.data.get('first_name', user.first_name)
         user.last_name = request.data.get('last_name', user.last_name)
         user.email = request.data.get('email', user.email)
-        user.phone = request.data.get('phone', user.phone)
         user.role = request.data.get('role', user.role)
 
         # Mise à jour localisation pour livreur
         if user.role == 'livreur':
             user.latitude = request.data.get('latitude', user.latitude)
             user.longitude = request.data.get('longitude', user.longitude)
+            if 'latitude' in request.data or 'longitude' in request.data:
+                # Les pings plus anciens encore en attente ne la remplaceront pas
+                user.location_updated_at = timezone.now()
 
         user.save()
+        invalidate_user(user.pk)
+        deliverers.sync_user(user)
 
         return Response({
             'message': 'Utilisateur modifié avec succès',
@@ -87,6 +98,8 @@ def toggle_user_status(request, pk):
         user = User.objects.get(pk=pk)
         user.is_active_account = not user.is_active_account
         user.save()
+        invalidate_user(user.pk)
+        deliverers.sync_user(user)
 
         status_text = 'activé' if user.is_active_account else 'désactivé'
 
@@ -122,7 +135,15 @@ def change_password(request):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    user = request.user
+    # request.user peut venir du cache d'authentification (JWT_USER_CACHE_TTL) : relire la
+    # ligne pour vérifier le mot de passe actuel et ne pas réécrire des colonnes périmées
+    try:
+        user = User.objects.get(pk=request.user.pk)
+    except User.DoesNotExist:
+        return Response(
+            {'error': 'Utilisateur introuvable'},
+            status=status.HTTP_404_NOT_FOUND
+        )
 
     # Vérifier le mot de passe actuel
     if not user.check_password(current_password):
@@ -140,8 +161,48 @@ def change_password(request):
 
     # Mettre à jour le mot de passe
     user.set_password(new_password)
-    user.save()
+    user.save(update_fields=['password'])
+    invalidate_user(user.pk)
 
     return Response({
         'message': 'Mot de passe modifié avec succès'
-    })
\ No newline at end of file
+    })
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsLivreur])
+def location_ping(request):
+    """
+    LIVREUR: Envoyer sa position (une ou plusieurs mesures GPS)
+    Body: {"latitude", "longitude", "recorded_at"?, "accuracy"?}
+          ou {"fixes": [...]} / [...] pour un lot (positions enregistrées hors ligne)
+    recorded_at : ISO 8601 avec fuseau ou timestamp (s ou ms) ; défaut : maintenant
+    """
+    fixes = request.data
+    if isinstance(fixes, dict) and 'fixes' in fixes:
+        fixes = fixes['fixes']
+    if isinstance(fixes, dict):
+        fixes = [fixes]
+    if not isinstance(fixes, list) or not fixes:
+        return Response(
+            {'error': 'Position requise'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(fixes) > settings.LOCATION_MAX_BATCH:
+        return Response(
+            {'error': f'Au plus {settings.LOCATION_MAX_BATCH} positions par envoi'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    now = time.time()
+    parsed = []
+    for index, fix in enumerate(fixes):
+        try:
+            parsed.append(locations.parse_fix(fix, now))
+        except ValueError as exc:
+            return Response(
+                {'error': f'Position {index} invalide : {exc}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+    locations.record(request.user.id, parsed)
+    return Response({'accepted': len(parsed)}, status=status.HTTP_202_ACCEPTED)